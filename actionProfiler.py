@@ -0,0 +1,121 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from logSetup import app_data_dir
+
+logger = logging.getLogger("timeplan.profiler")
+
+
+class ActionProfiler:
+    """
+    Profiles the next N UI actions with cProfile and tracemalloc.
+
+    For every captured action two files are written to output_dir (default profiles/ in the
+    app data dir, see app_data_dir):
+        <time>_<n>_<action>.prof         cProfile stats (open with pstats or snakeviz)
+        <time>_<n>_<action>_alloc.txt    top allocations made during the action + top functions by cumulative time
+
+    Example:
+        profiler = ActionProfiler()
+        profiler.arm(5)
+        with profiler.capture("show_calendar_page"):
+            app.show_calendar_page()
+    """
+
+    def __init__(self, output_dir=None, top_allocations=25, top_functions=30, trace_frames=10):
+        self.output_dir = output_dir
+        self.top_allocations = top_allocations
+        self.top_functions = top_functions
+        self.trace_frames = trace_frames
+        self.remaining = 0
+        self.captured = 0
+        self._started_tracemalloc = False
+
+    @property
+    def armed(self):
+        return self.remaining > 0
+
+    def arm(self, count):
+        """Profile the next `count` actions."""
+        self.remaining = max(int(count), 0)
+        if self.output_dir is None:
+            self.output_dir = os.path.join(app_data_dir(), "profiles")
+        logger.info("Profiling the next %d UI actions into %s", self.remaining, os.path.abspath(self.output_dir))
+
+    def disarm(self):
+        self.remaining = 0
+        self._stop_tracemalloc()
+
+    @contextmanager
+    def capture(self, name):
+        """Profile the block if the profiler is armed, otherwise just run it."""
+        if not self.armed:
+            yield
+            return
+        self.remaining -= 1
+        self.captured += 1
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracemalloc = True
+        before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        started_at = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - started_at
+            after = tracemalloc.take_snapshot()
+            self._write_results(name, profile, before, after, elapsed)
+            if not self.armed:
+                self._stop_tracemalloc()
+
+    def _stop_tracemalloc(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _write_results(self, name, profile, before, after, elapsed):
+        base_name = f"{time.strftime('%Y%m%d-%H%M%S')}_{self.captured:03d}_{name}"
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            prof_path = os.path.join(self.output_dir, base_name + ".prof")
+            profile.dump_stats(prof_path)
+
+            lines = [f"{name}: {elapsed * 1000:.1f} ms", "", f"Top {self.top_allocations} allocations (by size delta):"]
+            for stat in after.compare_to(before, "lineno")[:self.top_allocations]:
+                lines.append(f"  {stat}")
+
+            stats_text = io.StringIO()
+            pstats.Stats(profile, stream=stats_text).sort_stats("cumulative").print_stats(self.top_functions)
+            lines += ["", f"Top {self.top_functions} functions (by cumulative time):", stats_text.getvalue()]
+
+            with open(os.path.join(self.output_dir, base_name + "_alloc.txt"), "w", encoding="utf-8") as report:
+                report.write("\n".join(lines))
+            logger.info("Profiled %s (%.1f ms) -> %s", name, elapsed * 1000, prof_path)
+        except OSError as e:
+            logger.warning("Could not write profile for %s: %s", name, e)
+
+
+def from_env():
+    """
+    Create an ActionProfiler configured by the environment:
+
+        TIMEPLAN_PROFILE_ACTIONS    profile the first N UI actions after startup
+        TIMEPLAN_PROFILE_DIR        where to write the .prof / _alloc.txt files (default profiles/ in the app data dir)
+    """
+    profiler = ActionProfiler(os.environ.get("TIMEPLAN_PROFILE_DIR") or None)
+    count = os.environ.get("TIMEPLAN_PROFILE_ACTIONS")
+    if count:
+        try:
+            profiler.arm(int(count))
+        except ValueError:
+            logger.warning("Ignoring TIMEPLAN_PROFILE_ACTIONS=%r (expected a number)", count)
+    return profiler
@@ -0,0 +1,6 @@
+"""
+Benchmarks for DatabaseManager against deterministic synthetic databases.
+
+Run from the repository root:
+    python -m benchmarks --sizes 1k,10k,100k --repeat 20
+"""
@@ -0,0 +1,33 @@
+import argparse
+import os
+import time
+from logSetup import configure_logging
+from benchmarks.dataset import parse_size
+from benchmarks.runner import run_benchmarks, save_report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark DatabaseManager on synthetic data.")
+    parser.add_argument("--sizes", default="1k,10k,100k",
+                        help="comma separated task counts, e.g. 1k,10k,100k,1M,10M (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per scenario (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42, help="dataset seed (default: %(default)s)")
+    parser.add_argument("--data-dir", default=None, help="where generated databases are cached (default: benchmarks/data)")
+    parser.add_argument("--output", default=None,
+                        help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    # Keep the database layer quiet; the benchmark prints its own progress
+    configure_logging(level="ERROR")
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    report = run_benchmarks(sizes, repeat=args.repeat, seed=args.seed, data_dir=args.data_dir)
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results",
+                                         time.strftime("%Y%m%d-%H%M%S") + ".json")
+    save_report(report, output)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
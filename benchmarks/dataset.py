@@ -0,0 +1,197 @@
+import os
+import random
+from datetime import date, datetime, timedelta
+from databaseManagement import DatabaseManager
+from clock import FakeClock
+
+# Every generated database is "as of" this date, so runs on different days see identical data
+REFERENCE_DATE = date(2025, 6, 30)
+
+TITLE_WORDS = [
+    "Review", "Submit", "Prepare", "Call", "Email", "Finish", "Plan", "Read", "Write", "Update",
+    "report", "assignment", "slides", "budget", "meeting", "chapter", "lab", "essay", "project", "notes",
+    "math", "physics", "history", "team", "client", "weekly", "draft", "final", "quiz", "presentation",
+]
+HABIT_NAMES = ["Drink water", "Exercise", "Read 20 pages", "Meditate", "Journal", "Stretch", "Study flashcards",
+               "Walk the dog", "Practice guitar", "Plan tomorrow"]
+RECURRENCE_PATTERNS = ["daily", "daily", "daily", "weekly", "weekly", "monthly"]
+
+# How far from REFERENCE_DATE due dates fall (weights roughly follow a real planner:
+# lots of history, a busy coming week, a thin far future and some undated tasks)
+DUE_DATE_BUCKETS = [
+    (0.10, None),           # no due date
+    (0.50, (-365, -1)),     # history
+    (0.05, (0, 0)),         # today
+    (0.15, (1, 7)),         # next 7 days
+    (0.20, (8, 120)),       # later
+]
+
+BATCH_SIZE = 50_000
+
+
+def parse_size(text):
+    """Parse a task count like '1000', '10k' or '10M'."""
+    text = str(text).strip().lower()
+    multiplier = 1
+    if text.endswith("k"):
+        multiplier, text = 1_000, text[:-1]
+    elif text.endswith("m"):
+        multiplier, text = 1_000_000, text[:-1]
+    return int(float(text) * multiplier)
+
+
+def database_path(directory, n_tasks, seed, tasks_per_user=2000):
+    suffix = "" if tasks_per_user == 2000 else f"_per_user{tasks_per_user}"
+    return os.path.join(directory, f"tasks_{n_tasks}{suffix}_seed{seed}.db")
+
+
+def reference_clock():
+    """A FakeClock at noon on REFERENCE_DATE (pass it to DatabaseManager when benchmarking)."""
+    return FakeClock(datetime(REFERENCE_DATE.year, REFERENCE_DATE.month, REFERENCE_DATE.day, 12))
+
+
+def _pick_due_offset(rng):
+    roll = rng.random()
+    for weight, offsets in DUE_DATE_BUCKETS:
+        if roll < weight:
+            return None if offsets is None else rng.randint(*offsets)
+        roll -= weight
+    return None
+
+
+def _task_rows(rng, n_tasks, n_users, category_ids, priority_ids):
+    urgent_id, not_urgent_id = priority_ids
+    ongoing_id, missed_id, completed_id = category_ids
+    for _ in range(n_tasks):
+        user_id = rng.randint(1, n_users)
+        title = " ".join(rng.sample(TITLE_WORDS, rng.randint(2, 4)))
+        description = " ".join(rng.choices(TITLE_WORDS, k=rng.randint(4, 12))) if rng.random() < 0.5 else None
+        priority_id = urgent_id if rng.random() < 0.25 else not_urgent_id
+        offset = _pick_due_offset(rng)
+        if offset is None:
+            due_date = None
+            category_id = completed_id if rng.random() < 0.2 else ongoing_id
+            created = REFERENCE_DATE - timedelta(days=rng.randint(0, 400))
+        else:
+            due = REFERENCE_DATE + timedelta(days=offset)
+            due_date = due.isoformat()
+            if offset < 0:
+                # Past tasks were either done or missed
+                category_id = completed_id if rng.random() < 0.7 else missed_id
+            else:
+                category_id = completed_id if rng.random() < 0.1 else ongoing_id
+            created = due - timedelta(days=rng.randint(0, 30))
+        updated = min(created + timedelta(days=rng.randint(0, 10)), REFERENCE_DATE)
+        yield (user_id, title, description, priority_id, due_date, category_id,
+               f"{created.isoformat()} 09:00:00", f"{updated.isoformat()} 18:00:00")
+
+
+def _habit_rows(rng, n_users, habits_per_user):
+    for user_id in range(1, n_users + 1):
+        for name in rng.sample(HABIT_NAMES, min(habits_per_user, len(HABIT_NAMES))):
+            start = REFERENCE_DATE - timedelta(days=rng.randint(0, 200))
+            last_completed = (REFERENCE_DATE - timedelta(days=rng.randint(0, 40))).isoformat() if rng.random() < 0.8 else None
+            yield (user_id, name, None, start.isoformat(), rng.choice(RECURRENCE_PATTERNS), last_completed)
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _updated_at_spread(conn):
+    return conn.execute("SELECT COUNT(DISTINCT updated_at), MIN(updated_at), MAX(updated_at) FROM tasks").fetchone()
+
+
+def generate_database(path, n_tasks, seed=42, tasks_per_user=2000, habits_per_user=5):
+    """
+    Create a deterministic benchmark database at path (the same arguments always give the same data).
+
+    Users get about tasks_per_user tasks each, so per-user queries stay realistically sized while
+    the table grows. Rows are bulk loaded with executemany and the task indexes are built after
+    the load.
+
+    Returns:
+        A dict describing the dataset (sizes, seed, reference date)
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    n_users = max(1, n_tasks // tasks_per_user)
+
+    db = DatabaseManager(path, clock=reference_clock())
+    conn = db.conn
+    # Bulk load settings; the file is throwaway until the load finishes
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    category_ids = tuple(db.get_category_id_by_name(name) for name in ("On-going", "Missed", "Completed"))
+    priority_ids = (db.get_priority_id_by_name("Urgent"), db.get_priority_id_by_name("Not urgent"))
+
+    conn.executemany(
+        "INSERT INTO users (username, password) VALUES (?, ?)",
+        ((f"bench_user_{user_id}", "password123") for user_id in range(2, n_users + 1)),
+    )
+
+    # Loading into an unindexed table and indexing afterwards is much faster than the other way round
+    index_names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks' AND name LIKE 'idx_tasks_%'")]
+    for index_name in index_names:
+        conn.execute(f"DROP INDEX {index_name}")
+
+    task_insert = """
+        INSERT INTO tasks (user_id, task_title, description, priority_id, due_date, category_id, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    for batch in _batches(_task_rows(rng, n_tasks, n_users, category_ids, priority_ids)):
+        conn.executemany(task_insert, batch)
+        conn.commit()
+
+    habit_insert = """
+        INSERT INTO recurring_tasks (user_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+    for batch in _batches(_habit_rows(rng, n_users, habits_per_user)):
+        conn.executemany(habit_insert, batch)
+        conn.commit()
+
+    # create_tables() is idempotent and recreates the dropped indexes
+    db.create_tables()
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = DELETE")
+    spread = _updated_at_spread(conn)
+    db._close()
+
+    # Opening the database runs its migrations; if one of them rewrites tasks, every
+    # updated_at collapses to "now" and the sync/delta scenarios measure the wrong thing
+    db = DatabaseManager(path, clock=reference_clock())
+    reopened_spread = _updated_at_spread(db.conn)
+    db._close()
+    if reopened_spread != spread:
+        raise RuntimeError(f"updated_at changed when {path} was reopened: "
+                           f"{spread[0]} distinct values ({spread[1]} to {spread[2]}) became "
+                           f"{reopened_spread[0]} ({reopened_spread[1]} to {reopened_spread[2]})")
+
+    return {
+        "tasks": n_tasks,
+        "users": n_users,
+        "habits": n_users * min(habits_per_user, len(HABIT_NAMES)),
+        "seed": seed,
+        "reference_date": REFERENCE_DATE.isoformat(),
+    }
+
+
+def ensure_database(directory, n_tasks, seed=42, tasks_per_user=2000, **kwargs):
+    """Get the path of a generated database, generating it first if it isn't cached in directory."""
+    os.makedirs(directory, exist_ok=True)
+    path = database_path(directory, n_tasks, seed, tasks_per_user)
+    if not os.path.exists(path):
+        generate_database(path, n_tasks, seed=seed, tasks_per_user=tasks_per_user, **kwargs)
+    return path
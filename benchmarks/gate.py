@@ -0,0 +1,192 @@
+"""
+Performance regression gate: re-runs the benchmarks and compares them to benchmarks/baseline.json.
+
+    python -m benchmarks.gate                          # compare, exit 1 on a regression
+    python -m benchmarks.gate --ui                     # also the TimePlanApp page benchmarks (needs Xvfb)
+    python -m benchmarks.gate --update-baseline        # accept the current numbers as the new baseline
+    python -m benchmarks.gate --ui --update-baseline   # same, including the page benchmarks
+
+With --ui, a page benchmark that has no baseline entry fails the gate, so page renders
+can't go unchecked; record them once with --ui --update-baseline.
+
+Everything runs locally against generated databases; no services are needed.
+"""
+import argparse
+import json
+import os
+import sys
+from logSetup import configure_logging
+from benchmarks.dataset import parse_size
+from benchmarks.runner import run_benchmarks, save_report
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Scenarios compared with --tolerance; the rest (inserts/updates, whose timing depends on disk
+# flushes) are compared with the wider --write-tolerance
+GATED_PREFIXES = ("get_tasks", "search_tasks", "show_", "search_keystroke", "first_paint")
+# Page benchmarks from benchmarks.ui (only run with --ui)
+UI_PREFIXES = ("show_", "search_keystroke", "first_paint")
+
+# Environment fields that make numbers incomparable; "platform" (the full kernel string) is only informative
+COMPARED_ENVIRONMENT = ("python", "sqlite", "machine", "system")
+
+
+def is_gated(scenario):
+    return scenario.startswith(GATED_PREFIXES)
+
+
+def is_ui(scenario):
+    return scenario.startswith(UI_PREFIXES)
+
+
+def allowed_slowdown_ms(baseline, tolerance, min_delta_ms, noise_factor):
+    """
+    How much slower than the baseline p50 a scenario may get before it counts as a regression.
+
+    The largest of: a relative tolerance, an absolute floor (timer/scheduler jitter on
+    sub-millisecond queries) and a multiple of the baseline's own spread (p95 - p50), so
+    naturally noisy scenarios get a wider band than stable ones.
+    """
+    spread = max(baseline["p95_ms"] - baseline["p50_ms"], 0.0)
+    return max(baseline["p50_ms"] * tolerance, min_delta_ms, spread * noise_factor)
+
+
+def compare(baseline_report, current_report, tolerance=0.25, min_delta_ms=0.5, noise_factor=1.0,
+            write_tolerance=1.0, include_ui=False):
+    """
+    Match results by (scenario, size) and classify each as ok / regression / improvement / new / missing.
+
+    Baseline page benchmarks are only compared when include_ui is set (they only run with --ui).
+    """
+    baseline_results = {(r["scenario"], r["size"]): r for r in baseline_report.get("results", [])
+                        if include_ui or not is_ui(r["scenario"])}
+    current_results = {(r["scenario"], r["size"]): r for r in current_report.get("results", [])}
+    rows = []
+    for key, current in current_results.items():
+        baseline = baseline_results.get(key)
+        row = {"scenario": key[0], "size": key[1], "now_p50_ms": current["p50_ms"], "gated": is_gated(key[0])}
+        if baseline is None:
+            row.update(status="new", base_p50_ms=None, change=None)
+        else:
+            delta = current["p50_ms"] - baseline["p50_ms"]
+            scenario_tolerance = tolerance if row["gated"] else write_tolerance
+            allowed = allowed_slowdown_ms(baseline, scenario_tolerance, min_delta_ms, noise_factor)
+            if delta > allowed:
+                status = "regression"
+            elif -delta > allowed:
+                status = "improvement"
+            else:
+                status = "ok"
+            change = delta / baseline["p50_ms"] if baseline["p50_ms"] else 0.0
+            row.update(status=status, base_p50_ms=baseline["p50_ms"], change=change, allowed_ms=allowed)
+        rows.append(row)
+    # Only sizes that were actually run count as missing
+    current_sizes = {key[1] for key in current_results}
+    for key, baseline in baseline_results.items():
+        if key not in current_results and key[1] in current_sizes:
+            rows.append({"scenario": key[0], "size": key[1], "now_p50_ms": None, "gated": is_gated(key[0]),
+                         "status": "missing", "base_p50_ms": baseline["p50_ms"], "change": None})
+    rows.sort(key=lambda row: (row["size"], row["scenario"]))
+    return rows
+
+
+def format_diff(rows):
+    lines = [f"{'scenario':<30}{'size':>10}{'base p50':>12}{'now p50':>12}{'change':>9}  status"]
+    for row in rows:
+        base = f"{row['base_p50_ms']:.3f}" if row["base_p50_ms"] is not None else "-"
+        now = f"{row['now_p50_ms']:.3f}" if row["now_p50_ms"] is not None else "-"
+        change = f"{row['change'] * 100:+.1f}%" if row["change"] is not None else "-"
+        status = row["status"] if row["gated"] or row["status"] != "regression" else "regression (write)"
+        lines.append(f"{row['scenario']:<30}{row['size']:>10,}{base:>12}{now:>12}{change:>9}  {status}")
+    return "\n".join(lines)
+
+
+def environment_mismatch(baseline_report, current_report):
+    """Get the environment fields that differ from the baseline's (numbers from other machines aren't comparable)."""
+    baseline_env = baseline_report.get("environment", {})
+    current_env = current_report.get("environment", {})
+    return [key for key in COMPARED_ENVIRONMENT
+            if key in baseline_env and baseline_env.get(key) != current_env.get(key)]
+
+
+def merge_baseline(old_baseline, current, include_ui):
+    """The new baseline: current results, keeping the old page benchmarks if they weren't re-run."""
+    merged = dict(current)
+    if not include_ui:
+        merged["results"] = current["results"] + [r for r in old_baseline.get("results", []) if is_ui(r["scenario"])]
+    return merged
+
+
+def missing_ui_baselines(rows):
+    """Page benchmarks that ran but have no baseline entry to compare with."""
+    return [row for row in rows if is_ui(row["scenario"]) and row["status"] == "new"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.gate", description="Fail on benchmark regressions.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON (default: benchmarks/baseline.json)")
+    parser.add_argument("--update-baseline", action="store_true", help="write the current results as the new baseline")
+    parser.add_argument("--sizes", default="1k,10k", help="comma separated task counts (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per scenario (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ui", action="store_true", help="also run the TimePlanApp page benchmarks (needs Xvfb)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p50 slowdown (default: %(default)s)")
+    parser.add_argument("--write-tolerance", type=float, default=1.0,
+                        help="allowed relative p50 slowdown of the write scenarios (default: %(default)s)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this (default: %(default)s)")
+    parser.add_argument("--noise-factor", type=float, default=1.0,
+                        help="also allow this many times the baseline's p95-p50 spread (default: %(default)s)")
+    parser.add_argument("--output", default=None, help="also save the current results to this JSON file")
+    args = parser.parse_args(argv)
+
+    configure_logging(level="ERROR")
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    quiet = lambda message: None
+    current = run_benchmarks(sizes, repeat=args.repeat, seed=args.seed, progress=quiet)
+    if args.ui:
+        from benchmarks.ui import run_ui_benchmarks
+        current["results"].extend(run_ui_benchmarks(sizes, repeat=max(args.repeat // 5, 3), seed=args.seed,
+                                                    progress=quiet)["results"])
+    if args.output:
+        save_report(current, args.output)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    if args.update_baseline:
+        new_baseline = merge_baseline(baseline or {}, current, args.ui)
+        save_report(new_baseline, args.baseline)
+        print(f"Baseline written to {args.baseline} ({len(new_baseline['results'])} results)")
+        if not any(is_ui(r["scenario"]) for r in new_baseline["results"]):
+            print("Note: the baseline has no page benchmarks; record them with --ui --update-baseline.")
+        return 0
+
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline first.")
+        return 2
+
+    mismatched = environment_mismatch(baseline, current)
+    if mismatched:
+        print(f"Warning: baseline was recorded with a different {', '.join(mismatched)}; "
+              f"consider --update-baseline on this machine before comparing.")
+
+    rows = compare(baseline, current, args.tolerance, args.min_delta_ms, args.noise_factor,
+                   args.write_tolerance, include_ui=args.ui)
+    print(format_diff(rows))
+    regressions = [row for row in rows if row["status"] == "regression"]
+    unchecked = missing_ui_baselines(rows)
+    if regressions:
+        print(f"\nFAILED: {len(regressions)} scenario(s) slower than the baseline allows.")
+    if unchecked:
+        print(f"\nFAILED: {len(unchecked)} page benchmark(s) have no baseline entry; "
+              f"record them with --ui --update-baseline.")
+    if regressions or unchecked:
+        return 1
+    print("\nOK: no regressions beyond tolerance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
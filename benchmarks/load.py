@@ -0,0 +1,203 @@
+"""
+Load test: many simulated users hitting one shared database from several threads or processes.
+
+    python -m benchmarks.load --tasks 100k --tasks-per-user 50 --workers 1,2,4,8,16 --duration 10
+
+Each worker opens its own DatabaseManager and runs a mixed workload (filter, search, add,
+toggle, habit completion) for random user_ids. The report shows where throughput stops
+growing with more workers, latency percentiles per operation, SQLITE_BUSY errors and the
+time writers spent waiting for the database lock.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from logSetup import configure_logging
+from databaseManagement import DatabaseManager
+from queryProfiler import percentile
+from retryPolicy import is_busy_error
+from benchmarks.dataset import ensure_database, parse_size, reference_clock
+from benchmarks.runner import GET_TASKS_FILTERS, environment_info, save_report
+
+# (operation, weight): mostly reads, like a planner that is looked at more than edited
+OPERATIONS = [("filter", 40), ("search", 15), ("toggle", 20), ("add", 10), ("habit", 15)]
+SEARCH_WORDS = ["report", "math", "draft", "meeting", "zzqx"]
+_WRITE_KEYWORDS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class WorkerStats:
+    """Query observer plus per-operation timings for one worker. Plain dicts/lists so it pickles for processes."""
+
+    def __init__(self, uncontended_write_s=0.0):
+        self.uncontended_write_s = uncontended_write_s
+        self.latencies = {name: [] for name, _ in OPERATIONS}
+        self.failures = {name: 0 for name, _ in OPERATIONS}
+        self.busy_errors = 0
+        self.write_statements = []
+        self.lock_wait_s = 0.0
+
+    def record(self, query, params, elapsed, rows, error=None):
+        """Query observer callback (see DatabaseManager.add_query_observer)."""
+        if error is not None and is_busy_error(error):
+            self.busy_errors += 1
+        if query.lstrip().upper().startswith(_WRITE_KEYWORDS):
+            self.write_statements.append(elapsed)
+            # sqlite waits for the lock inside execute/commit, so time beyond an uncontended write is lock wait
+            self.lock_wait_s += max(elapsed - self.uncontended_write_s, 0.0)
+
+    def as_dict(self, retry_stats):
+        return {
+            "retries": retry_stats["retries"],
+            "retry_wait_s": retry_stats["wait_time"],
+            "gave_up": retry_stats["gave_up"],
+            "latencies": self.latencies,
+            "failures": self.failures,
+            "busy_errors": self.busy_errors,
+            "write_statements": self.write_statements,
+            "lock_wait_s": self.lock_wait_s,
+        }
+
+
+def _run_operation(db, rng, operation, n_users, max_task_id, max_rtask_id, category_ids):
+    user_id = rng.randint(1, n_users)
+    if operation == "filter":
+        db.get_tasks(user_id, rng.choice(GET_TASKS_FILTERS))
+        return True
+    if operation == "search":
+        db.search_tasks(user_id, rng.choice(SEARCH_WORDS))
+        return True
+    if operation == "toggle":
+        ongoing_id, completed_id = category_ids
+        return db.update_task_category(rng.randint(1, max_task_id), rng.choice((ongoing_id, completed_id)))
+    if operation == "add":
+        return db.add_task(user_id, "Load test task", None, "Not urgent", db.clock.today_str(), category_ids[0]) is not None
+    if operation == "habit":
+        return db.update_recurring_task_completion(rng.randint(1, max_rtask_id), db.clock.today_str())
+    raise ValueError(operation)
+
+
+def run_worker(db_path, worker_id, seed, duration, start_at, uncontended_write_s=0.0):
+    """One simulated client: run random operations from start_at (time.time()) for `duration` seconds."""
+    configure_logging(level="CRITICAL")
+    rng = random.Random(seed * 1000 + worker_id)
+    db = DatabaseManager(db_path, clock=reference_clock())
+    stats = WorkerStats(uncontended_write_s)
+    n_users = db._fetch_one("SELECT COUNT(*) FROM users")[0]
+    max_task_id = db._fetch_one("SELECT MAX(task_id) FROM tasks")[0] or 1
+    max_rtask_id = db._fetch_one("SELECT MAX(rtask_id) FROM recurring_tasks")[0] or 1
+    category_ids = (db.get_category_id_by_name("On-going"), db.get_category_id_by_name("Completed"))
+    names = [name for name, _ in OPERATIONS]
+    weights = [weight for _, weight in OPERATIONS]
+    db.add_query_observer(stats.record)
+
+    # Start together so every worker competes for the whole measured window
+    time.sleep(max(start_at - time.time(), 0))
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        operation = rng.choices(names, weights)[0]
+        started_at = time.perf_counter()
+        ok = _run_operation(db, rng, operation, n_users, max_task_id, max_rtask_id, category_ids)
+        stats.latencies[operation].append(time.perf_counter() - started_at)
+        if not ok:
+            stats.failures[operation] += 1
+    db._close()
+    return stats.as_dict(db.retry_policy.stats())
+
+
+def run_load(db_path, workers, mode, duration, seed, uncontended_write_s=0.0):
+    """Run `workers` clients as threads or processes; returns the merged summary."""
+    executor_class = ProcessPoolExecutor if mode == "processes" else ThreadPoolExecutor
+    start_at = time.time() + (2.0 if mode == "processes" else 0.5)
+    with executor_class(max_workers=workers) as executor:
+        futures = [executor.submit(run_worker, db_path, worker_id, seed, duration, start_at, uncontended_write_s)
+                   for worker_id in range(workers)]
+        results = [future.result() for future in futures]
+
+    summary = {"mode": mode, "workers": workers, "duration_s": duration, "operations": {}}
+    total_ops = 0
+    for name, _ in OPERATIONS:
+        samples = sorted(sample for result in results for sample in result["latencies"][name])
+        failures = sum(result["failures"][name] for result in results)
+        total_ops += len(samples)
+        summary["operations"][name] = {
+            "count": len(samples),
+            "failures": failures,
+            "ops_per_s": len(samples) / duration,
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+        }
+    writes = sorted(sample for result in results for sample in result["write_statements"])
+    summary["throughput_ops_per_s"] = total_ops / duration
+    summary["busy_errors"] = sum(result["busy_errors"] for result in results)
+    summary["retries"] = sum(result["retries"] for result in results)
+    summary["retry_wait_s"] = sum(result["retry_wait_s"] for result in results)
+    summary["gave_up"] = sum(result["gave_up"] for result in results)
+    summary["write_statements"] = len(writes)
+    summary["write_p99_ms"] = percentile(writes, 0.99) * 1000
+    summary["lock_wait_s"] = sum(result["lock_wait_s"] for result in results)
+    # Share of all worker time spent waiting for the write lock
+    summary["lock_wait_fraction"] = summary["lock_wait_s"] / (duration * workers)
+    return summary
+
+
+def calibrate_write_cost(db_path, seed, duration=1.0):
+    """p50 of a write statement with a single client, used as the 'no waiting' cost."""
+    result = run_worker(db_path, 0, seed, duration, time.time())
+    return percentile(sorted(result["write_statements"]), 0.50)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="Concurrent load test for DatabaseManager.")
+    parser.add_argument("--tasks", default="100k", help="tasks in the generated database (default: %(default)s)")
+    parser.add_argument("--tasks-per-user", type=int, default=50,
+                        help="controls how many user_ids there are (default: %(default)s -> 2,000 users per 100k tasks)")
+    parser.add_argument("--workers", default="1,2,4,8,16", help="comma separated worker counts (default: %(default)s)")
+    parser.add_argument("--mode", choices=["threads", "processes", "both"], default="both")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=None, help="where generated databases are cached (default: benchmarks/data)")
+    parser.add_argument("--output", default=None, help="JSON results file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    configure_logging(level="CRITICAL")
+    data_dir = args.data_dir or os.path.join(os.path.dirname(__file__), "data")
+    source_path = ensure_database(data_dir, parse_size(args.tasks), seed=args.seed, tasks_per_user=args.tasks_per_user)
+    modes = ["threads", "processes"] if args.mode == "both" else [args.mode]
+    worker_counts = [int(count) for count in args.workers.split(",") if count.strip()]
+
+    report = {"environment": environment_info(), "tasks": parse_size(args.tasks),
+              "tasks_per_user": args.tasks_per_user, "runs": []}
+    work_dir = tempfile.mkdtemp(prefix="timeplan_load_")
+    try:
+        work_path = os.path.join(work_dir, "load.db")
+        shutil.copyfile(source_path, work_path)
+        uncontended_write_s = calibrate_write_cost(work_path, args.seed)
+        report["uncontended_write_ms"] = uncontended_write_s * 1000
+        print(f"Uncontended write: {uncontended_write_s * 1000:.3f} ms")
+        print(f"{'mode':<10}{'workers':>8}{'ops/s':>10}{'max p50':>9}{'max p99':>9}{'busy':>7}{'retries':>9}{'failed':>8}{'lock wait':>11}")
+        for mode in modes:
+            for workers in worker_counts:
+                # Fresh copy per run so earlier runs' writes don't change the data
+                shutil.copyfile(source_path, work_path)
+                summary = run_load(work_path, workers, mode, args.duration, args.seed, uncontended_write_s)
+                report["runs"].append(summary)
+                all_p50 = max(op["p50_ms"] for op in summary["operations"].values())
+                all_p99 = max(op["p99_ms"] for op in summary["operations"].values())
+                print(f"{mode:<10}{workers:>8}{summary['throughput_ops_per_s']:>10,.0f}{all_p50:>9.2f}{all_p99:>9.2f}"
+                      f"{summary['busy_errors']:>7}{summary['retries']:>9}{summary['gave_up']:>8}"
+                      f"{summary['lock_wait_fraction'] * 100:>10.1f}%")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results",
+                                         "load-" + time.strftime("%Y%m%d-%H%M%S") + ".json")
+    save_report(report, output)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from databaseManagement import DatabaseManager
+from queryProfiler import percentile
+from benchmarks.dataset import ensure_database, reference_clock
+
+GET_TASKS_FILTERS = ["Today", "Next 7 Days", "All Tasks", "On-going", "Completed", "Missed"]
+# A common word from dataset.TITLE_WORDS and one that never matches
+SEARCH_TERMS = {"common": "report", "no_match": "zzqx"}
+
+BENCH_USER_ID = 1
+
+
+class Scenario:
+    """One timed operation. run() does the work and returns how many rows it returned or touched."""
+
+    def __init__(self, name, run):
+        self.name = name
+        self.run = run
+
+
+def summarize(name, size, samples, rows):
+    """Turn per-call timings (seconds) and row counts into the JSON result for one scenario."""
+    ordered = sorted(samples)
+    total_time = sum(ordered)
+    total_rows = sum(rows)
+    return {
+        "scenario": name,
+        "size": size,
+        "runs": len(ordered),
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "mean_ms": total_time * 1000 / len(ordered) if ordered else 0.0,
+        "rows_per_run": total_rows / len(rows) if rows else 0,
+        "rows_per_s": total_rows / total_time if total_time else 0.0,
+    }
+
+
+def build_scenarios(db, rng):
+    """Read scenarios first, then the writes (they change the data the reads would see)."""
+    scenarios = []
+    for filter_type in GET_TASKS_FILTERS:
+        scenarios.append(Scenario(f"get_tasks[{filter_type}]",
+                                  lambda f=filter_type: len(db.get_tasks(BENCH_USER_ID, f))))
+    for label, term in SEARCH_TERMS.items():
+        scenarios.append(Scenario(f"search_tasks[{label}]",
+                                  lambda t=term: len(db.search_tasks(BENCH_USER_ID, t))))
+    scenarios.append(Scenario("get_recurring_tasks", lambda: len(db.get_recurring_tasks(BENCH_USER_ID))))
+
+    max_task_id = db._fetch_one("SELECT MAX(task_id) FROM tasks")[0] or 1
+
+    def add_task():
+        return 1 if db.add_task(BENCH_USER_ID, "Benchmark task", "inserted by the benchmark", "Urgent",
+                                db.clock.today_str(), db.get_category_id_by_name("On-going")) else 0
+
+    def update_task():
+        task_id = rng.randint(1, max_task_id)
+        return 1 if db.update_task_details(task_id, task_title=f"Renamed {task_id}", priority="Not urgent") else 0
+
+    def update_past_due_tasks():
+        # A new day each run, so every sweep has the previous day's tasks to move
+        db.clock.advance(days=1)
+        changes_before = db.conn.total_changes
+        db.update_past_due_tasks()
+        return db.conn.total_changes - changes_before
+
+    scenarios.append(Scenario("add_task", add_task))
+    scenarios.append(Scenario("update_task_details", update_task))
+    scenarios.append(Scenario("update_past_due_tasks", update_past_due_tasks))
+    return scenarios
+
+
+def run_size(size, repeat, seed, data_dir, warmup=2):
+    """Benchmark every scenario against a fresh copy of the generated database for `size` tasks."""
+    source_path = ensure_database(data_dir, size, seed=seed)
+    work_dir = tempfile.mkdtemp(prefix="timeplan_bench_")
+    work_path = os.path.join(work_dir, os.path.basename(source_path))
+    shutil.copyfile(source_path, work_path)
+    db = DatabaseManager(work_path, clock=reference_clock())
+    rng = random.Random(seed)
+    results = []
+    try:
+        for scenario in build_scenarios(db, rng):
+            for _ in range(warmup):
+                scenario.run()
+            samples, rows = [], []
+            for _ in range(repeat):
+                started_at = time.perf_counter()
+                rows.append(scenario.run())
+                samples.append(time.perf_counter() - started_at)
+            results.append(summarize(scenario.name, size, samples, rows))
+    finally:
+        db._close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def environment_info():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+    }
+
+
+def run_benchmarks(sizes, repeat=20, seed=42, data_dir=None, progress=print):
+    """Run all scenarios for every size. Returns the JSON-ready report."""
+    data_dir = data_dir or os.path.join(os.path.dirname(__file__), "data")
+    report = {"environment": environment_info(), "seed": seed, "repeat": repeat, "results": []}
+    for size in sizes:
+        progress(f"Benchmarking {size:,} tasks...")
+        for result in run_size(size, repeat, seed, data_dir):
+            report["results"].append(result)
+            progress(f"  {result['scenario']:<28} p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  "
+                     f"p99 {result['p99_ms']:9.3f} ms  {result['rows_per_s']:>12,.0f} rows/s")
+    return report
+
+
+def save_report(report, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
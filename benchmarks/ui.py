@@ -0,0 +1,187 @@
+"""
+Headless render benchmarks for the CustomTkinter app (test1.TimePlanApp).
+
+Starts Xvfb when there is no display, opens the app on a copy of a generated database
+and times first paint, every tasks filter, the calendar and habit pages and search
+keystrokes, together with widget counts and RSS.
+
+Run from the repository root:
+    python -m benchmarks.ui --sizes 1k,10k --repeat 5
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from logSetup import configure_logging
+from uiPerf import count_widgets
+from benchmarks.dataset import ensure_database, parse_size, reference_clock
+from benchmarks.runner import GET_TASKS_FILTERS, SEARCH_TERMS, environment_info, save_report, summarize
+
+
+def current_rss_bytes():
+    """Resident set size of this process (Linux /proc, falling back to the peak RSS from getrusage)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux but bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class VirtualDisplay:
+    """Runs Xvfb on a free display number while the block runs (no-op if a display already exists)."""
+
+    def __init__(self, display=99, size="1280x800x24"):
+        self.display = display
+        self.size = size
+        self.process = None
+        self._previous_display = None
+
+    def __enter__(self):
+        if os.environ.get("DISPLAY"):
+            return self
+        if shutil.which("Xvfb") is None:
+            raise RuntimeError("No DISPLAY and Xvfb is not installed (apt install xvfb)")
+        self._previous_display = os.environ.get("DISPLAY")
+        self.process = subprocess.Popen(["Xvfb", f":{self.display}", "-screen", "0", self.size, "-nolisten", "tcp"],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.environ["DISPLAY"] = f":{self.display}"
+        # Wait for the X socket to appear
+        socket_path = f"/tmp/.X11-unix/X{self.display}"
+        deadline = time.monotonic() + 10
+        while not os.path.exists(socket_path):
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"Xvfb did not start on :{self.display}")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+            self.process = None
+            if self._previous_display is None:
+                os.environ.pop("DISPLAY", None)
+            else:
+                os.environ["DISPLAY"] = self._previous_display
+
+
+def find_widget(root, widget_class):
+    """Get the first descendant of root that is an instance of widget_class (depth-first), or None."""
+    pending = list(reversed(root.winfo_children()))
+    while pending:
+        widget = pending.pop()
+        if isinstance(widget, widget_class):
+            return widget
+        pending.extend(reversed(widget.winfo_children()))
+    return None
+
+
+def time_call(app, action):
+    """Time action() until every pending event (layout, redraw) has been processed."""
+    started_at = time.perf_counter()
+    action()
+    app.update()
+    return time.perf_counter() - started_at
+
+
+def _result(name, size, samples, app):
+    result = summarize(name, size, samples, [0] * len(samples))
+    del result["rows_per_run"], result["rows_per_s"]
+    result["widgets"] = count_widgets(app)
+    result["rss_mb"] = current_rss_bytes() / (1024 * 1024)
+    return result
+
+
+def run_size(size, repeat, seed, data_dir):
+    # Imported here so DISPLAY is set before tkinter/customtkinter are loaded
+    import customtkinter as ctk
+    from test1 import TimePlanApp
+
+    source_path = ensure_database(data_dir, size, seed=seed)
+    work_dir = tempfile.mkdtemp(prefix="timeplan_ui_bench_")
+    work_path = os.path.join(work_dir, os.path.basename(source_path))
+    shutil.copyfile(source_path, work_path)
+    results = []
+    app = None
+    try:
+        started_at = time.perf_counter()
+        app = TimePlanApp(clock=reference_clock(), db_name=work_path)
+        app.update()
+        results.append(_result("first_paint", size, [time.perf_counter() - started_at], app))
+
+        for filter_type in GET_TASKS_FILTERS:
+            samples = [time_call(app, lambda: app.show_tasks_page(filter_type)) for _ in range(repeat)]
+            results.append(_result(f"show_tasks_page[{filter_type}]", size, samples, app))
+
+        samples = [time_call(app, app.show_calendar_page) for _ in range(repeat)]
+        results.append(_result("show_calendar_page", size, samples, app))
+
+        samples = [time_call(app, app.show_habit_page) for _ in range(repeat)]
+        results.append(_result("show_habit_page", size, samples, app))
+
+        # Type the search term one key at a time; every keystroke re-runs the search
+        app.show_search_dialog()
+        app.update()
+        dialog = [child for child in app.winfo_children() if isinstance(child, ctk.CTkToplevel)][-1]
+        entry = find_widget(dialog, ctk.CTkEntry)
+        samples = []
+        for _ in range(repeat):
+            entry.delete(0, "end")
+            app.update()
+            for character in SEARCH_TERMS["common"]:
+                samples.append(time_call(app, lambda c=character: entry.insert("end", c)))
+        results.append(_result("search_keystroke", size, samples, app))
+        dialog.grab_release()
+        dialog.destroy()
+    finally:
+        if app is not None:
+            app.on_closing()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def run_ui_benchmarks(sizes, repeat=5, seed=42, data_dir=None, progress=print):
+    data_dir = data_dir or os.path.join(os.path.dirname(__file__), "data")
+    # The stall watchdog would only measure the benchmark itself
+    os.environ["TIMEPLAN_STALL_MS"] = "0"
+    report = {"environment": environment_info(), "seed": seed, "repeat": repeat, "results": []}
+    with VirtualDisplay():
+        for size in sizes:
+            progress(f"UI benchmark with {size:,} tasks...")
+            for result in run_size(size, repeat, seed, data_dir):
+                report["results"].append(result)
+                progress(f"  {result['scenario']:<28} p50 {result['p50_ms']:9.1f} ms  p95 {result['p95_ms']:9.1f} ms  "
+                         f"{result['widgets']:>6} widgets  {result['rss_mb']:7.1f} MB RSS")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.ui", description="Benchmark TimePlanApp page rendering.")
+    parser.add_argument("--sizes", default="1k,10k", help="comma separated task counts (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per scenario (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42, help="dataset seed (default: %(default)s)")
+    parser.add_argument("--data-dir", default=None, help="where generated databases are cached (default: benchmarks/data)")
+    parser.add_argument("--output", default=None,
+                        help="JSON results file (default: benchmarks/results/ui-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    configure_logging(level="ERROR")
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    report = run_ui_benchmarks(sizes, repeat=args.repeat, seed=args.seed, data_dir=args.data_dir)
+    output = args.output or os.path.join(os.path.dirname(__file__), "results",
+                                         "ui-" + time.strftime("%Y%m%d-%H%M%S") + ".json")
+    save_report(report, output)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import logging
+import sqlite3
+
+logger = logging.getLogger("timeplan.changes")
+
+
+class DataChangeNotifier:
+    """
+    Tells subscribers when the database file was changed, instead of re-querying on a timer.
+
+    PRAGMA data_version on a connection of our own changes whenever any other connection
+    (including this app's short-lived ones) commits to the file. It is only read when there
+    is a reason to: after this process writes (request_check), when the window gets the
+    focus back (another instance may have written in the meantime) and, if poll_ms is set,
+    every poll_ms. An idle window does no database work at all.
+
+    Example:
+        notifier = DataChangeNotifier(root, "timePlanDB.db")
+        notifier.subscribe(refresh_dashboard)
+        notifier.start()
+        ...
+        notifier.request_check()  # after committing a change
+    """
+
+    def __init__(self, widget, db_name, poll_ms=0):
+        self.widget = widget
+        self.db_name = db_name
+        self.poll_ms = poll_ms
+        self.callbacks = []
+        self.checks = 0
+        self.changes = 0
+        self._conn = None
+        self._version = None
+        self._check_pending = None
+        self._poll_after_id = None
+        self._focus_binding = None
+
+    def subscribe(self, callback):
+        """Register callback() to run (on the Tk thread) after a change was detected."""
+        if callback not in self.callbacks:
+            self.callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def start(self):
+        try:
+            self._conn = sqlite3.connect(self.db_name)
+            self._version = self._read_version()
+        except sqlite3.Error as e:
+            logger.warning("Change notifications disabled, cannot open %s: %s", self.db_name, e)
+            self._conn = None
+            return self
+        self._focus_binding = self.widget.bind("<FocusIn>", lambda event: self.request_check(), add="+")
+        if self.poll_ms:
+            self._poll_after_id = self.widget.after(self.poll_ms, self._poll)
+        return self
+
+    def stop(self):
+        for after_id in (self._check_pending, self._poll_after_id):
+            if after_id is not None:
+                try:
+                    self.widget.after_cancel(after_id)
+                except Exception:
+                    pass
+        self._check_pending = None
+        self._poll_after_id = None
+        if self._focus_binding is not None:
+            try:
+                self.widget.unbind("<FocusIn>", self._focus_binding)
+            except Exception:
+                pass
+            self._focus_binding = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _read_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def request_check(self):
+        """Check for changes once the current event is handled (several requests make one check)."""
+        if self._conn is None or self._check_pending is not None:
+            return
+        self._check_pending = self.widget.after_idle(self._run_pending_check)
+
+    def _run_pending_check(self):
+        self._check_pending = None
+        self.check()
+
+    def check(self):
+        """Compare data_version with the last one seen; run the callbacks and return True if it changed."""
+        if self._conn is None:
+            return False
+        self.checks += 1
+        try:
+            version = self._read_version()
+        except sqlite3.Error as e:
+            logger.warning("Reading data_version failed: %s", e)
+            return False
+        if version == self._version:
+            return False
+        self._version = version
+        self.changes += 1
+        for callback in list(self.callbacks):
+            try:
+                callback()
+            except Exception as e:
+                logger.exception("Change callback error: %s", e)
+        return True
+
+    def _poll(self):
+        self._poll_after_id = self.widget.after(self.poll_ms, self._poll)
+        self.check()
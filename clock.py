@@ -0,0 +1,115 @@
+import time as _time
+from datetime import datetime, timedelta, time
+from functools import lru_cache
+import pytz # Make sure pytz is installed: pip install pytz
+
+DEFAULT_TIMEZONE = 'Asia/Manila'
+
+
+@lru_cache(maxsize=None)
+def get_timezone(timezone_name):
+    """Get the pytz timezone for a name. Timezone lookups are cached, so this is cheap to call."""
+    return pytz.timezone(timezone_name)
+
+
+def is_valid_timezone(timezone_name):
+    """Check if a timezone name is known to pytz (e.g. 'Asia/Manila')."""
+    return timezone_name in pytz.all_timezones_set
+
+
+class Clock:
+    """
+    Central source of "now" and "today" for the app.
+
+    The tzinfo is looked up once, and today's date is computed once per local day
+    and reused until the next local midnight, so render loops can call today() freely.
+    """
+
+    def __init__(self, timezone_name=DEFAULT_TIMEZONE):
+        self.set_timezone(timezone_name)
+
+    def set_timezone(self, timezone_name):
+        """Switch the clock to another timezone (e.g. a user's own setting)."""
+        self.timezone_name = timezone_name
+        self.tzinfo = get_timezone(timezone_name)
+        # Invalidate the cached day
+        self._today = None
+        self._today_str = None
+        self._day_starts_at = 0.0
+        self._day_ends_at = 0.0
+
+    def _timestamp(self):
+        """Current POSIX timestamp. FakeClock overrides this."""
+        return _time.time()
+
+    def now(self):
+        """Get the current time as an aware datetime in the clock's timezone."""
+        return datetime.fromtimestamp(self._timestamp(), self.tzinfo)
+
+    def today(self):
+        """Get the current local date (cached until the next local midnight)."""
+        timestamp = self._timestamp()
+        if self._today is None or not (self._day_starts_at <= timestamp < self._day_ends_at):
+            self._set_day(datetime.fromtimestamp(timestamp, self.tzinfo).date())
+        return self._today
+
+    def today_str(self):
+        """Get the current local date in 'YYYY-MM-DD' format."""
+        self.today()
+        return self._today_str
+
+    def today_in(self, timezone_name):
+        """Get the current date in another timezone (e.g. another user's), without switching the clock."""
+        if timezone_name == self.timezone_name:
+            return self.today()
+        return datetime.fromtimestamp(self._timestamp(), get_timezone(timezone_name)).date()
+
+    def seconds_until_next_midnight(self):
+        """Get the number of seconds until the next local midnight."""
+        self.today()
+        return max(self._day_ends_at - self._timestamp(), 0)
+
+    def _set_day(self, local_date):
+        self._today = local_date
+        self._today_str = local_date.strftime('%Y-%m-%d')
+        # localize() picks the right UTC offset for each midnight (matters for zones with DST)
+        day_start = self.tzinfo.localize(datetime.combine(local_date, time.min))
+        day_end = self.tzinfo.localize(datetime.combine(local_date + timedelta(days=1), time.min))
+        self._day_starts_at = day_start.timestamp()
+        self._day_ends_at = day_end.timestamp()
+
+
+class FakeClock(Clock):
+    """
+    A Clock that only moves when told to. Inject it into DatabaseManager / TimePlanApp
+    for tests and benchmarks that need deterministic dates.
+
+    Example:
+        clock = FakeClock(datetime(2025, 6, 30, 23, 59))
+        clock.advance(minutes=1)   # now it's July 1st
+    """
+
+    def __init__(self, start=None, timezone_name=DEFAULT_TIMEZONE):
+        super().__init__(timezone_name)
+        self._fake_timestamp = _time.time() if start is None else self._to_timestamp(start)
+
+    def _timestamp(self):
+        return self._fake_timestamp
+
+    def _to_timestamp(self, value):
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            value = datetime.strptime(value, '%Y-%m-%d')
+        if value.tzinfo is None:
+            # Naive datetimes are taken as local time in the clock's timezone
+            value = self.tzinfo.localize(value)
+        return value.timestamp()
+
+    def set(self, value):
+        """Jump to a datetime, 'YYYY-MM-DD' string (local midnight) or POSIX timestamp."""
+        self._fake_timestamp = self._to_timestamp(value)
+
+    def advance(self, **kwargs):
+        """Move the clock forward by a timedelta given as keyword arguments (days=1, hours=2, ...)."""
+        self._fake_timestamp += timedelta(**kwargs).total_seconds()
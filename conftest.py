@@ -0,0 +1,2 @@
+# The app entry points and old copies at the top level are scripts, not test modules
+collect_ignore = ["test.py", "test1.py", "testCustomTkinter.py", "testQT.py", "backUpFile.py", "fix_syntax.py"]
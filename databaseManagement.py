@@ -1,10 +1,73 @@
 import sqlite3
-from datetime import datetime, timedelta
-import pytz # Make sure pytz is installed: pip install pytz
+import time
+import logging
+import uuid
+from datetime import timedelta
+from clock import Clock, DEFAULT_TIMEZONE, is_valid_timezone
+from taskRows import Task, RecurringTask
+from dateUtils import parse_date
+from logSetup import SCHEMA_LOGGER_NAME
+from retryPolicy import RetryPolicy
+from eventBus import (EventBus, TaskAdded, TaskUpdated, TaskDeleted, TaskCategoryChanged, TaskArchived,
+                      TaskRestored, HabitAdded, HabitUpdated, HabitDeleted, HabitCompleted, HabitStatusChanged,
+                      DayRolledOver)
+
+logger = logging.getLogger("timeplan.db")
+schema_logger = logging.getLogger(SCHEMA_LOGGER_NAME)
+
+
+class VersionConflict(Exception):
+    """
+    Raised by an update called with expected_version when the row was changed by someone else
+    since that version was read. current_version is the row's version now.
+    """
+
+    def __init__(self, table, row_id, expected_version, current_version):
+        super().__init__(f"{table} row {row_id} is at version {current_version}, expected {expected_version}")
+        self.table = table
+        self.row_id = row_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
 
 class DatabaseManager:
-    def __init__(self, db_name='timePlanDB.db'):
+    # app_state key that exists only inside an archive/restore transaction; the change_log, tombstone
+    # and statistics triggers check it so moving rows between tasks and tasks_archive isn't a change
+    ARCHIVE_FLAG_KEY = 'archive_in_progress'
+    # Completed/Missed tasks due more than this many days ago are moved to tasks_archive
+    ARCHIVE_RETENTION_DAYS = 180
+    # Columns copied between tasks and tasks_archive
+    ARCHIVE_COLUMNS = ("task_id, task_title, description, priority_id, due_date, user_id, category_id, "
+                       "created_at, updated_at, version, sync_id")
+
+    # ORDER BY clauses for the get_tasks sort modes. On "All Tasks" each one is read in order from
+    # an index created in create_tables (no temp B-tree); the category filters use the category
+    # index and sort their smaller result. Every mode ends with task_id (the rowid, last in every
+    # index) so ties come back in a stable order. Priorities are ordered by priority_id, which
+    # create_tables assigns in priority_level order, so the join isn't needed for sorting.
+    TASK_SORT_ORDERS = {
+        'due_date': "t.due_date IS NULL, t.due_date ASC, t.priority_id ASC, t.task_id ASC",
+        'due_date_desc': "t.due_date DESC, t.task_id DESC",
+        'priority': "t.priority_id ASC, t.due_date IS NULL, t.due_date ASC, t.task_id ASC",
+        'created': "t.created_at DESC, t.task_id DESC",
+        'updated': "t.updated_at DESC, t.task_id DESC",
+        'title': "t.task_title COLLATE NOCASE ASC, t.task_id ASC",
+    }
+
+    def __init__(self, db_name='timePlanDB.db', clock=None, retry_policy=None, busy_timeout=1.0):
         self.db_name = db_name
+        # Busy/locked errors (another instance is writing) are retried with backoff; see RetryPolicy
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+        # How long sqlite itself waits for a lock before a statement fails with "database is locked"
+        self.busy_timeout = busy_timeout
+        # All "today"/"now" lookups go through the clock (pass a FakeClock for deterministic tests)
+        self.clock = clock if clock else Clock()
+        # Callbacks run after every statement: observer(query, params, elapsed, rows, error)
+        self.query_observers = []
+        # Change events (task added/updated/deleted, habit completed) published after successful writes
+        self.events = EventBus()
+        # category_name -> category_id (categories rarely change, so don't look them up on every get_tasks)
+        self._category_id_cache = {}
         self.conn = None
         self.cursor = None
         self._connect()
@@ -13,15 +76,16 @@ class DatabaseManager:
     def _connect(self, retries=3):
         for i in range(retries):
             try:
-                self.conn = sqlite3.connect(self.db_name)
+                # IMMEDIATE: INSERT/UPDATE/DELETE open their transaction with BEGIN IMMEDIATE, so a writer
+                # takes the write lock up front instead of failing on a read->write lock upgrade
+                self.conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout, isolation_level="IMMEDIATE")
                 self.cursor = self.conn.cursor()
-                print(f"Connected to database: {self.db_name}")
+                logger.debug("Connected to database: %s", self.db_name)
                 return True
             except sqlite3.Error as e:
-                print(f"Database connection error (attempt {i+1}/{retries}): {e}")
+                logger.warning("Database connection error (attempt %d/%d): %s", i + 1, retries, e)
                 if i < retries - 1:
-                    import time
-                    time.sleep(1) # Wait a bit before retrying
+                    self.retry_policy.wait(i)
         self.conn = None
         self.cursor = None
         return False
@@ -29,42 +93,131 @@ class DatabaseManager:
     def _close(self):
         if self.conn:
             self.conn.close()
-            print("Database connection closed.")
+            logger.debug("Database connection closed.")
+
+    # --- Query observers (profiling / instrumentation) ---
+    def add_query_observer(self, observer):
+        """Register observer(query, params, elapsed_seconds, rows, error) to run after every statement."""
+        if observer not in self.query_observers:
+            self.query_observers.append(observer)
+
+    def remove_query_observer(self, observer):
+        if observer in self.query_observers:
+            self.query_observers.remove(observer)
+
+    def _notify_query(self, query, params, started_at, rows, error=None):
+        if not self.query_observers:
+            return
+        elapsed = time.perf_counter() - started_at
+        for observer in self.query_observers:
+            try:
+                observer(query, params, elapsed, rows, error)
+            except Exception as e:
+                logger.exception("Query observer error: %s", e)
+
+    def _run_with_retry(self, query, params, run):
+        """
+        Call run() -> (result, row_count) and notify the observers. Busy/locked errors are retried
+        as self.retry_policy allows; any other error (or running out of retries) is raised.
+        """
+        attempt = 0
+        while True:
+            started_at = time.perf_counter()
+            try:
+                result, rows = run()
+                self._notify_query(query, params, started_at, rows)
+                return result
+            except sqlite3.Error as e:
+                self._notify_query(query, params, started_at, 0, e)
+                if not self.retry_policy.should_retry(e, attempt):
+                    raise
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                logger.debug("Database busy, retrying (attempt %d): %s", attempt + 1, e)
+                self.retry_policy.wait(attempt)
+                attempt += 1
 
     def _execute_query(self, query, params=()):
         if not self.conn:
             if not self._connect(): # Attempt to reconnect if not connected
-                print("Failed to execute query: Not connected to database.")
+                logger.error("Failed to execute query: Not connected to database.")
                 return False
-        try:
+
+        def run():
             self.cursor.execute(query, params)
             self.conn.commit()
-            return True
+            return True, max(self.cursor.rowcount, 0)
+
+        try:
+            return self._run_with_retry(query, params, run)
         except sqlite3.Error as e:
-            print(f"Database query error: {e} for query: {query} with params: {params}")
+            logger.error("Database query error: %s", e, extra={"query": query, "params": params})
             self.conn.rollback() # Rollback changes on error
             return False
 
-    def _fetch_all(self, query, params=()):
+    def _execute_versioned_update(self, table, id_column, row_id, query, params, expected_version=None):
+        """
+        Run an "UPDATE ... WHERE <id_column> = ?" statement. With expected_version, the row is
+        only changed if it is still at that version; otherwise VersionConflict is raised (or
+        False is returned if the row no longer exists).
+        """
+        if expected_version is None:
+            return self._execute_query(query, params)
+        if not self._execute_query(query + " AND version = ?", tuple(params) + (expected_version,)):
+            return False
+        if self.cursor.rowcount > 0:
+            return True
+        current = self._fetch_one(f"SELECT version FROM {table} WHERE {id_column} = ?", (row_id,))
+        if current is None:
+            return False
+        raise VersionConflict(table, row_id, expected_version, current[0])
+
+    def _publish_if_changed(self, success, event):
+        """Publish event if the write that just ran succeeded and changed a row; returns success."""
+        if success and self.cursor.rowcount > 0:
+            self.events.publish(event)
+        return success
+
+    def _get_cursor(self, row_factory=None):
+        """Get the shared cursor, or a fresh one that builds rows with row_factory (e.g. Task.row_factory)."""
+        if row_factory is None:
+            return self.cursor
+        cursor = self.conn.cursor()
+        cursor.row_factory = row_factory
+        return cursor
+
+    def _fetch_all(self, query, params=(), row_factory=None):
         if not self.conn:
             if not self._connect():
                 return []
+
+        def run():
+            cursor = self._get_cursor(row_factory)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            return rows, len(rows)
+
         try:
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
+            return self._run_with_retry(query, params, run)
         except sqlite3.Error as e:
-            print(f"Database fetch error: {e} for query: {query} with params: {params}")
+            logger.error("Database fetch error: %s", e, extra={"query": query, "params": params})
             return []
 
-    def _fetch_one(self, query, params=()):
+    def _fetch_one(self, query, params=(), row_factory=None):
         if not self.conn:
             if not self._connect():
                 return None
+
+        def run():
+            cursor = self._get_cursor(row_factory)
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            return row, 1 if row is not None else 0
+
         try:
-            self.cursor.execute(query, params)
-            return self.cursor.fetchone()
+            return self._run_with_retry(query, params, run)
         except sqlite3.Error as e:
-            print(f"Database fetch error: {e} for query: {query} with params: {params}")
+            logger.error("Database fetch error: %s", e, extra={"query": query, "params": params})
             return None
 
     def create_tables(self):
@@ -116,7 +269,9 @@ class DatabaseManager:
                 user_id     INTEGER NOT NULL DEFAULT 1 REFERENCES users (user_id),
                 category_id INTEGER REFERENCES task_category (category_id) NOT NULL,
                 created_at  DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at  DATETIME DEFAULT CURRENT_TIMESTAMP
+                updated_at  DATETIME DEFAULT CURRENT_TIMESTAMP,
+                version     INTEGER NOT NULL DEFAULT 1,
+                sync_id     TEXT
             );
         """)
 
@@ -131,10 +286,63 @@ class DatabaseManager:
                 last_completed_date TEXT,
                 user_id               INTEGER NOT NULL,
                 status              TEXT    DEFAULT 'Pending',
+                updated_at          DATETIME DEFAULT CURRENT_TIMESTAMP,
+                version             INTEGER NOT NULL DEFAULT 1,
+                sync_id             TEXT,
                 FOREIGN KEY (user_id) REFERENCES users (user_id)
             );
         """)
         
+        # Indexes backing the get_tasks filters and sort modes (see TASK_SORT_ORDERS); the
+        # expressions must match the ORDER BY terms exactly for sqlite to read rows in index order
+        task_indexes = {
+            "idx_tasks_user_due": "tasks (user_id, due_date)",
+            "idx_tasks_user_category_due": "tasks (user_id, category_id, due_date)",
+            "idx_tasks_user_due_order": "tasks (user_id, due_date IS NULL, due_date, priority_id)",
+            "idx_tasks_user_priority_order": "tasks (user_id, priority_id, due_date IS NULL, due_date)",
+            "idx_tasks_user_created": "tasks (user_id, created_at)",
+            "idx_tasks_user_updated": "tasks (user_id, updated_at)",
+            "idx_tasks_user_title": "tasks (user_id, task_title COLLATE NOCASE)",
+        }
+        existing_indexes = {row[0] for row in self._fetch_all("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for index_name, index_columns in task_indexes.items():
+            self._execute_query(f"CREATE INDEX IF NOT EXISTS {index_name} ON {index_columns}")
+        if (set(task_indexes) - existing_indexes
+                and self._fetch_one("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")):
+            # The file has planner statistics (ANALYZE was run); without rows for the new indexes
+            # sqlite would guess their selectivity and may pick them for the wrong sort mode
+            self._execute_query("ANALYZE tasks")
+        # Replaced by idx_tasks_user_priority_order (its plain due_date column never matched the ORDER BY)
+        self._execute_query("DROP INDEX IF EXISTS idx_tasks_user_priority_due")
+
+        # Old Completed/Missed tasks, moved out of tasks by archive_old_tasks so the live table stays small
+        self._execute_query("""
+            CREATE TABLE IF NOT EXISTS tasks_archive (
+                task_id     INTEGER PRIMARY KEY NOT NULL,
+                task_title  TEXT    NOT NULL,
+                description TEXT,
+                priority_id INTEGER,
+                due_date    DATE,
+                user_id     INTEGER NOT NULL,
+                category_id INTEGER NOT NULL,
+                created_at  DATETIME,
+                updated_at  DATETIME,
+                version     INTEGER NOT NULL DEFAULT 1,
+                sync_id     TEXT,
+                archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        self._execute_query("CREATE INDEX IF NOT EXISTS idx_tasks_archive_user_due ON tasks_archive (user_id, due_date)")
+        self._execute_query("CREATE INDEX IF NOT EXISTS idx_tasks_archive_sync_id ON tasks_archive (sync_id)")
+
+        # Create app_state table (small key/value store for maintenance bookkeeping)
+        self._execute_query("""
+            CREATE TABLE IF NOT EXISTS app_state (
+                state_key   TEXT PRIMARY KEY NOT NULL,
+                state_value TEXT
+            );
+        """)
+        
         # Add a default user if none exists (for testing/initial setup)
         if not self._fetch_one("SELECT * FROM users WHERE user_id = 1"):
             self.add_user("default_user", "password123")
@@ -148,7 +356,371 @@ class DatabaseManager:
         
         # Update database schema for any missing columns
         self.update_database_schema()
+        self.create_version_triggers()
+        self.create_change_log()
+        self.create_sync_tables()
+        self.create_daily_stats()
+
+    # Columns whose change is an edit of a task (bookkeeping such as sync_id doesn't bump the version)
+    TASK_EDIT_COLUMNS = ("task_title", "description", "priority_id", "due_date", "category_id", "user_id")
+
+    def create_version_triggers(self):
+        """
+        Bump version and updated_at on every edit of a task or habit, whoever makes it.
+
+        The trigger's own UPDATE changes version, so it doesn't fire again. Only the
+        user-visible columns count: writing bookkeeping columns (sync_id) isn't an edit, and
+        neither is a habit status change, since status is recalculated on read (see
+        get_recurring_tasks).
+        """
+        task_edited = "\n                     OR ".join(f"NEW.{column} IS NOT OLD.{column}"
+                                                         for column in self.TASK_EDIT_COLUMNS)
+        # Databases opened by older versions have a trigger that fires on any column; replace it
+        existing = self._fetch_one("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_tasks_version'")
+        if existing and "NEW.task_title IS NOT OLD.task_title" not in existing[0]:
+            schema_logger.info("Replacing trg_tasks_version with the edit-only version...")
+            self._execute_query("DROP TRIGGER trg_tasks_version")
+        self._execute_query(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_version
+            AFTER UPDATE ON tasks
+            WHEN NEW.version = OLD.version
+                AND ({task_edited})
+            BEGIN
+                UPDATE tasks SET version = OLD.version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE task_id = NEW.task_id;
+            END;
+        """)
+        self._execute_query("""
+            CREATE TRIGGER IF NOT EXISTS trg_recurring_tasks_version
+            AFTER UPDATE ON recurring_tasks
+            WHEN NEW.version = OLD.version
+                AND (NEW.rtask_title IS NOT OLD.rtask_title
+                     OR NEW.description IS NOT OLD.description
+                     OR NEW.start_date IS NOT OLD.start_date
+                     OR NEW.recurrence_pattern IS NOT OLD.recurrence_pattern
+                     OR NEW.last_completed_date IS NOT OLD.last_completed_date
+                     OR NEW.user_id IS NOT OLD.user_id)
+            BEGIN
+                UPDATE recurring_tasks SET version = OLD.version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE rtask_id = NEW.rtask_id;
+            END;
+        """)
+
+
+    # Tables whose changes are recorded in change_log: table -> (id column, user column or None, versioned)
+    CHANGE_LOG_TABLES = {
+        "tasks": ("task_id", "user_id", True),
+        "recurring_tasks": ("rtask_id", "user_id", True),
+        "task_category": ("category_id", None, False),
+    }
+
+    def create_change_log(self):
+        """
+        Create change_log and the triggers that fill it: one row per insert/update/delete on the
+        CHANGE_LOG_TABLES, numbered by a seq that only ever goes up (AUTOINCREMENT never reuses a
+        value, even after compaction), so consumers can ask for changes_since(their last seq).
+        """
+        self._execute_query("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT    NOT NULL,
+                row_id     INTEGER NOT NULL,
+                op         TEXT    NOT NULL,
+                user_id    INTEGER,
+                changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        for table_name, (id_column, user_column, versioned) in self.CHANGE_LOG_TABLES.items():
+            new_user = f"NEW.{user_column}" if user_column else "NULL"
+            old_user = f"OLD.{user_column}" if user_column else "NULL"
+            # On versioned tables an edit is two UPDATEs (the edit, then trg_*_version bumping the
+            # version); only log the second one, and skip changes that don't count as edits
+            update_condition = "WHEN NEW.version <> OLD.version" if versioned else ""
+            # Archiving deletes from tasks and restoring inserts into it; _move_tasks logs those as
+            # one 'archive'/'restore' entry instead
+            move_condition = f"WHEN {self._not_archiving_sql()}"
+            for op, timing, row_ref, user_ref in (("insert", "AFTER INSERT", "NEW", new_user),
+                                                  ("update", "AFTER UPDATE", "NEW", new_user),
+                                                  ("delete", "AFTER DELETE", "OLD", old_user)):
+                condition = update_condition if op == "update" else move_condition
+                self._execute_query(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table_name}_log_{op}
+                    {timing} ON {table_name}
+                    {condition}
+                    BEGIN
+                        INSERT INTO change_log (table_name, row_id, op, user_id)
+                        VALUES ('{table_name}', {row_ref}.{id_column}, '{op}', {user_ref});
+                    END;
+                """)
+
+    def _not_archiving_sql(self):
+        """Trigger condition that is false while archive_old_tasks/restore_archived_task move rows."""
+        return f"NOT EXISTS (SELECT 1 FROM app_state WHERE state_key = '{self.ARCHIVE_FLAG_KEY}')"
+
+    def changes_since(self, seq, limit=500, table_name=None):
+        """
+        Get up to `limit` change_log rows after `seq`, oldest first:
+        (seq, table_name, row_id, op, user_id, changed_at). op is 'insert', 'update', 'delete', or
+        'archive'/'restore' for tasks moved into or out of tasks_archive.
+
+        Pass the last seq you processed to get the next page. If seq is below
+        change_log_truncated_seq(), compaction has dropped entries the consumer never saw and it
+        should re-read in full. After compaction only the latest entry per row is kept, so treat
+        an 'update' of a row you haven't seen as an insert.
+        """
+        query = "SELECT seq, table_name, row_id, op, user_id, changed_at FROM change_log WHERE seq > ? "
+        params = [seq]
+        if table_name:
+            query += "AND table_name = ? "
+            params.append(table_name)
+        query += "ORDER BY seq LIMIT ?"
+        params.append(limit)
+        return self._fetch_all(query, params)
+
+    def latest_change_seq(self):
+        """Get the newest change_log seq (0 if nothing was logged yet)."""
+        result = self._fetch_one("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        return result[0] if result else 0
+
+    def change_log_truncated_seq(self):
+        """Get the highest seq dropped by the retention window (0 if nothing was dropped yet)."""
+        return int(self.get_app_state('change_log_truncated_seq') or 0)
+
+    def oldest_change_seq(self):
+        """Get the oldest seq still in change_log, or None if it is empty."""
+        result = self._fetch_one("SELECT MIN(seq) FROM change_log")
+        return result[0] if result else None
+
+    # app_state keys holding the change_log seq a consumer has read up to (syncEngine's exporter)
+    CHANGE_LOG_CONSUMER_KEYS = ('sync_exported_seq',)
+
+    def change_log_consumer_seq(self):
+        """
+        Get the lowest seq every change_log consumer has read up to (the keep_after_seq for
+        compact_change_log), or None if no consumer has read anything yet. A consumer without a
+        watermark starts with a full read, so it needs no entries kept.
+        """
+        seqs = [int(value) for value in map(self.get_app_state, self.CHANGE_LOG_CONSUMER_KEYS) if value is not None]
+        return min(seqs) if seqs else None
+
+    def compact_change_log(self, retention_days=90, keep_after_seq=None):
+        """
+        Shrink change_log:
+            1. keep only the newest entry per (table, row), since consumers only need the latest state
+            2. drop entries older than retention_days
+
+        Entries after keep_after_seq (e.g. the watermark of a consumer that hasn't caught up)
+        are left alone. Returns the number of entries removed.
+        """
+        limit_seq = self.latest_change_seq() if keep_after_seq is None else keep_after_seq
+        removed = 0
+        if self._execute_query("""
+            DELETE FROM change_log
+            WHERE seq <= ?
+            AND seq NOT IN (SELECT MAX(seq) FROM change_log GROUP BY table_name, row_id)
+        """, (limit_seq,)):
+            removed += self.cursor.rowcount
+        # Collapsed entries were superseded, but expired ones may be the only record of a change,
+        # so remember how far they went (see change_log_truncated_seq)
+        retention = f"-{int(retention_days)} days"
+        expired = self._fetch_one(
+            "SELECT MAX(seq) FROM change_log WHERE seq <= ? AND changed_at < datetime('now', ?)",
+            (limit_seq, retention)
+        )
+        if expired and expired[0] and self._execute_query(
+            "DELETE FROM change_log WHERE seq <= ? AND changed_at < datetime('now', ?)",
+            (limit_seq, retention)
+        ):
+            removed += self.cursor.rowcount
+            self.set_app_state('change_log_truncated_seq', str(max(expired[0], self.change_log_truncated_seq())))
+        logger.info("Compacted change_log", extra={"removed": removed, "up_to_seq": limit_seq})
+        return removed
+
+    # Tables synced between replicas (see syncEngine): table -> id column
+    SYNC_TABLES = {"tasks": "task_id", "recurring_tasks": "rtask_id"}
+
+    def create_sync_tables(self):
+        """
+        Sync bookkeeping: a unique sync_id per task/habit (the same row has the same sync_id in every
+        replica, while task_id/rtask_id are local) and sync_tombstones, filled by triggers so a
+        delete from anywhere is still known when the next changeset is exported.
+        """
+        self._execute_query("""
+            CREATE TABLE IF NOT EXISTS sync_tombstones (
+                table_name TEXT    NOT NULL,
+                sync_id    TEXT    NOT NULL,
+                row_id     INTEGER,
+                version    INTEGER NOT NULL,
+                deleted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (table_name, sync_id)
+            );
+        """)
+        self._execute_query("CREATE INDEX IF NOT EXISTS idx_sync_tombstones_row ON sync_tombstones (table_name, row_id)")
+        for table_name, id_column in self.SYNC_TABLES.items():
+            self._execute_query(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table_name}_sync_id ON {table_name} (sync_id)")
+            # A delete is one more change, so the tombstone outranks the last version of the row
+            self._execute_query(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table_name}_tombstone
+                AFTER DELETE ON {table_name}
+                WHEN OLD.sync_id IS NOT NULL AND {self._not_archiving_sql()}
+                BEGIN
+                    INSERT OR REPLACE INTO sync_tombstones (table_name, sync_id, row_id, version, deleted_at)
+                    VALUES ('{table_name}', OLD.sync_id, OLD.{id_column}, OLD.version + 1, CURRENT_TIMESTAMP);
+                END;
+            """)
+        self.assign_missing_sync_ids()
+
+    def assign_missing_sync_ids(self):
+        """
+        Give rows written without a sync_id (older databases, bulk loads) a random one. sync_id
+        isn't an edit column, so this leaves version, updated_at and change_log alone.
+        """
+        for table_name in self.SYNC_TABLES:
+            self._execute_query(
+                f"UPDATE {table_name} SET sync_id = lower(hex(randomblob(16))) WHERE sync_id IS NULL"
+            )
+
+    def purge_sync_tombstones(self, retention_days=365):
+        """
+        Forget tombstones older than retention_days. A replica that hasn't synced for longer than
+        that could bring the deleted rows back, so keep this well above the usual sync interval.
+        """
+        return self._execute_query(
+            "DELETE FROM sync_tombstones WHERE deleted_at < datetime('now', ?)",
+            (f"-{int(retention_days)} days",)
+        )
+
+    # daily_stats counter -> category names counted in it (test.py's dashboard calls completed tasks 'Done')
+    DAILY_STATS_CATEGORIES = {
+        "completed": ("Completed", "Done"),
+        "missed": ("Missed",),
+        "ongoing": ("On-going",),
+    }
+    # The day a task counts as created on, and the day its status counts on (its due date)
+    _CREATED_DAY_SQL = "COALESCE(date({ref}.created_at), {ref}.due_date, '')"
+    _STATUS_DAY_SQL = "COALESCE({ref}.due_date, date({ref}.created_at), '')"
+
+    def _category_flag_sql(self, ref, counter):
+        names = ", ".join(f"'{name}'" for name in self.DAILY_STATS_CATEGORIES[counter])
+        return f"({ref}.category_id IN (SELECT category_id FROM task_category WHERE category_name IN ({names})))"
+
+    def _daily_stats_delta_sql(self, ref, sign):
+        """Statements adding (sign '+') or removing (sign '-') the task {ref} (NEW/OLD) from daily_stats."""
+        flags = [f"{sign}{self._category_flag_sql(ref, counter)}" for counter in self.DAILY_STATS_CATEGORIES]
+        return f"""
+            INSERT INTO daily_stats (user_id, day, created, completed, missed, ongoing)
+            VALUES ({ref}.user_id, {self._CREATED_DAY_SQL.format(ref=ref)}, {sign}1, 0, 0, 0)
+            ON CONFLICT (user_id, day) DO UPDATE SET created = created + excluded.created;
+            INSERT INTO daily_stats (user_id, day, created, completed, missed, ongoing)
+            VALUES ({ref}.user_id, {self._STATUS_DAY_SQL.format(ref=ref)}, 0, {", ".join(flags)})
+            ON CONFLICT (user_id, day) DO UPDATE SET completed = completed + excluded.completed,
+                                                     missed = missed + excluded.missed,
+                                                     ongoing = ongoing + excluded.ongoing;
+        """
+
+    def create_daily_stats(self):
+        """
+        Create daily_stats, per user and day: tasks created that day and tasks due that day by
+        status (tasks without a due date count on the day they were created). Triggers keep it
+        current, so dashboards sum a few rows per day instead of scanning every task. Archived
+        tasks stay counted (moving them doesn't touch the counters).
+        """
+        exists = self._fetch_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_stats'")
+        self._execute_query("""
+            CREATE TABLE IF NOT EXISTS daily_stats (
+                user_id   INTEGER NOT NULL,
+                day       TEXT    NOT NULL,
+                created   INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                missed    INTEGER NOT NULL DEFAULT 0,
+                ongoing   INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day)
+            );
+        """)
+        not_archiving = self._not_archiving_sql()
+        self._execute_query(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_stats_insert
+            AFTER INSERT ON tasks
+            WHEN {not_archiving}
+            BEGIN
+                {self._daily_stats_delta_sql("NEW", "+")}
+            END;
+        """)
+        self._execute_query(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_stats_delete
+            AFTER DELETE ON tasks
+            WHEN {not_archiving}
+            BEGIN
+                {self._daily_stats_delta_sql("OLD", "-")}
+            END;
+        """)
+        # Only the columns the counters depend on; the version trigger's own UPDATE doesn't fire this
+        self._execute_query(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_stats_update
+            AFTER UPDATE OF category_id, due_date, created_at, user_id ON tasks
+            WHEN OLD.category_id IS NOT NEW.category_id OR OLD.due_date IS NOT NEW.due_date
+                OR OLD.created_at IS NOT NEW.created_at OR OLD.user_id IS NOT NEW.user_id
+            BEGIN
+                {self._daily_stats_delta_sql("OLD", "-")}
+                {self._daily_stats_delta_sql("NEW", "+")}
+            END;
+        """)
+        if not exists:
+            self.rebuild_daily_stats()
+
+    def rebuild_daily_stats(self):
+        """Recount daily_stats from tasks and tasks_archive (e.g. after editing the file by hand)."""
+        all_tasks = ("(SELECT user_id, created_at, due_date, category_id FROM tasks "
+                     "UNION ALL SELECT user_id, created_at, due_date, category_id FROM tasks_archive) t")
+        flags = ", ".join(f"{self._category_flag_sql('t', counter)}" for counter in self.DAILY_STATS_CATEGORIES)
+        query = f"""
+            INSERT INTO daily_stats (user_id, day, created, completed, missed, ongoing)
+            SELECT user_id, day, SUM(created), SUM(completed), SUM(missed), SUM(ongoing) FROM (
+                SELECT t.user_id, {self._CREATED_DAY_SQL.format(ref="t")} AS day,
+                       1 AS created, 0 AS completed, 0 AS missed, 0 AS ongoing
+                FROM {all_tasks}
+                UNION ALL
+                SELECT t.user_id, {self._STATUS_DAY_SQL.format(ref="t")}, 0, {flags}
+                FROM {all_tasks}
+            )
+            GROUP BY user_id, day
+        """
+
+        def run():
+            # One transaction, so readers never see the table half rebuilt
+            self.cursor.execute("DELETE FROM daily_stats")
+            self.cursor.execute(query)
+            rows = self.cursor.rowcount
+            self.conn.commit()
+            return True, rows
+
+        try:
+            return self._run_with_retry(query, (), run)
+        except sqlite3.Error as e:
+            logger.error("Rebuilding daily_stats failed: %s", e)
+            self.conn.rollback()
+            return False
+
+    def get_daily_stats(self, user_id, start_day=None, end_day=None):
+        """Get (day, created, completed, missed, ongoing) rows for a user, oldest first, optionally limited to a day range."""
+        query = "SELECT day, created, completed, missed, ongoing FROM daily_stats WHERE user_id = ? "
+        params = [user_id]
+        if start_day:
+            query += "AND day >= ? "
+            params.append(start_day)
+        if end_day:
+            query += "AND day <= ? "
+            params.append(end_day)
+        return self._fetch_all(query + "ORDER BY day", params)
 
+    def get_task_totals(self, user_id):
+        """Get (total, completed, missed, ongoing) task counts for a user from daily_stats."""
+        result = self._fetch_one("""
+            SELECT COALESCE(SUM(created), 0), COALESCE(SUM(completed), 0),
+                   COALESCE(SUM(missed), 0), COALESCE(SUM(ongoing), 0)
+            FROM daily_stats WHERE user_id = ?
+        """, (user_id,))
+        return tuple(result) if result else (0, 0, 0, 0)
 
     # --- CRUD operations for Tasks ---
     # add_task method remains unchanged as it never had a 'status' argument after previous removal
@@ -166,40 +738,44 @@ class DatabaseManager:
                 priority_id = self.get_priority_id_by_name("Not urgent")
 
         query = """
-            INSERT INTO tasks (user_id, task_title, description, priority_id, due_date, category_id)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO tasks (user_id, task_title, description, priority_id, due_date, category_id, sync_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         """
-        success = self._execute_query(query, (user_id, task_title, description, priority_id, due_date, category_id))
+        success = self._execute_query(query, (user_id, task_title, description, priority_id, due_date, category_id,
+                                              uuid.uuid4().hex))
         
         if success:
             # Get the ID of the last inserted row
             last_id = self._fetch_one("SELECT last_insert_rowid()")
+            if last_id:
+                self.events.publish(TaskAdded(last_id[0], user_id))
             return last_id[0] if last_id else None
         return None
         
-    def get_tasks(self, user_id, filter_type='All Tasks'):
-        query = """
-            SELECT t.task_id, t.task_title, t.description, p.priority_name, t.due_date, tc.category_name
-            FROM tasks t 
-            JOIN task_category tc ON t.category_id = tc.category_id 
-            LEFT JOIN priority p ON t.priority_id = p.priority_id
-        """ \
-                "WHERE t.user_id = ? "
-        params = [user_id]
-        
-        philippines_timezone = pytz.timezone('Asia/Manila')
-        current_local_date = datetime.now(philippines_timezone)
-        current_local_date_str = current_local_date.strftime('%Y-%m-%d')
+    def get_tasks(self, user_id, filter_type='All Tasks', sort_by=None, include_archive=False):
+        """
+        Get a user's tasks for one of the sidebar filters, already sorted by SQL.
         
-        # Get the IDs of important categories
-        completed_cat_id_row = self._fetch_one("SELECT category_id FROM task_category WHERE category_name = ?", ("Completed",))
-        completed_category_id = completed_cat_id_row[0] if completed_cat_id_row else None
+        Args:
+            user_id: The owner of the tasks
+            filter_type: 'Today', 'Next 7 Days', 'All Tasks', 'On-going', 'Completed' or 'Missed'
+            sort_by: A key of TASK_SORT_ORDERS ('due_date', 'due_date_desc', 'priority', 'created',
+                     'updated', 'title'), or None for the filter's default order
+            include_archive: Also return matching tasks from tasks_archive (see archive_old_tasks)
+            
+        Returns:
+            A list of Task rows in display order (callers should not re-sort them)
+        """
+        query = "WHERE t.user_id = ? "
+        params = [user_id]
         
-        ongoing_cat_id_row = self._fetch_one("SELECT category_id FROM task_category WHERE category_name = ?", ("On-going",))
-        ongoing_category_id = ongoing_cat_id_row[0] if ongoing_cat_id_row else None
+        current_local_date = self.clock.today()
+        current_local_date_str = self.clock.today_str()
         
-        missed_cat_id_row = self._fetch_one("SELECT category_id FROM task_category WHERE category_name = ?", ("Missed",))
-        missed_category_id = missed_cat_id_row[0] if missed_cat_id_row else None
+        # Get the IDs of important categories (cached after the first lookup)
+        completed_category_id = self.get_category_id_by_name("Completed")
+        ongoing_category_id = self.get_category_id_by_name("On-going")
+        missed_category_id = self.get_category_id_by_name("Missed")
 
         # Apply filters based on the filter type
         if filter_type == 'Today':
@@ -217,9 +793,10 @@ class DatabaseManager:
         elif filter_type == 'On-going':
             # On-going: display all on-going tasks that are not past due
             if ongoing_category_id:
+                # due_date is stored as 'YYYY-MM-DD', so a plain comparison works and can use the index
                 query += """AND t.category_id = ? 
                     AND (t.due_date IS NULL 
-                         OR DATE(t.due_date) >= DATE(?))"""
+                         OR t.due_date >= ?) """
                 params.extend([ongoing_category_id, current_local_date_str])
         elif filter_type == 'Completed':
             # Completed: display all completed tasks
@@ -232,17 +809,44 @@ class DatabaseManager:
                 query += "AND t.category_id = ? "
                 params.append(missed_category_id)
 
-        # Add ordering by date
-        # For all filters, sort by due date (nearest first)
-        # Tasks with NULL due_date will be at the end
-        if filter_type in ['All Tasks', 'On-going', 'Today', 'Next 7 Days']:
-            # For tasks that need closest due date first
-            query += "ORDER BY CASE WHEN t.due_date IS NULL THEN 1 ELSE 0 END, t.due_date ASC, p.priority_level ASC"
-        elif filter_type in ['Completed', 'Missed']:
-            # For completed/missed tasks, sort by date (could be oldest first or newest first)
-            query += "ORDER BY t.due_date DESC" # Most recently completed/missed first
+        # Add ordering
+        if sort_by is None:
+            # Default: closest due date first (NULL due dates at the end), except for
+            # completed/missed tasks, which show the most recent first
+            sort_by = 'due_date_desc' if filter_type in ['Completed', 'Missed'] else 'due_date'
+        elif sort_by not in self.TASK_SORT_ORDERS:
+            logger.warning("Unknown sort mode: %s. Falling back to due date.", sort_by)
+            sort_by = 'due_date'
+        query, params = self._select_tasks(query, params, include_archive)
+        query += "ORDER BY " + self._task_sort_order(sort_by)
         
-        return self._fetch_all(query, params)
+        return self._fetch_all(query, params, row_factory=Task.row_factory)
+
+    _TASK_SELECT = """
+            SELECT t.task_id, t.task_title, t.description, p.priority_name, t.due_date, tc.category_name{extra}
+            FROM {table} t 
+            JOIN task_category tc ON t.category_id = tc.category_id 
+            LEFT JOIN priority p ON t.priority_id = p.priority_id
+        """
+
+    def _select_tasks(self, where, params, include_archive):
+        """
+        Put the Task columns in front of a "WHERE ..." clause on tasks (alias t). With
+        include_archive the same clause also runs on tasks_archive and the results are combined,
+        exposing the columns TASK_SORT_ORDERS needs; order that with _task_sort_order.
+        """
+        if not include_archive:
+            return self._TASK_SELECT.format(table="tasks", extra="") + where, params
+        extra = ", t.priority_id, t.created_at, t.updated_at"
+        union = (self._TASK_SELECT.format(table="tasks", extra=extra) + where + "UNION ALL "
+                 + self._TASK_SELECT.format(table="tasks_archive", extra=extra) + where)
+        query = ("SELECT t.task_id, t.task_title, t.description, t.priority_name, t.due_date, t.category_name "
+                 f"FROM ({union}) t ")
+        return query, list(params) * 2
+
+    def _task_sort_order(self, sort_by):
+        # Every sort column is a tasks column, which the combined live/archive rows also expose as t.*
+        return self.TASK_SORT_ORDERS[sort_by]
 
     def get_task_by_id(self, task_id):
         """Get a specific task by its ID.
@@ -251,19 +855,21 @@ class DatabaseManager:
             task_id: The ID of the task to retrieve
             
         Returns:
-            A tuple containing (task_id, title, description, priority, due_date, category_name)
-            or None if the task is not found.
+            A Task row (task_id, title, description, priority, due_date, category_name)
+            or None if the task is not found. Its version attribute is the version read
+            in the same query, to pass as expected_version when saving an edit.
         """
         query = """
-            SELECT t.task_id, t.task_title, t.description, p.priority_name, t.due_date, tc.category_name 
+            SELECT t.task_id, t.task_title, t.description, p.priority_name, t.due_date, tc.category_name, t.version 
             FROM tasks t 
             JOIN task_category tc ON t.category_id = tc.category_id 
             LEFT JOIN priority p ON t.priority_id = p.priority_id
             WHERE t.task_id = ?
         """
-        return self._fetch_one(query, (task_id,))
+        return self._fetch_one(query, (task_id,), row_factory=Task.versioned_row_factory)
 
-    def update_task_details(self, task_id, task_title=None, description=None, priority=None, due_date=None, category_id=None):
+    def update_task_details(self, task_id, task_title=None, description=None, priority=None, due_date=None, category_id=None,
+                            expected_version=None):
         updates = []
         params = []
         if task_title is not None:
@@ -285,21 +891,24 @@ class DatabaseManager:
             params.append(category_id)
         
         if not updates:
-            print("No details to update.")
+            logger.info("No details to update.")
             return False
 
         query = f"UPDATE tasks SET {', '.join(updates)} WHERE task_id = ?"
         params.append(task_id)
-        return self._execute_query(query, tuple(params))
+        success = self._execute_versioned_update("tasks", "task_id", task_id, query, tuple(params), expected_version)
+        return self._publish_if_changed(success, TaskUpdated(task_id))
 
     # New method to update a task's category (for "completing" or "uncompleting" tasks)
-    def update_task_category(self, task_id, new_category_id):
+    def update_task_category(self, task_id, new_category_id, expected_version=None):
         query = "UPDATE tasks SET category_id = ? WHERE task_id = ?"
-        return self._execute_query(query, (new_category_id, task_id))
+        success = self._execute_versioned_update("tasks", "task_id", task_id, query, (new_category_id, task_id),
+                                                 expected_version)
+        return self._publish_if_changed(success, TaskCategoryChanged(task_id, new_category_id))
 
     def delete_task(self, task_id):
         query = "DELETE FROM tasks WHERE task_id = ?"
-        return self._execute_query(query, (task_id,))
+        return self._publish_if_changed(self._execute_query(query, (task_id,)), TaskDeleted(task_id))
 
     # --- CRUD operations for Task Categories ---
     def get_task_categories(self):
@@ -308,12 +917,18 @@ class DatabaseManager:
 
     def add_category(self, category_name):
         query = "INSERT INTO task_category (category_name) VALUES (?)"
+        self._category_id_cache.clear()
         return self._execute_query(query, (category_name,))
 
     def get_category_id_by_name(self, category_name):
+        if category_name in self._category_id_cache:
+            return self._category_id_cache[category_name]
         query = "SELECT category_id FROM task_category WHERE category_name = ?"
         result = self._fetch_one(query, (category_name,))
-        return result[0] if result else None
+        if not result:
+            return None
+        self._category_id_cache[category_name] = result[0]
+        return result[0]
 
     # --- CRUD operations for Users ---
     def add_user(self, username, password):
@@ -324,8 +939,34 @@ class DatabaseManager:
         query = "SELECT user_id, username, password FROM users WHERE username = ?"
         return self._fetch_one(query, (username,))
 
-    def update_task(self, task_id, task_title, description, priority_name, due_date, category_id):
-        """Update all fields of a task at once."""
+    def get_user_timezone(self, user_id):
+        """Get the user's timezone name, falling back to the app default (Asia/Manila)."""
+        result = self._fetch_one("SELECT timezone FROM users WHERE user_id = ?", (user_id,))
+        return result[0] if result and result[0] else DEFAULT_TIMEZONE
+
+    def set_user_timezone(self, user_id, timezone_name):
+        """Save the user's timezone setting (e.g. 'Asia/Manila'). Returns False for unknown timezones."""
+        if not is_valid_timezone(timezone_name):
+            logger.warning("Unknown timezone: %s", timezone_name)
+            return False
+        query = "UPDATE users SET timezone = ? WHERE user_id = ?"
+        return self._execute_query(query, (timezone_name, user_id))
+
+    def get_user_today(self, user_id):
+        """Get today's date in the user's own timezone (the shared clock may follow another user)."""
+        return self.clock.today_in(self.get_user_timezone(user_id))
+
+    def use_user_timezone(self, user_id):
+        """Point the shared clock at the user's timezone so every date lookup follows their setting."""
+        self.clock.set_timezone(self.get_user_timezone(user_id))
+
+    def update_task(self, task_id, task_title, description, priority_name, due_date, category_id, expected_version=None):
+        """
+        Update all fields of a task at once.
+
+        Pass the version read with get_task_by_id (task.version) as expected_version to only save if nobody
+        else changed the task in the meantime (raises VersionConflict otherwise).
+        """
         # Convert priority name to priority_id
         priority_id = None
         if priority_name:
@@ -343,11 +984,17 @@ class DatabaseManager:
                 description = ?, 
                 priority_id = ?, 
                 due_date = ?, 
-                category_id = ?,
-                updated_at = CURRENT_TIMESTAMP
+                category_id = ?
             WHERE task_id = ?
         """
-        return self._execute_query(query, (task_title, description, priority_id, formatted_date, category_id, task_id))
+        params = (task_title, description, priority_id, formatted_date, category_id, task_id)
+        success = self._execute_versioned_update("tasks", "task_id", task_id, query, params, expected_version)
+        return self._publish_if_changed(success, TaskUpdated(task_id))
+
+    def get_task_version(self, task_id):
+        """Get a task's current version (for update_* expected_version), or None if it doesn't exist."""
+        result = self._fetch_one("SELECT version FROM tasks WHERE task_id = ?", (task_id,))
+        return result[0] if result else None
 
     # --- Priority Management Methods ---
     def get_priority_id_by_name(self, priority_name):
@@ -369,23 +1016,21 @@ class DatabaseManager:
         return [row[0] for row in results] if results else ["Not urgent", "Urgent"]  # Fallback to defaults if query fails
 
     def _get_ph_timezone(self):
-        """Get Philippines timezone"""
-        return pytz.timezone('Asia/Manila')
+        """Get the app's timezone (Philippines unless the user picked another one)"""
+        return self.clock.tzinfo
     
     def _get_current_local_date(self):
-        """Get current date in PH timezone"""
-        ph_tz = self._get_ph_timezone()
-        return datetime.now(ph_tz).date()
+        """Get current date in the app's timezone"""
+        return self.clock.today()
     
     def _parse_date(self, date_str):
-        """Convert string date to datetime.date object"""
+        """Convert string date to datetime.date object (parsed once per distinct string, see dateUtils)"""
         if not date_str:
             return None
-        try:
-            return datetime.strptime(date_str, '%Y-%m-%d').date()
-        except ValueError:
-            print(f"Invalid date format: {date_str}. Expected format: YYYY-MM-DD")
-            return None
+        date_obj = parse_date(date_str)
+        if date_obj is None:
+            logger.warning("Invalid date format: %s. Expected format: YYYY-MM-DD", date_str)
+        return date_obj
             
     def _format_date(self, date_obj):
         """Convert datetime.date object to string"""
@@ -394,35 +1039,146 @@ class DatabaseManager:
         try:
             return date_obj.strftime('%Y-%m-%d')
         except AttributeError:
-            print(f"Invalid date object: {date_obj}")
+            logger.warning("Invalid date object: %r", date_obj)
             return None
 
-    def update_past_due_tasks(self):
-        """Move all past due On-going tasks to the Missed category."""
+    def update_past_due_tasks(self, user_id=None):
+        """
+        Move past due On-going tasks to the Missed category, judged by each user's own local date.
+
+        With user_id only that user's tasks are swept; otherwise every user's, with one UPDATE
+        per timezone in use. A TaskCategoryChanged event is published for every moved task.
+        """
         # Get the category IDs
-        ongoing_cat_id_row = self._fetch_one("SELECT category_id FROM task_category WHERE category_name = ?", ("On-going",))
-        missed_cat_id_row = self._fetch_one("SELECT category_id FROM task_category WHERE category_name = ?", ("Missed",))
+        ongoing_category_id = self.get_category_id_by_name("On-going")
+        missed_category_id = self.get_category_id_by_name("Missed")
         
-        if not ongoing_cat_id_row or not missed_cat_id_row:
-            print("Error: Could not find required categories.")
+        if not ongoing_category_id or not missed_category_id:
+            logger.error("Could not find required categories.")
             return False
-            
-        ongoing_category_id = ongoing_cat_id_row[0]
-        missed_category_id = missed_cat_id_row[0]
         
-        philippines_timezone = pytz.timezone('Asia/Manila')
-        current_local_date = datetime.now(philippines_timezone).strftime('%Y-%m-%d')
-        
-        # Update all past due tasks from On-going to Missed
-        query = """
-            UPDATE tasks 
-            SET category_id = ?
+        condition = """
             WHERE category_id = ? 
             AND due_date < ?
             AND due_date IS NOT NULL
         """
+        if user_id is not None:
+            current_local_date = self.get_user_today(user_id).strftime('%Y-%m-%d')
+            return self._move_to_missed(condition + " AND user_id = ?",
+                                        (ongoing_category_id, current_local_date, user_id), missed_category_id)
+
+        # Tasks of users without a timezone (or without a users row) follow the app default
+        user_timezone_sql = "COALESCE((SELECT u.timezone FROM users u WHERE u.user_id = tasks.user_id), ?)"
+        timezone_names = {row[0] for row in self._fetch_all("SELECT DISTINCT timezone FROM users WHERE timezone IS NOT NULL")}
+        timezone_names.add(DEFAULT_TIMEZONE)
+        for timezone_name in sorted(timezone_names):
+            current_local_date = self.clock.today_in(timezone_name).strftime('%Y-%m-%d')
+            if not self._move_to_missed(condition + f" AND {user_timezone_sql} = ?",
+                                        (ongoing_category_id, current_local_date, DEFAULT_TIMEZONE, timezone_name),
+                                        missed_category_id):
+                return False
+        return True
+
+    def _move_to_missed(self, condition, params, missed_category_id):
+        """Set the Missed category on the tasks matching condition and publish their TaskCategoryChanged events."""
+        task_ids = [row[0] for row in self._fetch_all("SELECT task_id FROM tasks " + condition, params)]
+        if not task_ids:
+            return True
+        if not self._execute_query("UPDATE tasks SET category_id = ? " + condition, (missed_category_id,) + tuple(params)):
+            return False
+        for task_id in task_ids:
+            self.events.publish(TaskCategoryChanged(task_id, missed_category_id))
+        return True
+
+    # --- App State / Midnight Rollover ---
+    def get_app_state(self, state_key):
+        """Get a stored app_state value, or None if it was never set."""
+        result = self._fetch_one("SELECT state_value FROM app_state WHERE state_key = ?", (state_key,))
+        return result[0] if result else None
+
+    def set_app_state(self, state_key, state_value):
+        """Store an app_state value, replacing any previous one."""
+        query = "INSERT OR REPLACE INTO app_state (state_key, state_value) VALUES (?, ?)"
+        return self._execute_query(query, (state_key, state_value))
+
+    def refresh_recurring_task_statuses(self, user_id=None):
+        """
+        Recalculate the status of recurring tasks (rolls habits into their new period), by each
+        owner's local date. With user_id only that user's habits are refreshed.
+        """
+        query = "SELECT rtask_id, recurrence_pattern, last_completed_date, status, user_id FROM recurring_tasks"
+        params = ()
+        if user_id is not None:
+            query += " WHERE user_id = ?"
+            params = (user_id,)
+        tasks = self._fetch_all(query, params)
+        user_dates = {}
+        changed = 0
+        for rtask_id, recurrence_pattern, last_completed_date, current_status, owner_id in tasks:
+            if owner_id not in user_dates:
+                user_dates[owner_id] = self.get_user_today(owner_id)
+            correct_status = self._calculate_recurring_task_status(recurrence_pattern, last_completed_date,
+                                                                   user_dates[owner_id])
+            if correct_status != current_status:
+                if self._execute_query(
+                    "UPDATE recurring_tasks SET status = ? WHERE rtask_id = ?",
+                    (correct_status, rtask_id)
+                ):
+                    changed += 1
+                    self.events.publish(HabitStatusChanged(rtask_id, correct_status))
+        return changed
+
+    def run_midnight_rollover(self, force=False, user_id=None):
+        """
+        Run the once-a-day sweep: move past due On-going tasks to Missed and roll habit periods.
+        Every changed row publishes its own event, followed by one DayRolledOver, so open
+        views can patch themselves instead of re-rendering.
+
+        With user_id only that user's tasks and habits are swept, by the user's own local date,
+        and the sweep is recorded as last_rollover_date:<user_id>. Without it every user is
+        swept (each by their own date), the shared last_rollover_date key is used and the
+        database-wide run_daily_maintenance runs as well.
+        The date of the last sweep is kept in app_state, so calling this again on the same
+        local day (e.g. after a restart) does nothing unless force is True.
+        
+        Returns:
+            True if the sweep ran, False if it was already done today or failed
+        """
+        if user_id is None:
+            today_str = self.clock.today_str()
+            state_key = 'last_rollover_date'
+        else:
+            today_str = self.get_user_today(user_id).strftime('%Y-%m-%d')
+            state_key = f'last_rollover_date:{user_id}'
+        if not force and self.get_app_state(state_key) == today_str:
+            return False
         
-        return self._execute_query(query, (missed_category_id, ongoing_category_id, current_local_date))
+        if not self.update_past_due_tasks(user_id):
+            return False
+        self.refresh_recurring_task_statuses(user_id)
+        if user_id is None:
+            self.run_daily_maintenance(force)
+        self.set_app_state(state_key, today_str)
+        self.events.publish(DayRolledOver(user_id, today_str))
+        return True
+
+    def run_daily_maintenance(self, force=False):
+        """
+        Archive old tasks, compact change_log up to what its consumers have read and purge old
+        sync tombstones. These cover every user's rows, so they run once a day per database
+        (recorded as last_maintenance_date), not once per user sweep.
+
+        Returns:
+            True if it ran, False if it was already done today
+        """
+        today_str = self.clock.today_str()
+        if not force and self.get_app_state('last_maintenance_date') == today_str:
+            return False
+        self.archive_old_tasks()
+        self.compact_change_log(keep_after_seq=self.change_log_consumer_seq())
+        self.purge_sync_tombstones()
+        self.set_app_state('last_maintenance_date', today_str)
+        return True
 
     # --- Recurring Tasks Management ---
     def get_recurring_tasks(self, user_id):
@@ -433,37 +1189,47 @@ class DatabaseManager:
             WHERE user_id = ?
             ORDER BY start_date
         """
-        tasks = self._fetch_all(query, (user_id,))
+        tasks = self._fetch_all(query, (user_id,), row_factory=RecurringTask.row_factory)
         
         # Update the status of each task based on its recurrence pattern and last completed date
-        updated_tasks = []
         for task in tasks:
-            rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date, current_status = task
-            
             # Calculate the correct status
-            correct_status = self._calculate_recurring_task_status(recurrence_pattern, last_completed_date)
+            correct_status = self._calculate_recurring_task_status(task.recurrence_pattern, task.last_completed_date)
             
             # Update the database if the status has changed
-            if correct_status != current_status:
+            if correct_status != task.status:
                 self._execute_query(
                     "UPDATE recurring_tasks SET status = ? WHERE rtask_id = ?", 
-                    (correct_status, rtask_id)
+                    (correct_status, task.rtask_id)
                 )
+                # Include the updated status in the result
+                task.status = correct_status
             
-            # Include the updated status in the result
-            updated_task = (rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date, correct_status)
-            updated_tasks.append(updated_task)
-            
-        return updated_tasks
+        return tasks
+
+    def get_recurring_task(self, rtask_id):
+        """Get one recurring task with its current status, or None if it doesn't exist."""
+        query = """
+            SELECT rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date, status
+            FROM recurring_tasks
+            WHERE rtask_id = ?
+        """
+        task = self._fetch_one(query, (rtask_id,), row_factory=RecurringTask.row_factory)
+        if task:
+            task.status = self._calculate_recurring_task_status(task.recurrence_pattern, task.last_completed_date)
+        return task
 
     def add_recurring_task(self, user_id, rtask_title, description, start_date, recurrence_pattern):
         """Add a new recurring task."""
         query = """
-            INSERT INTO recurring_tasks (user_id, rtask_title, description, start_date, recurrence_pattern)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO recurring_tasks (user_id, rtask_title, description, start_date, recurrence_pattern, sync_id)
+            VALUES (?, ?, ?, ?, ?, ?)
         """
-        if self._execute_query(query, (user_id, rtask_title, description, start_date, recurrence_pattern)):
+        if self._execute_query(query, (user_id, rtask_title, description, start_date, recurrence_pattern,
+                                       uuid.uuid4().hex)):
             result = self._fetch_one("SELECT last_insert_rowid()")
+            if result:
+                self.events.publish(HabitAdded(result[0], user_id))
             return result[0] if result else None
         return None
         
@@ -474,7 +1240,8 @@ class DatabaseManager:
             SET last_completed_date = ?, status = 'Completed'
             WHERE rtask_id = ?
         """
-        return self._execute_query(query, (completed_date, rtask_id))
+        return self._publish_if_changed(self._execute_query(query, (completed_date, rtask_id)),
+                                        HabitCompleted(rtask_id, completed_date))
 
     def remove_recurring_task_completion(self, rtask_id, completed_date):
         """Remove completion date for a recurring task and set status to 'Pending'."""
@@ -483,7 +1250,8 @@ class DatabaseManager:
             SET last_completed_date = NULL, status = 'Pending'
             WHERE rtask_id = ? AND last_completed_date = ?
         """
-        return self._execute_query(query, (rtask_id, completed_date))
+        return self._publish_if_changed(self._execute_query(query, (rtask_id, completed_date)),
+                                        HabitCompleted(rtask_id, None))
 
     def get_habit_completion_dates(self, rtask_id):
         """Get all completion dates for a recurring task."""
@@ -496,8 +1264,9 @@ class DatabaseManager:
         results = self._fetch_all(query, (rtask_id,))
         return [result[0] for result in results] if results else []
 
-    def update_recurring_task(self, rtask_id, rtask_title, description, start_date, recurrence_pattern):
-        """Update an existing recurring task."""
+    def update_recurring_task(self, rtask_id, rtask_title, description, start_date, recurrence_pattern,
+                              expected_version=None):
+        """Update an existing recurring task (see update_task for expected_version)."""
         query = """
             UPDATE recurring_tasks
             SET rtask_title = ?,
@@ -506,26 +1275,117 @@ class DatabaseManager:
                 recurrence_pattern = ?
             WHERE rtask_id = ?
         """
-        return self._execute_query(query, (rtask_title, description, start_date, recurrence_pattern, rtask_id))
+        params = (rtask_title, description, start_date, recurrence_pattern, rtask_id)
+        success = self._execute_versioned_update("recurring_tasks", "rtask_id", rtask_id, query, params, expected_version)
+        return self._publish_if_changed(success, HabitUpdated(rtask_id))
+
+    def get_recurring_task_version(self, rtask_id):
+        """Get a recurring task's current version, or None if it doesn't exist."""
+        result = self._fetch_one("SELECT version FROM recurring_tasks WHERE rtask_id = ?", (rtask_id,))
+        return result[0] if result else None
 
     def delete_recurring_task(self, rtask_id):
         """Delete a recurring task."""
         query = "DELETE FROM recurring_tasks WHERE rtask_id = ?"
-        return self._execute_query(query, (rtask_id,))
+        return self._publish_if_changed(self._execute_query(query, (rtask_id,)), HabitDeleted(rtask_id))
 
-    def search_tasks(self, user_id, search_term):
-        """Search for tasks by title or description."""
-        query = """
-            SELECT t.task_id, t.task_title, t.description, p.priority_name, t.due_date, tc.category_name 
-            FROM tasks t 
-            JOIN task_category tc ON t.category_id = tc.category_id 
-            LEFT JOIN priority p ON t.priority_id = p.priority_id
-            WHERE t.user_id = ? 
+    def search_tasks(self, user_id, search_term, include_archive=False):
+        """Search for tasks by title or description (and in tasks_archive if include_archive is True)."""
+        where = """WHERE t.user_id = ? 
             AND (LOWER(t.task_title) LIKE LOWER(?) OR LOWER(t.description) LIKE LOWER(?))
-            ORDER BY t.due_date ASC, t.task_title ASC
         """
         search_pattern = f"%{search_term}%"
-        return self._fetch_all(query, (user_id, search_pattern, search_pattern))
+        query, params = self._select_tasks(where, (user_id, search_pattern, search_pattern), include_archive)
+        query += "ORDER BY t.due_date ASC, t.task_title ASC"
+        return self._fetch_all(query, params, row_factory=Task.row_factory)
+
+    # --- Archive ---
+    def _move_tasks(self, select_ids, params, source, target, batch_size):
+        """
+        Move one batch of tasks (task_ids from select_ids, at most batch_size) from source to
+        target in a single transaction, logging an 'archive' or 'restore' change_log entry per
+        task (so sync sends the move), and a TaskArchived/TaskRestored event. Returns the number moved.
+        """
+        op = "archive" if target == "tasks_archive" else "restore"
+        moved_ids = []
+
+        def run():
+            try:
+                self.cursor.execute(
+                    "INSERT OR REPLACE INTO app_state (state_key, state_value) VALUES (?, '1')",
+                    (self.ARCHIVE_FLAG_KEY,)
+                )
+                ids = [row[0] for row in self.cursor.execute(select_ids + " LIMIT ?", tuple(params) + (batch_size,))]
+                if ids:
+                    placeholders = ",".join("?" * len(ids))
+                    self.cursor.execute(
+                        f"INSERT INTO {target} ({self.ARCHIVE_COLUMNS}) "
+                        f"SELECT {self.ARCHIVE_COLUMNS} FROM {source} WHERE task_id IN ({placeholders})", ids
+                    )
+                    self.cursor.execute(f"DELETE FROM {source} WHERE task_id IN ({placeholders})", ids)
+                    self.cursor.execute(
+                        "INSERT INTO change_log (table_name, row_id, op, user_id) "
+                        f"SELECT 'tasks', task_id, ?, user_id FROM {target} WHERE task_id IN ({placeholders})",
+                        [op] + ids
+                    )
+                self.cursor.execute("DELETE FROM app_state WHERE state_key = ?", (self.ARCHIVE_FLAG_KEY,))
+                self.conn.commit()
+            except sqlite3.Error:
+                # Never leave the flag behind, or the triggers would stay off
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                raise
+            moved_ids[:] = ids
+            return len(ids), len(ids)
+
+        try:
+            moved = self._run_with_retry(select_ids, params, run)
+        except sqlite3.Error as e:
+            logger.error("Moving tasks from %s to %s failed: %s", source, target, e)
+            return 0
+        event_type = TaskArchived if op == "archive" else TaskRestored
+        for task_id in moved_ids:
+            self.events.publish(event_type(task_id))
+        return moved
+
+    def archive_old_tasks(self, retention_days=None, batch_size=500):
+        """
+        Move Completed and Missed tasks due (or, without a due date, last changed) more than
+        retention_days ago into tasks_archive, batch_size rows per transaction so other
+        writers get the lock in between. Returns the number of tasks archived.
+        """
+        retention_days = self.ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+        category_ids = [category_id for category_id in (self.get_category_id_by_name("Completed"),
+                                                        self.get_category_id_by_name("Missed")) if category_id]
+        if not category_ids:
+            return 0
+        cutoff = (self.clock.today() - timedelta(days=retention_days)).strftime('%Y-%m-%d')
+        placeholders = ",".join("?" * len(category_ids))
+        select_ids = (f"SELECT task_id FROM tasks WHERE category_id IN ({placeholders}) "
+                      "AND COALESCE(due_date, date(updated_at)) < ?")
+        params = category_ids + [cutoff]
+        archived = 0
+        while True:
+            moved = self._move_tasks(select_ids, params, "tasks", "tasks_archive", batch_size)
+            archived += moved
+            if moved < batch_size:
+                break
+        if archived:
+            logger.info("Archived old tasks", extra={"archived": archived, "cutoff": cutoff})
+        return archived
+
+    def restore_archived_task(self, task_id):
+        """Move an archived task back into tasks (e.g. to edit it). Returns True if it was moved."""
+        return self._move_tasks("SELECT task_id FROM tasks_archive WHERE task_id = ?", (task_id,),
+                                "tasks_archive", "tasks", 1) == 1
+
+    def archive_task(self, task_id):
+        """Move one task into tasks_archive (e.g. one archived on another replica). Returns True if it was moved."""
+        return self._move_tasks("SELECT task_id FROM tasks WHERE task_id = ?", (task_id,),
+                                "tasks", "tasks_archive", 1) == 1
+
+    def is_archived_task(self, task_id):
+        return self._fetch_one("SELECT 1 FROM tasks_archive WHERE task_id = ?", (task_id,)) is not None
 
     def update_database_schema(self):
         """Update database schema to add missing columns."""
@@ -534,32 +1394,84 @@ class DatabaseManager:
         column_names = [column[1] for column in table_info]
         
         if 'updated_at' not in column_names:
-            print("Adding updated_at column to tasks table...")
+            schema_logger.info("Adding updated_at column to tasks table...")
             # Add updated_at column
             alter_query = """
                 ALTER TABLE tasks 
                 ADD COLUMN updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
             """
             if self._execute_query(alter_query):
-                print("Successfully added updated_at column to tasks table.")
+                schema_logger.info("Successfully added updated_at column to tasks table.")
             else:
-                print("Failed to add updated_at column to tasks table.")
+                schema_logger.error("Failed to add updated_at column to tasks table.")
         else:
-            print("updated_at column already exists in tasks table.")
+            schema_logger.debug("updated_at column already exists in tasks table.")
         
         if 'created_at' not in column_names:
-            print("Adding created_at column to tasks table...")
+            schema_logger.info("Adding created_at column to tasks table...")
             # Add created_at column
             alter_query = """
                 ALTER TABLE tasks 
                 ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             """
             if self._execute_query(alter_query):
-                print("Successfully added created_at column to tasks table.")
+                schema_logger.info("Successfully added created_at column to tasks table.")
             else:
-                print("Failed to add created_at column to tasks table.")
+                schema_logger.error("Failed to add created_at column to tasks table.")
         else:
-            print("created_at column already exists in tasks table.")
+            schema_logger.debug("created_at column already exists in tasks table.")
+
+        # Check if timezone column exists in users table (per-user timezone setting)
+        user_columns = [column[1] for column in self._fetch_all("PRAGMA table_info(users)")]
+        if 'timezone' not in user_columns:
+            schema_logger.info("Adding timezone column to users table...")
+            if self._execute_query("ALTER TABLE users ADD COLUMN timezone TEXT"):
+                schema_logger.info("Successfully added timezone column to users table.")
+            else:
+                schema_logger.error("Failed to add timezone column to users table.")
+        else:
+            schema_logger.debug("timezone column already exists in users table.")
+
+        # Row versions for optimistic concurrency (see create_version_triggers)
+        if 'version' not in column_names:
+            schema_logger.info("Adding version column to tasks table...")
+            if self._execute_query("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1"):
+                schema_logger.info("Successfully added version column to tasks table.")
+            else:
+                schema_logger.error("Failed to add version column to tasks table.")
+        else:
+            schema_logger.debug("version column already exists in tasks table.")
+
+        recurring_columns = [column[1] for column in self._fetch_all("PRAGMA table_info(recurring_tasks)")]
+        if 'updated_at' not in recurring_columns:
+            schema_logger.info("Adding updated_at column to recurring_tasks table...")
+            # ALTER TABLE can't add a column with a CURRENT_TIMESTAMP default, so fill it in afterwards
+            if (self._execute_query("ALTER TABLE recurring_tasks ADD COLUMN updated_at DATETIME")
+                    and self._execute_query("UPDATE recurring_tasks SET updated_at = CURRENT_TIMESTAMP")):
+                schema_logger.info("Successfully added updated_at column to recurring_tasks table.")
+            else:
+                schema_logger.error("Failed to add updated_at column to recurring_tasks table.")
+        else:
+            schema_logger.debug("updated_at column already exists in recurring_tasks table.")
+        if 'version' not in recurring_columns:
+            schema_logger.info("Adding version column to recurring_tasks table...")
+            if self._execute_query("ALTER TABLE recurring_tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1"):
+                schema_logger.info("Successfully added version column to recurring_tasks table.")
+            else:
+                schema_logger.error("Failed to add version column to recurring_tasks table.")
+        else:
+            schema_logger.debug("version column already exists in recurring_tasks table.")
+
+        # Replica-independent row ids for sync (filled in by create_sync_tables)
+        for table_name, columns in (("tasks", column_names), ("recurring_tasks", recurring_columns)):
+            if 'sync_id' not in columns:
+                schema_logger.info("Adding sync_id column to %s table...", table_name)
+                if self._execute_query(f"ALTER TABLE {table_name} ADD COLUMN sync_id TEXT"):
+                    schema_logger.info("Successfully added sync_id column to %s table.", table_name)
+                else:
+                    schema_logger.error("Failed to add sync_id column to %s table.", table_name)
+            else:
+                schema_logger.debug("sync_id column already exists in %s table.", table_name)
 
     def is_recurring_task(self, task_id):
         """Check if a task is marked as recurring by checking if it exists in the recurring_tasks table."""
@@ -569,13 +1481,18 @@ class DatabaseManager:
         result = self._fetch_one(query, (task_id,))
         return result[0] > 0 if result else False
 
-    def _calculate_recurring_task_status(self, recurrence_pattern, last_completed_date):
+    def get_recurring_task_ids(self):
+        """Get the set of all rtask_ids, for checking many tasks with is_recurring_task semantics in one query."""
+        return {row[0] for row in self._fetch_all("SELECT rtask_id FROM recurring_tasks")}
+
+    def _calculate_recurring_task_status(self, recurrence_pattern, last_completed_date, current_date=None):
         """
         Calculate the current status of a recurring task based on its recurrence pattern and last completion date.
         
         Args:
             recurrence_pattern: The pattern of recurrence (daily, weekly, monthly, annual)
             last_completed_date: The last date the task was completed
+            current_date: "Today" for the task's owner (default: today on the shared clock)
             
         Returns:
             'Completed' if the task is completed within the current period, 'Pending' otherwise
@@ -583,15 +1500,15 @@ class DatabaseManager:
         if not last_completed_date:
             return 'Pending'
             
-        # Convert string date to datetime.date object
-        try:
-            last_completed = datetime.strptime(last_completed_date, '%Y-%m-%d').date()
-        except ValueError:
-            print(f"Invalid last_completed_date format: {last_completed_date}. Expected format: YYYY-MM-DD")
+        # Convert string date to datetime.date object (cached parse)
+        last_completed = parse_date(last_completed_date)
+        if last_completed is None:
+            logger.warning("Invalid last_completed_date format: %s. Expected format: YYYY-MM-DD", last_completed_date)
             return 'Pending'
         
-        # Get current date in PH timezone
-        current_date = self._get_current_local_date()
+        # Get current date in PH timezone (or the owner's, if given)
+        if current_date is None:
+            current_date = self._get_current_local_date()
         
         # Check status based on recurrence pattern
         recurrence_pattern = recurrence_pattern.lower()
@@ -626,6 +1543,8 @@ class DatabaseManager:
 
 # For testing the DatabaseManager separately
 if __name__ == '__main__':
+    from logSetup import configure_logging
+    configure_logging(level="INFO")
     db_manager = DatabaseManager()
-    print("Database initialized successfully.")
+    logger.info("Database initialized successfully.")
     db_manager._close()
\ No newline at end of file
@@ -0,0 +1,45 @@
+from datetime import date
+from functools import lru_cache
+
+# Dates in the database are 'YYYY-MM-DD' strings, and the same few hundred dates repeat
+# across thousands of rows, so parsing and label formatting are memoized.
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_str):
+    """Convert a 'YYYY-MM-DD' string to a datetime.date, or None if it's empty/invalid."""
+    if not date_str:
+        return None
+    try:
+        return date.fromisoformat(date_str.strip())
+    except (ValueError, AttributeError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def date_ordinal(date_str):
+    """Convert a 'YYYY-MM-DD' string to a date ordinal (date.toordinal()), or None."""
+    parsed = parse_date(date_str)
+    return parsed.toordinal() if parsed else None
+
+
+@lru_cache(maxsize=2048)
+def format_due_label(due_ordinal, today_ordinal):
+    """Get the "Due: ..." text shown on task cards ("Due: Today", "Due: Tomorrow", "Due: Jun 30, 2025")."""
+    if due_ordinal is None:
+        return "Due: Invalid Date"
+    if due_ordinal == today_ordinal:
+        return "Due: Today"
+    if due_ordinal == today_ordinal + 1:
+        return "Due: Tomorrow"
+    return f"Due: {date.fromordinal(due_ordinal).strftime('%b %d, %Y')}"
+
+
+@lru_cache(maxsize=512)
+def format_day_heading(day_ordinal, today_ordinal):
+    """Get the day name used in headings ("Today", "Tomorrow", "June 30, 2025")."""
+    if day_ordinal == today_ordinal:
+        return "Today"
+    if day_ordinal == today_ordinal + 1:
+        return "Tomorrow"
+    return date.fromordinal(day_ordinal).strftime("%B %d, %Y")
@@ -0,0 +1,133 @@
+import logging
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger("timeplan.events")
+
+# Change events published by DatabaseManager after a write succeeded
+TaskAdded = namedtuple("TaskAdded", ["task_id", "user_id"])
+TaskUpdated = namedtuple("TaskUpdated", ["task_id"])
+TaskDeleted = namedtuple("TaskDeleted", ["task_id"])
+TaskCategoryChanged = namedtuple("TaskCategoryChanged", ["task_id", "category_id"])
+# Moved to tasks_archive (no longer listed unless archived tasks are included), or back out of it
+TaskArchived = namedtuple("TaskArchived", ["task_id"])
+TaskRestored = namedtuple("TaskRestored", ["task_id"])
+HabitAdded = namedtuple("HabitAdded", ["rtask_id", "user_id"])
+HabitUpdated = namedtuple("HabitUpdated", ["rtask_id"])
+HabitDeleted = namedtuple("HabitDeleted", ["rtask_id"])
+# completed_date is None when a completion was removed
+HabitCompleted = namedtuple("HabitCompleted", ["rtask_id", "completed_date"])
+# A habit rolled into a new period (status recalculated by the midnight sweep)
+HabitStatusChanged = namedtuple("HabitStatusChanged", ["rtask_id", "status"])
+# The midnight sweep ran for a new local date (user_id None: every user was swept);
+# published after the sweep's own task/habit events
+DayRolledOver = namedtuple("DayRolledOver", ["user_id", "date"])
+
+TASK_EVENTS = (TaskAdded, TaskUpdated, TaskDeleted, TaskCategoryChanged, TaskArchived, TaskRestored)
+# Habit changes that can add, remove or regroup cards (the others only change a card's state)
+HABIT_LIST_EVENTS = (HabitAdded, HabitUpdated, HabitDeleted)
+HABIT_EVENTS = (HabitCompleted, HabitStatusChanged) + HABIT_LIST_EVENTS
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for change events.
+
+    Subscribers register for one event type, or for every event with event_type=None.
+    publish() calls them synchronously on the publishing thread; a failing subscriber is
+    logged and does not stop the others (or the write that published the event).
+
+    Example:
+        bus = EventBus()
+        bus.subscribe(TaskDeleted, lambda event: print("deleted", event.task_id))
+        bus.publish(TaskDeleted(42))
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, event_type, callback):
+        """Call callback(event) for every published event of event_type (None = all events)."""
+        with self._lock:
+            callbacks = self._subscribers.setdefault(event_type, [])
+            if callback not in callbacks:
+                callbacks.append(callback)
+
+    def unsubscribe(self, event_type, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(event_type, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def publish(self, event):
+        with self._lock:
+            self.published += 1
+            callbacks = self._subscribers.get(type(event), []) + self._subscribers.get(None, [])
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.exception("Event subscriber error for %s: %s", type(event).__name__, e)
+
+
+class TkEventBatcher:
+    """
+    Collects events from a bus and hands them to handler(events) once per Tk idle cycle.
+
+    A handler that saves a task and then moves it to another category publishes two
+    events; the view patches its widgets once, after the handler returned. Events are
+    passed in publish order. Only use it from the Tk thread (after_idle is not thread-safe).
+
+    Example:
+        batcher = TkEventBatcher(root, db.events, view.apply_change_events).start()
+        ...
+        batcher.stop()
+    """
+
+    def __init__(self, widget, bus, handler, event_types=None):
+        self.widget = widget
+        self.bus = bus
+        self.handler = handler
+        self.event_types = event_types or [None]
+        self.batches = 0
+        self._pending = []
+        self._after_id = None
+
+    def start(self):
+        for event_type in self.event_types:
+            self.bus.subscribe(event_type, self._queue)
+        return self
+
+    def stop(self):
+        for event_type in self.event_types:
+            self.bus.unsubscribe(event_type, self._queue)
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self._pending = []
+
+    def discard(self):
+        """Drop the queued events, e.g. after the view was just rebuilt from the database anyway."""
+        self._pending = []
+
+    def _queue(self, event):
+        self._pending.append(event)
+        if self._after_id is None:
+            self._after_id = self.widget.after_idle(self.flush)
+
+    def flush(self):
+        """Deliver the queued events now (normally called from after_idle)."""
+        self._after_id = None
+        events, self._pending = self._pending, []
+        if not events:
+            return
+        self.batches += 1
+        try:
+            self.handler(events)
+        except Exception as e:
+            logger.exception("Change event handler error: %s", e)
@@ -0,0 +1,95 @@
+import gc
+import logging
+import tkinter
+import tkinter.font
+from collections import Counter, deque
+from uiPerf import count_widgets
+
+logger = logging.getLogger("timeplan.leaks")
+
+# Python-side objects that pile up when pages are rebuilt without releasing the old ones
+TRACKED_TYPE_NAMES = ("CTkFont", "Font", "StringVar", "IntVar", "BooleanVar", "DoubleVar", "CTkImage", "PhotoImage")
+
+
+def count_live_objects(root):
+    """
+    Count what is alive right now:
+        tk_widgets        widgets that exist in Tk (walk from root)
+        py_widgets        Python widget objects still reachable (destroyed-but-referenced ones included)
+        tk_fonts          named fonts registered in Tk
+        tk_images         images registered in Tk
+        <type name>       live instances of each TRACKED_TYPE_NAMES class
+    """
+    gc.collect()
+    counts = Counter({name: 0 for name in TRACKED_TYPE_NAMES})
+    py_widgets = 0
+    for obj in gc.get_objects():
+        type_name = type(obj).__name__
+        if type_name in counts:
+            counts[type_name] += 1
+        elif isinstance(obj, tkinter.Misc):
+            py_widgets += 1
+    counts["tk_widgets"] = count_widgets(root)
+    counts["py_widgets"] = py_widgets
+    counts["tk_fonts"] = len(tkinter.font.names(root))
+    counts["tk_images"] = len(root.image_names())
+    return counts
+
+
+class LeakDetector:
+    """
+    Snapshots live widget/font/variable/image counts after every page switch and reports
+    counters that keep growing on repeat visits to the same page.
+
+    A page rebuilt from scratch should end up with about the same number of objects every
+    time it is shown; a counter that goes up on `window` visits in a row is reported.
+
+    Example:
+        detector = LeakDetector(app)
+        app.show_tasks_page()
+        detector.check("show_tasks_page")
+    """
+
+    def __init__(self, root, window=5):
+        self.root = root
+        self.window = window
+        self.history = {}
+        self.reported = set()
+        self.reports = []
+
+    def check(self, page):
+        """Snapshot the counts after showing `page`; returns {counter: (first, latest)} for counters that keep growing."""
+        counts = count_live_objects(self.root)
+        history = self.history.get(page)
+        if history is None:
+            history = self.history[page] = deque(maxlen=self.window + 1)
+        history.append(counts)
+        if len(history) <= self.window:
+            return {}
+
+        growing = {}
+        for name in counts:
+            values = [snapshot[name] for snapshot in history]
+            if all(later > earlier for earlier, later in zip(values, values[1:])):
+                growing[name] = (values[0], values[-1])
+            else:
+                # Stopped growing: report it again if it starts over
+                self.reported.discard((page, name))
+
+        new_growth = {name: span for name, span in growing.items() if (page, name) not in self.reported}
+        if new_growth:
+            self.reported.update((page, name) for name in new_growth)
+            self.reports.append((page, new_growth))
+            details = ", ".join(f"{name} {first}->{latest}" for name, (first, latest) in new_growth.items())
+            logger.warning("Possible leak: counts keep growing after %d visits to %s: %s",
+                           self.window, page, details, extra={"page": page})
+        return growing
+
+    def format_summary(self):
+        """Get the latest counts per page as a small plain-text table."""
+        lines = []
+        for page, history in self.history.items():
+            latest = history[-1]
+            lines.append(f"{page} (visits tracked: {len(history)})")
+            lines.extend(f"  {name:<14}{count:>8}" for name, count in sorted(latest.items()))
+        return "\n".join(lines)
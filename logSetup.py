@@ -0,0 +1,148 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is a structured field
+_STANDARD_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Verbose schema-migration chatter goes to its own logger so it can stay off by default
+SCHEMA_LOGGER_NAME = "timeplan.db.schema"
+
+_queue_listener = None
+
+
+def diagnostics_enabled():
+    """True when TIMEPLAN_DEBUG=1: turns on the diagnostics that cost work on every action or tick."""
+    return os.environ.get("TIMEPLAN_DEBUG") == "1"
+
+
+def app_data_dir():
+    """
+    Directory for the app's own files (diagnostic logs, ...), created on first use:
+    TIMEPLAN_DATA_DIR, else %APPDATA%\\TimePlan on Windows, else $XDG_DATA_HOME/timeplan
+    (~/.local/share/timeplan).
+    """
+    path = os.environ.get("TIMEPLAN_DATA_DIR")
+    if not path:
+        if os.name == "nt" and os.environ.get("APPDATA"):
+            path = os.path.join(os.environ["APPDATA"], "TimePlan")
+        else:
+            data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+            path = os.path.join(data_home, "timeplan")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class LazyMessage:
+    """
+    Defers building an expensive log argument until a handler actually formats the record.
+
+    Example:
+        logger.debug("report: %s", LazyMessage(profiler.format_report))
+    """
+
+    def __init__(self, build):
+        self.build = build
+
+    def __str__(self):
+        return str(self.build())
+
+
+def _record_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD_RECORD_ATTRS}
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats a record as one line: time, level, logger, message and any `extra=` fields as key=value.
+
+    Example:
+        logger.warning("slow query", extra={"elapsed_ms": 120.5, "rows": 40})
+        -> 2025-06-30 10:00:00 WARNING timeplan.db: slow query elapsed_ms=120.5 rows=40
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = _record_fields(record)
+        if fields:
+            text += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line (for log collectors)."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_record_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=None, json_format=None, log_file=None, async_handler=None, verbose_schema=None):
+    """
+    Set up logging for the "timeplan" loggers. Every argument falls back to an environment variable:
+
+        TIMEPLAN_LOG_LEVEL      DEBUG / INFO / WARNING (default) / ERROR
+        TIMEPLAN_LOG_JSON       1 to write JSON lines instead of plain text
+        TIMEPLAN_LOG_FILE       write to this file instead of stderr
+        TIMEPLAN_LOG_ASYNC      1 to hand records to a background thread (QueueHandler/QueueListener),
+                                so the UI thread never blocks on log I/O
+        TIMEPLAN_LOG_SCHEMA     1 to show the per-column schema check messages
+    """
+    global _queue_listener
+
+    if level is None:
+        level = os.environ.get("TIMEPLAN_LOG_LEVEL", "WARNING")
+    if json_format is None:
+        json_format = os.environ.get("TIMEPLAN_LOG_JSON") == "1"
+    if log_file is None:
+        log_file = os.environ.get("TIMEPLAN_LOG_FILE")
+    if async_handler is None:
+        async_handler = os.environ.get("TIMEPLAN_LOG_ASYNC") == "1"
+    if verbose_schema is None:
+        verbose_schema = os.environ.get("TIMEPLAN_LOG_SCHEMA") == "1"
+
+    handler = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if json_format else StructuredFormatter())
+
+    root_logger = logging.getLogger("timeplan")
+    root_logger.setLevel(level.upper() if isinstance(level, str) else level)
+    for old_handler in list(root_logger.handlers):
+        root_logger.removeHandler(old_handler)
+
+    if _queue_listener:
+        _queue_listener.stop()
+        _queue_listener = None
+
+    if async_handler:
+        log_queue = queue.SimpleQueue()
+        root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _queue_listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _queue_listener.start()
+        atexit.register(_stop_queue_listener)
+    else:
+        root_logger.addHandler(handler)
+    root_logger.propagate = False
+
+    logging.getLogger(SCHEMA_LOGGER_NAME).setLevel(logging.DEBUG if verbose_schema else logging.WARNING)
+    return root_logger
+
+
+def _stop_queue_listener():
+    global _queue_listener
+    if _queue_listener:
+        _queue_listener.stop()
+        _queue_listener = None
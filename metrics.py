@@ -0,0 +1,423 @@
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("timeplan.metrics")
+
+# Seconds; covers sub-millisecond cached queries up to multi-second page rebuilds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class _SampleMetric(_Metric):
+    """
+    One number per label set, either stored or read from a callback.
+
+    set_function() makes it a callback metric, read only when the metrics are exported.
+    """
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+        self._function = None
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(self, function):
+        """function() returns a number (no labels) or a {label value tuple: number} dict."""
+        self._function = function
+
+    def _render_samples(self):
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception as e:
+                logger.debug("Metric %s callback failed: %s", self.name, e)
+                return []
+            items = sorted(result.items()) if isinstance(result, dict) else [((), result)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_SampleMetric):
+    """
+    A value that only goes up (queries run, errors, ...).
+
+    A callback counter (set_function) must return running totals, e.g. RetryPolicy.stats.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_SampleMetric):
+    """A value that goes up and down (widget count, pending writes, ...)."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets, plus their sum and count (latencies)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def count(self, **labels):
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def _render_samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds metrics by name and renders them in the Prometheus text exposition format.
+
+    Example:
+        registry = MetricsRegistry()
+        clicks = registry.counter("timeplan_clicks_total", "Clicks.", ["button"])
+        clicks.inc(button="add")
+        print(registry.render())
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry for the app; DatabaseMetrics / UiMetrics report into it by default
+REGISTRY = MetricsRegistry()
+
+
+def _statement_type(query):
+    keyword = query.lstrip().split(None, 1)[0].lower() if query.strip() else ""
+    return keyword if keyword in ("select", "insert", "update", "delete", "create", "alter", "pragma") else "other"
+
+
+class DatabaseMetrics:
+    """
+    Query observer that reports DatabaseManager activity into a registry:
+    query count/latency/rows/errors per statement type, pending writes and lru cache hit rates.
+
+    Example:
+        DatabaseMetrics().attach(db_manager)
+    """
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        self.db_manager = None
+        self.queries = registry.counter("timeplan_db_queries_total", "Statements run by DatabaseManager.", ["statement"])
+        self.errors = registry.counter("timeplan_db_query_errors_total", "Statements that raised an error.", ["statement"])
+        self.rows = registry.counter("timeplan_db_rows_total", "Rows returned or changed.", ["statement"])
+        self.latency = registry.histogram("timeplan_db_query_seconds", "Statement wall time.", ["statement"])
+        self.pending_writes = registry.gauge("timeplan_db_pending_writes",
+                                             "1 while a write transaction is open and not yet committed.")
+        self.pending_writes.set_function(self._pending_writes)
+        # Running totals kept by RetryPolicy / functools.lru_cache, so they are exported as counters
+        registry.counter("timeplan_db_busy_retries_total", "Statements retried after a busy/locked error.").set_function(
+            lambda: self._retry_stat("retries"))
+        registry.counter("timeplan_db_busy_wait_seconds_total",
+                         "Time spent backing off before busy/locked retries.").set_function(
+            lambda: self._retry_stat("wait_time"))
+        registry.counter("timeplan_db_busy_gave_up_total", "Statements that still failed after all retries.").set_function(
+            lambda: self._retry_stat("gave_up"))
+        registry.counter("timeplan_cache_hits_total", "lru_cache hits per cache.", ["cache"]).set_function(
+            lambda: self._cache_info("hits"))
+        registry.counter("timeplan_cache_misses_total", "lru_cache misses per cache.", ["cache"]).set_function(
+            lambda: self._cache_info("misses"))
+        registry.gauge("timeplan_cache_hit_ratio", "lru_cache hits / lookups per cache.", ["cache"]).set_function(self._cache_hit_ratio)
+
+    def attach(self, db_manager):
+        self.db_manager = db_manager
+        db_manager.add_query_observer(self.record)
+        return self
+
+    def detach(self):
+        if self.db_manager:
+            self.db_manager.remove_query_observer(self.record)
+            self.db_manager = None
+
+    def record(self, query, params, elapsed, rows, error=None):
+        """Query observer callback (see DatabaseManager.add_query_observer)."""
+        statement = _statement_type(query)
+        self.queries.inc(statement=statement)
+        self.latency.observe(elapsed, statement=statement)
+        if rows:
+            self.rows.inc(rows, statement=statement)
+        if error is not None:
+            self.errors.inc(statement=statement)
+
+    def _pending_writes(self):
+        conn = self.db_manager.conn if self.db_manager else None
+        return 1 if conn is not None and conn.in_transaction else 0
+
+    def _retry_stat(self, field):
+        return self.db_manager.retry_policy.stats()[field] if self.db_manager else 0
+
+    @staticmethod
+    def _caches():
+        # Imported here so the registry itself has no dependency on the app modules
+        import clock
+        import dateUtils
+        import queryProfiler
+        return {
+            "parse_date": dateUtils.parse_date,
+            "date_ordinal": dateUtils.date_ordinal,
+            "format_due_label": dateUtils.format_due_label,
+            "format_day_heading": dateUtils.format_day_heading,
+            "normalize_query": queryProfiler.normalize_query,
+            "get_timezone": clock.get_timezone,
+        }
+
+    def _cache_info(self, field):
+        return {(name, ): getattr(cached.cache_info(), field) for name, cached in self._caches().items()}
+
+    def _cache_hit_ratio(self):
+        ratios = {}
+        for name, cached in self._caches().items():
+            info = cached.cache_info()
+            lookups = info.hits + info.misses
+            ratios[(name, )] = info.hits / lookups if lookups else 0.0
+        return ratios
+
+
+class UiMetrics:
+    """
+    Reports UI actions (see uiPerf.ActionTimings) into a registry: latency per action and widget count.
+
+    Example:
+        action_timings.listeners.append(UiMetrics().record_action)
+    """
+
+    def __init__(self, registry=REGISTRY):
+        self.actions = registry.histogram("timeplan_ui_action_seconds",
+                                          "UI action time from call until update_idletasks() finished.", ["action"])
+        self.action_queries = registry.counter("timeplan_ui_action_queries_total", "Queries run by UI actions.", ["action"])
+        self.widgets = registry.gauge("timeplan_ui_widgets", "Live Tk widgets after the last UI action.")
+
+    def record_action(self, timing):
+        """ActionTimings listener."""
+        self.actions.observe(timing.elapsed, action=timing.name)
+        self.action_queries.inc(timing.query_count, action=timing.name)
+        self.widgets.set(timing.widget_count)
+
+
+class FileExporter:
+    """Rewrites a Prometheus text file every `interval` seconds (for node_exporter's textfile collector)."""
+
+    def __init__(self, registry, path, interval=15.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.write()
+            if self._stop_event.wait(self.interval):
+                break
+
+    def write(self):
+        # Write then rename, so a scraper never reads a half-written file
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as metrics_file:
+                metrics_file.write(self.registry.render())
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write metrics file %s: %s", self.path, e)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.write()
+
+
+class HttpExporter:
+    """Serves GET /metrics on localhost only."""
+
+    def __init__(self, registry, port=9464, host="127.0.0.1"):
+        self.registry = registry
+        registry_ref = registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("metrics request: " + format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+
+def start_exporter_from_env(registry=REGISTRY):
+    """
+    Start exporting as configured by the environment, or return None if nothing is set:
+
+        TIMEPLAN_METRICS_PORT       serve http://127.0.0.1:<port>/metrics
+        TIMEPLAN_METRICS_FILE       rewrite this file every TIMEPLAN_METRICS_INTERVAL seconds (default 15)
+    """
+    port = os.environ.get("TIMEPLAN_METRICS_PORT")
+    if port:
+        try:
+            exporter = HttpExporter(registry, int(port)).start()
+            logger.info("Serving metrics on http://127.0.0.1:%d/metrics", exporter.port)
+            return exporter
+        except (ValueError, OSError) as e:
+            logger.warning("Could not serve metrics on port %r: %s", port, e)
+            return None
+    path = os.environ.get("TIMEPLAN_METRICS_FILE")
+    if path:
+        try:
+            interval = float(os.environ.get("TIMEPLAN_METRICS_INTERVAL", "15"))
+        except ValueError:
+            interval = 15.0
+        return FileExporter(registry, path, interval).start()
+    return None
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from queryProfiler import normalize_query
+from logSetup import LazyMessage
+
+logger = logging.getLogger("timeplan.querybudget")
+
+# Max queries per UI action; going over logs a warning in the app and fails tests/test_query_budgets.py
+QUERY_BUDGETS = {
+    "show_tasks_page": 3,
+    "show_calendar_page": 3,
+    "show_task_detail": 2,
+    "search_keystroke": 2,
+}
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised by ActionTracker.expect_queries when an action runs more queries than allowed."""
+
+
+class ActionStats:
+    """The queries run during one UI action (a page show, a toggle, a search keystroke, ...)."""
+
+    def __init__(self, name, budget=None):
+        self.name = name
+        self.budget = budget
+        self.query_count = 0
+        self.shapes = Counter()
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+        self.n_plus_one = []
+
+    def add(self, shape):
+        self.query_count += 1
+        self.shapes[shape] += 1
+
+    def finish(self, n_plus_one_threshold):
+        self.elapsed = time.perf_counter() - self.started_at
+        # The same query shape repeated many times in one action is almost always a per-row lookup
+        self.n_plus_one = [(shape, count) for shape, count in self.shapes.most_common()
+                           if count > n_plus_one_threshold]
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.query_count > self.budget
+
+    def describe(self):
+        """Get a readable summary, listing the repeated shapes if any."""
+        text = f"{self.name}: {self.query_count} queries in {self.elapsed * 1000:.1f} ms"
+        if self.budget is not None:
+            text += f" (budget {self.budget})"
+        for shape, count in self.n_plus_one:
+            text += f"\n  N+1: {count}x {shape[:120]}"
+        return text
+
+
+class ActionTracker:
+    """
+    Counts the queries each UI action runs and flags budget overruns and N+1 patterns.
+
+    Actions nest (e.g. a toggle that re-renders the page); a query counts toward every
+    action that is open when it runs.
+
+    Example:
+        tracker = ActionTracker()
+        tracker.attach(db_manager)
+        with tracker.action("show_tasks_page", budget=3):
+            app.show_tasks_page()
+
+        # In a test, fail instead of warning:
+        with tracker.expect_queries("show_tasks_page", max_queries=3):
+            app.show_tasks_page()
+    """
+
+    def __init__(self, n_plus_one_threshold=10, on_violation=None, history_size=200):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.on_violation = on_violation if on_violation else self._log_violation
+        self.history = deque(maxlen=history_size)
+        self.db_manager = None
+        self._local = threading.local()
+
+    def attach(self, db_manager):
+        """Start counting the queries run by db_manager."""
+        self.db_manager = db_manager
+        db_manager.add_query_observer(self.record)
+
+    def detach(self):
+        if self.db_manager:
+            self.db_manager.remove_query_observer(self.record)
+            self.db_manager = None
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, query, params, elapsed, rows, error=None):
+        """Query observer callback (see DatabaseManager.add_query_observer)."""
+        stack = self._stack()
+        if not stack:
+            return
+        shape = normalize_query(query)
+        for stats in stack:
+            stats.add(shape)
+
+    @contextmanager
+    def action(self, name, budget=None):
+        """Track the queries run inside the block as one action. Yields its ActionStats."""
+        stats = ActionStats(name, budget)
+        stack = self._stack()
+        stack.append(stats)
+        try:
+            yield stats
+        finally:
+            stack.remove(stats)
+            stats.finish(self.n_plus_one_threshold)
+            self.history.append(stats)
+            if stats.over_budget or stats.n_plus_one:
+                self.on_violation(stats)
+
+    @contextmanager
+    def expect_queries(self, name, max_queries):
+        """Like action(), but raise QueryBudgetExceeded if the block runs more than max_queries queries."""
+        with self.action(name, budget=max_queries) as stats:
+            yield stats
+        if stats.over_budget:
+            raise QueryBudgetExceeded(stats.describe())
+
+    def last(self, name=None):
+        """Get the most recent finished action (optionally with the given name), or None."""
+        for stats in reversed(self.history):
+            if name is None or stats.name == name:
+                return stats
+        return None
+
+    def _log_violation(self, stats):
+        # describe() is only built if the warning is actually emitted
+        logger.warning("Query budget warning: %s", LazyMessage(stats.describe))
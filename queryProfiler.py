@@ -0,0 +1,182 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from logSetup import app_data_dir
+
+logger = logging.getLogger("timeplan.profiler")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Only these statements can be passed to EXPLAIN QUERY PLAN
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+
+@lru_cache(maxsize=2048)
+def normalize_query(query):
+    """
+    Reduce a SQL statement to its "shape", so the same query with different
+    values/whitespace is grouped together.
+
+    Example:
+        "SELECT * FROM tasks  WHERE task_id = 5" -> "SELECT * FROM tasks WHERE task_id = ?"
+    """
+    shape = _STRING_LITERAL.sub("?", query)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _WHITESPACE.sub(" ", shape).strip()
+    # "IN (?, ?, ?)" and "IN (?, ?)" are the same shape
+    shape = _PLACEHOLDER_LIST.sub("(?, ...)", shape)
+    return shape
+
+
+def percentile(sorted_values, fraction):
+    """Get a percentile (fraction 0.0-1.0) from an already sorted list, or 0.0 for an empty list."""
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class QueryShapeStats:
+    """Running statistics for one query shape. Percentiles are over the most recent samples."""
+
+    def __init__(self, shape, max_samples=1000):
+        self.shape = shape
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.total_rows = 0
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, elapsed, rows, error=None):
+        self.count += 1
+        self.total_time += elapsed
+        self.total_rows += rows
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        if error is not None:
+            self.errors += 1
+        self.samples.append(elapsed)
+
+    def percentiles(self):
+        """Get (p50, p95, p99) in seconds."""
+        ordered = sorted(self.samples)
+        return percentile(ordered, 0.50), percentile(ordered, 0.95), percentile(ordered, 0.99)
+
+
+class QueryProfiler:
+    """
+    Records wall time, rows and the normalized shape of every statement that goes
+    through DatabaseManager._execute_query/_fetch_all/_fetch_one.
+
+    Statements slower than slow_threshold_ms are written to slow_log_path together
+    with their EXPLAIN QUERY PLAN (default slow_queries.log in the app data dir, see
+    app_data_dir; "" turns the log off).
+
+    Example:
+        profiler = QueryProfiler(slow_threshold_ms=50)
+        profiler.attach(db_manager)
+        ...
+        print(profiler.format_report())
+    """
+
+    def __init__(self, slow_threshold_ms=50.0, slow_log_path=None, max_samples=1000):
+        self.slow_threshold = slow_threshold_ms / 1000.0
+        self.slow_log_path = slow_log_path
+        self.max_samples = max_samples
+        self.shapes = {}
+        self.db_manager = None
+        self._lock = threading.Lock()
+
+    def attach(self, db_manager):
+        """Start profiling every query run by db_manager."""
+        self.db_manager = db_manager
+        db_manager.add_query_observer(self.record)
+
+    def detach(self):
+        if self.db_manager:
+            self.db_manager.remove_query_observer(self.record)
+            self.db_manager = None
+
+    def record(self, query, params, elapsed, rows, error=None):
+        """Query observer callback (see DatabaseManager.add_query_observer)."""
+        shape = normalize_query(query)
+        with self._lock:
+            stats = self.shapes.get(shape)
+            if stats is None:
+                stats = self.shapes[shape] = QueryShapeStats(shape, self.max_samples)
+            stats.add(elapsed, rows, error)
+        if elapsed >= self.slow_threshold and self.slow_log_path != "":
+            self._log_slow_query(query, params, shape, elapsed, rows)
+
+    def _explain(self, query, params):
+        """Get the EXPLAIN QUERY PLAN lines for a statement (bypasses the observers)."""
+        if not self.db_manager or not self.db_manager.conn:
+            return []
+        if not query.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+        try:
+            cursor = self.db_manager.conn.cursor()
+            cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+            return [row[3] for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"(could not explain: {e})"]
+
+    def _log_slow_query(self, query, params, shape, elapsed, rows):
+        plan = self._explain(query, params)
+        lines = [
+            f"{time.strftime('%Y-%m-%d %H:%M:%S')} slow query: {elapsed * 1000:.1f} ms, {rows} rows",
+            f"  shape:  {shape}",
+            f"  params: {repr(tuple(params))[:200]}",
+        ]
+        lines.extend(f"  plan:   {step}" for step in plan)
+        try:
+            if self.slow_log_path is None:
+                self.slow_log_path = os.path.join(app_data_dir(), "slow_queries.log")
+            with open(self.slow_log_path, "a", encoding="utf-8") as log_file:
+                log_file.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning("Could not write slow query log %s: %s", self.slow_log_path, e)
+
+    def report(self):
+        """Get per-shape stats as dicts, slowest total time first."""
+        with self._lock:
+            all_stats = list(self.shapes.values())
+        rows = []
+        for stats in all_stats:
+            p50, p95, p99 = stats.percentiles()
+            rows.append({
+                "shape": stats.shape,
+                "count": stats.count,
+                "errors": stats.errors,
+                "total_ms": stats.total_time * 1000,
+                "mean_ms": stats.total_time * 1000 / stats.count,
+                "p50_ms": p50 * 1000,
+                "p95_ms": p95 * 1000,
+                "p99_ms": p99 * 1000,
+                "max_ms": stats.max_time * 1000,
+                "rows": stats.total_rows,
+            })
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def format_report(self, limit=20):
+        """Get a plain-text table of the most expensive query shapes."""
+        lines = [f"{'count':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'rows':>8}  shape"]
+        for row in self.report()[:limit]:
+            lines.append(
+                f"{row['count']:>7} {row['total_ms']:>10.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                f"{row['p99_ms']:>8.2f} {row['rows']:>8}  {row['shape'][:120]}"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
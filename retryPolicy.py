@@ -0,0 +1,70 @@
+import random
+import sqlite3
+import threading
+import time
+
+
+def is_busy_error(error):
+    """True for SQLITE_BUSY / SQLITE_LOCKED ("database is locked", "database table is locked", "... is busy")."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class RetryPolicy:
+    """
+    Retries statements that failed because another connection/process holds the database lock,
+    with exponential backoff and jitter (so competing instances don't retry in lockstep).
+
+    The delay before retry n (0-based) is drawn from [cap * (1 - jitter), cap], where
+    cap = min(max_delay, base_delay * multiplier ** n).
+
+    Example:
+        policy = RetryPolicy(max_attempts=8, base_delay=0.02)
+        db = DatabaseManager("timePlanDB.db", retry_policy=policy)
+        ...
+        print(policy.retries, policy.wait_time)
+    """
+
+    def __init__(self, max_attempts=6, base_delay=0.01, max_delay=1.0, multiplier=2.0, jitter=0.5,
+                 rng=None, sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.rng = rng if rng else random.Random()
+        self.sleep = sleep
+        # Counters (shared by every connection using this policy)
+        self.retries = 0
+        self.wait_time = 0.0
+        self.gave_up = 0
+        self._lock = threading.Lock()
+
+    def delay(self, attempt):
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        cap = min(self.max_delay, self.base_delay * self.multiplier ** attempt)
+        return cap * (1 - self.jitter * self.rng.random())
+
+    def should_retry(self, error, attempt):
+        """Whether a statement that failed with error on try number `attempt` (0-based) should be tried again."""
+        if not is_busy_error(error):
+            return False
+        if attempt + 1 >= self.max_attempts:
+            with self._lock:
+                self.gave_up += 1
+            return False
+        return True
+
+    def wait(self, attempt):
+        delay = self.delay(attempt)
+        self.sleep(delay)
+        with self._lock:
+            self.retries += 1
+            self.wait_time += delay
+        return delay
+
+    def stats(self):
+        with self._lock:
+            return {"retries": self.retries, "wait_time": self.wait_time, "gave_up": self.gave_up}
@@ -0,0 +1,57 @@
+class MidnightRolloverScheduler:
+    """
+    Runs DatabaseManager.run_midnight_rollover once at every local midnight.
+
+    The scheduler uses the Tk event loop (widget.after), so the sweep and the
+    on_rollover callback always run on the UI thread. Midnight is taken from
+    db_manager.clock, so it follows the user's timezone setting. With user_id only
+    that user's tasks and habits are swept (see run_midnight_rollover).
+
+    The sweep publishes change events on db_manager.events (ending with DayRolledOver),
+    so views that follow the bus (e.g. through a TkEventBatcher) need no on_rollover.
+    """
+
+    # Fire a little after midnight so the new local date is already in effect
+    GRACE_MS = 1000
+
+    def __init__(self, widget, db_manager, on_rollover=None, user_id=None):
+        self.widget = widget
+        self.db_manager = db_manager
+        self.on_rollover = on_rollover
+        self.user_id = user_id
+        self._after_id = None
+
+    def start(self):
+        """
+        Catch up on a missed sweep (e.g. the app was closed over midnight) once the UI is idle,
+        so the first page paints before it, then schedule the next one.
+        """
+        self._after_id = self.widget.after_idle(self._catch_up)
+
+    def _catch_up(self):
+        self._after_id = None
+        self._sweep()
+        self._schedule_next()
+
+    def _sweep(self):
+        if self.db_manager.run_midnight_rollover(user_id=self.user_id) and self.on_rollover:
+            self.on_rollover()
+        # A per-user sweep leaves the database-wide archiving/compaction to run_daily_maintenance
+        if self.user_id is not None:
+            self.db_manager.run_daily_maintenance()
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _schedule_next(self):
+        delay_ms = int(self.db_manager.clock.seconds_until_next_midnight() * 1000) + self.GRACE_MS
+        self._after_id = self.widget.after(delay_ms, self._on_midnight)
+
+    def _on_midnight(self):
+        self._after_id = None
+        # run_midnight_rollover is a no-op if today's sweep was already recorded,
+        # so an early wake-up (clock drift, suspend/resume) just reschedules
+        self._sweep()
+        self._schedule_next()
@@ -0,0 +1,155 @@
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from logSetup import StructuredFormatter, app_data_dir, diagnostics_enabled
+
+logger = logging.getLogger("timeplan.stalls")
+
+
+def configure_stall_log(log_path, max_bytes=1_000_000, backup_count=3):
+    """Send stall records to a size-rotated file (stalls.log, stalls.log.1, ...) that can be collected from user machines."""
+    for old_handler in list(logger.handlers):
+        logger.removeHandler(old_handler)
+        old_handler.close()
+    handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count,
+                                                   encoding="utf-8", delay=True)
+    handler.setFormatter(StructuredFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    # Stack dumps stay in the stall log instead of the console
+    logger.propagate = False
+    return handler
+
+
+class Stall:
+    """One main-loop stall: how long the loop was blocked and where the main thread was at the time."""
+
+    __slots__ = ("started_at", "duration", "stack")
+
+    def __init__(self, started_at, duration, stack):
+        self.started_at = started_at
+        self.duration = duration
+        self.stack = stack
+
+
+class StallWatchdog:
+    """
+    Detects when the Tk main loop is blocked (long DB call, big widget rebuild, ...).
+
+    The main thread reschedules a tick with after(tick_ms) and measures how late each tick
+    runs. A helper thread watches the time of the last tick; once the loop has been silent
+    for threshold_ms it grabs the main thread's Python stack (sys._current_frames), because
+    by the time the late tick runs the blocking code has already returned.
+
+    Example:
+        configure_stall_log(os.path.join(app_data_dir(), "stalls.log"))
+        watchdog = StallWatchdog(app, threshold_ms=200)
+        watchdog.start()
+    """
+
+    def __init__(self, widget, threshold_ms=200, tick_ms=50, history_size=100):
+        self.widget = widget
+        self.threshold = threshold_ms / 1000.0
+        self.tick_ms = tick_ms
+        self.stalls = deque(maxlen=history_size)
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self._after_id = None
+        self._last_tick = None
+        self._captured_stack = None
+        self._main_thread_id = threading.main_thread().ident
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._last_tick = time.perf_counter()
+        self._after_id = self.widget.after(self.tick_ms, self._tick)
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _tick(self):
+        now = time.perf_counter()
+        with self._lock:
+            lag = now - self._last_tick - self.tick_ms / 1000.0
+            stack = self._captured_stack
+            self._captured_stack = None
+            self._last_tick = now
+        if lag > self.max_lag:
+            self.max_lag = lag
+        if lag >= self.threshold:
+            self._record_stall(lag, stack)
+        self._after_id = self.widget.after(self.tick_ms, self._tick)
+
+    def _watch(self):
+        # Poll at a fraction of the threshold so the stack is taken while the loop is still blocked
+        interval = max(self.threshold / 4, 0.01)
+        while not self._stop_event.wait(interval):
+            with self._lock:
+                silent_for = time.perf_counter() - self._last_tick - self.tick_ms / 1000.0
+                already_captured = self._captured_stack is not None
+            if silent_for >= self.threshold and not already_captured:
+                stack = self._main_thread_stack()
+                with self._lock:
+                    self._captured_stack = stack
+
+    def _main_thread_stack(self):
+        frame = sys._current_frames().get(self._main_thread_id)
+        if frame is None:
+            return None
+        return "".join(traceback.format_stack(frame))
+
+    def _record_stall(self, lag, stack):
+        stall = Stall(time.time() - lag, lag, stack)
+        self.stalls.append(stall)
+        self.stall_count += 1
+        logger.warning(
+            "main loop stalled for %.0f ms\n%s", lag * 1000, stack or "  (no stack captured)",
+            extra={"stall_ms": round(lag * 1000, 1)},
+        )
+
+
+def start_from_env(widget):
+    """
+    Start a watchdog on widget as configured by the environment, or return None if it's turned off.
+    It is off by default (it wakes the loop every tick_ms and runs a helper thread):
+
+        TIMEPLAN_STALL_MS       stall threshold in ms; setting it turns the watchdog on (0 = off)
+        TIMEPLAN_DEBUG          1 turns it on with a 200 ms threshold when TIMEPLAN_STALL_MS isn't set
+        TIMEPLAN_STALL_LOG      rotating log file (default stalls.log in the app data dir, see app_data_dir)
+    """
+    setting = os.environ.get("TIMEPLAN_STALL_MS")
+    if setting is None:
+        if not diagnostics_enabled():
+            return None
+        setting = "200"
+    try:
+        threshold_ms = float(setting)
+    except ValueError:
+        threshold_ms = 200.0
+    if threshold_ms <= 0:
+        return None
+    configure_stall_log(os.environ.get("TIMEPLAN_STALL_LOG") or os.path.join(app_data_dir(), "stalls.log"))
+    watchdog = StallWatchdog(widget, threshold_ms=threshold_ms)
+    watchdog.start()
+    return watchdog
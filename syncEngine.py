@@ -0,0 +1,473 @@
+"""
+Incremental two-way sync between planner databases, e.g. the copies on a laptop and a desktop.
+
+Every database is a replica with its own id (kept in app_state). A sync exchanges changesets:
+the tasks and habits changed since the previous changeset, found through change_log, plus
+tombstones for deleted rows. Rows are matched across replicas by sync_id, and categories,
+priorities and users are sent by name, because the local ids differ between databases.
+Archived tasks (tasks_archive) are sent too, flagged "archived", and are archived on import.
+
+Credentials are never synced: a changeset lists the usernames its rows belong to, without
+passwords. An account first seen through sync is created locked (LOCKED_PASSWORD, which no
+password hashes to), so its tasks arrive but nobody can log in to it on this replica.
+
+When both replicas changed the same row, the copy with the higher version wins, then the
+later updated_at, then the higher replica id, so both sides pick the same winner. Applying a
+changeset is idempotent, so an interrupted sync can simply be run again.
+
+    python syncEngine.py --db timePlanDB.db dir /path/to/shared/folder   # two-way via a shared folder
+    python syncEngine.py --db timePlanDB.db export changes.json           # changes since the last export
+    python syncEngine.py --db timePlanDB.db import changes.json
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+import uuid
+from databaseManagement import DatabaseManager
+from eventBus import TaskAdded, TaskUpdated, TaskDeleted, HabitAdded, HabitUpdated, HabitDeleted
+from logSetup import configure_logging
+
+logger = logging.getLogger("timeplan.sync")
+
+CHANGESET_FORMAT = 1
+
+# Stored as the password of accounts created by an import; never equal to a password hash
+LOCKED_PASSWORD = "!"
+
+# Columns sent as-is for each synced table (ids are mapped separately)
+TASK_FIELDS = ("task_title", "description", "due_date", "created_at")
+HABIT_FIELDS = ("rtask_title", "description", "start_date", "recurrence_pattern", "last_completed_date", "status")
+
+_TASK_EXPORT_COLUMNS = ("task_id, sync_id, version, updated_at, task_title, description, due_date, created_at, "
+                        "priority_id, category_id, user_id")
+
+_EXPORT_QUERIES = {
+    # Archiving doesn't log a change, so archived rows are looked up by the same ids as live ones
+    "tasks": f"""
+        SELECT t.task_id, t.sync_id, t.version, t.updated_at, t.task_title, t.description, t.due_date,
+               t.created_at, p.priority_name, tc.category_name, u.username, t.archived
+        FROM (SELECT {_TASK_EXPORT_COLUMNS}, 0 AS archived FROM tasks
+              UNION ALL
+              SELECT {_TASK_EXPORT_COLUMNS}, 1 AS archived FROM tasks_archive) t
+        LEFT JOIN priority p ON t.priority_id = p.priority_id
+        LEFT JOIN task_category tc ON t.category_id = tc.category_id
+        LEFT JOIN users u ON t.user_id = u.user_id
+    """,
+    "recurring_tasks": """
+        SELECT r.rtask_id, r.sync_id, r.version, r.updated_at, r.rtask_title, r.description, r.start_date,
+               r.recurrence_pattern, r.last_completed_date, r.status, u.username, 0 AS archived
+        FROM recurring_tasks r
+        LEFT JOIN users u ON r.user_id = u.user_id
+    """,
+}
+_ID_ALIASES = {"tasks": "t", "recurring_tasks": "r"}
+
+# Events published on db.events for imported rows: table -> (added, updated, deleted)
+_IMPORT_EVENTS = {
+    "tasks": (TaskAdded, TaskUpdated, TaskDeleted),
+    "recurring_tasks": (HabitAdded, HabitUpdated, HabitDeleted),
+}
+
+# How many ids go into one "IN (...)" lookup (below sqlite's bound-parameter limit)
+_CHUNK_SIZE = 500
+
+
+def _chunks(items, size=_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def remote_wins(remote, local, remote_replica, local_replica):
+    """
+    The conflict rule: compare (version, updated_at, replica id), higher wins.
+
+    remote and local are dicts with "version" and "updated_at" (local is None if the row is
+    unknown here, in which case the remote copy always wins).
+    """
+    if local is None:
+        return True
+    remote_key = (remote["version"], remote["updated_at"] or "", remote_replica)
+    local_key = (local["version"], local["updated_at"] or "", local_replica)
+    return remote_key > local_key
+
+
+class SyncResult:
+    """Counters for one imported changeset."""
+
+    def __init__(self):
+        self.applied = 0
+        self.deleted = 0
+        self.skipped = 0
+        self.conflicts = 0
+
+    def __repr__(self):
+        return (f"SyncResult(applied={self.applied}, deleted={self.deleted}, "
+                f"skipped={self.skipped}, conflicts={self.conflicts})")
+
+
+class SyncEngine:
+    """
+    Exports and imports changesets for one database.
+
+    Example:
+        engine = SyncEngine(DatabaseManager("timePlanDB.db"))
+        engine.sync_directory("/media/usb/timeplan-sync")
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.replica_id = db.get_app_state('sync_replica_id')
+        if not self.replica_id:
+            self.replica_id = uuid.uuid4().hex
+            db.set_app_state('sync_replica_id', self.replica_id)
+
+    # --- Watermarks (app_state) ---
+    def exported_seq(self):
+        """change_log seq covered by the last changeset this replica exported."""
+        return int(self.db.get_app_state('sync_exported_seq') or 0)
+
+    def imported_seq(self, peer_id):
+        """Highest change_log seq of peer_id whose changes were imported here."""
+        return int(self.db.get_app_state(f'sync_peer:{peer_id}') or 0)
+
+    # --- Export ---
+    def export_changes(self, since_seq=None, full=False):
+        """
+        Build a changeset with everything changed after since_seq (default: the last export).
+
+        Falls back to a full export when since_seq is 0 or compaction already dropped change_log
+        entries after it. Call mark_exported(changeset) once the changeset has been written.
+        """
+        db = self.db
+        db.assign_missing_sync_ids()
+        since_seq = self.exported_seq() if since_seq is None else since_seq
+        upto_seq = db.latest_change_seq()
+        full = full or since_seq == 0 or since_seq < db.change_log_truncated_seq()
+
+        rows = []
+        for table_name in DatabaseManager.SYNC_TABLES:
+            if full:
+                rows.extend(self._export_rows(table_name, None))
+                rows.extend(self._export_tombstones(table_name, None))
+                continue
+            row_ids = self._changed_row_ids(table_name, since_seq, upto_seq)
+            rows.extend(self._export_rows(table_name, row_ids))
+            # Changed rows that are gone now were deleted
+            present = {row["row_id"] for row in rows if row["table"] == table_name}
+            rows.extend(self._export_tombstones(table_name, row_ids - present))
+        for row in rows:
+            del row["row_id"]
+
+        # Only the names: passwords (even hashed) don't leave this database
+        users = sorted({row["username"] for row in rows if row.get("username")})
+        return {
+            "format": CHANGESET_FORMAT,
+            "replica_id": self.replica_id,
+            "since_seq": 0 if full else since_seq,
+            "upto_seq": upto_seq,
+            "full": full,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "users": users,
+            "rows": rows,
+        }
+
+    def mark_exported(self, changeset):
+        self.db.set_app_state('sync_exported_seq', str(changeset["upto_seq"]))
+
+    def _changed_row_ids(self, table_name, since_seq, upto_seq):
+        row_ids = set()
+        seq = since_seq
+        while seq < upto_seq:
+            page = self.db.changes_since(seq, limit=1000, table_name=table_name)
+            if not page:
+                break
+            for change_seq, _, row_id, _, _, _ in page:
+                if change_seq <= upto_seq:
+                    row_ids.add(row_id)
+            seq = page[-1][0]
+        return row_ids
+
+    def _export_rows(self, table_name, row_ids):
+        """Rows of table_name as changeset dicts; row_ids None means every row."""
+        query = _EXPORT_QUERIES[table_name]
+        id_column = f"{_ID_ALIASES[table_name]}.{DatabaseManager.SYNC_TABLES[table_name]}"
+        if row_ids is None:
+            results = self.db._fetch_all(query)
+        else:
+            results = []
+            for chunk in _chunks(row_ids):
+                placeholders = ",".join("?" * len(chunk))
+                results.extend(self.db._fetch_all(f"{query} WHERE {id_column} IN ({placeholders})", chunk))
+
+        rows = []
+        for result in results:
+            row_id, sync_id, version, updated_at = result[:4]
+            if table_name == "tasks":
+                fields = dict(zip(TASK_FIELDS, result[4:8]))
+                fields["priority_name"], fields["category_name"], username = result[8:11]
+            else:
+                fields = dict(zip(HABIT_FIELDS, result[4:10]))
+                username = result[10]
+            rows.append({"table": table_name, "row_id": row_id, "sync_id": sync_id, "version": version,
+                         "updated_at": updated_at, "deleted": False, "archived": bool(result[-1]),
+                         "username": username, "fields": fields})
+        return rows
+
+    def _export_tombstones(self, table_name, row_ids):
+        query = "SELECT row_id, sync_id, version, deleted_at FROM sync_tombstones WHERE table_name = ?"
+        if row_ids is None:
+            results = self.db._fetch_all(query, (table_name,))
+        else:
+            results = []
+            for chunk in _chunks(row_ids):
+                placeholders = ",".join("?" * len(chunk))
+                results.extend(self.db._fetch_all(f"{query} AND row_id IN ({placeholders})", [table_name] + chunk))
+        return [{"table": table_name, "row_id": row_id, "sync_id": sync_id, "version": version,
+                 "updated_at": deleted_at, "deleted": True}
+                for row_id, sync_id, version, deleted_at in results]
+
+    # --- Import ---
+    def import_changes(self, changeset):
+        """Apply a changeset from another replica; returns a SyncResult."""
+        result = SyncResult()
+        peer_id = changeset["replica_id"]
+        if changeset.get("format") != CHANGESET_FORMAT:
+            raise ValueError(f"Unsupported changeset format: {changeset.get('format')}")
+        if peer_id == self.replica_id:
+            return result
+        imported_seq = self.imported_seq(peer_id)
+        seq_before = self.db.latest_change_seq()
+        for username in changeset.get("users", []):
+            if not self.db.get_user_by_username(username):
+                self.db.add_user(username, LOCKED_PASSWORD)
+        for row in changeset["rows"]:
+            self._import_row(row, peer_id, result)
+
+        self.db.set_app_state(f'sync_peer:{peer_id}', str(max(imported_seq, changeset["upto_seq"])))
+        # What was just applied came from the peer, so don't send it back in the next export
+        if self.exported_seq() == seq_before:
+            self.db.set_app_state('sync_exported_seq', str(self.db.latest_change_seq()))
+        logger.info("Imported changeset", extra={"peer": peer_id, "upto_seq": changeset["upto_seq"],
+                                                 "applied": result.applied, "deleted": result.deleted,
+                                                 "skipped": result.skipped, "conflicts": result.conflicts})
+        return result
+
+    def _local_state(self, table_name, sync_id):
+        """(row_id or None, {"version", "updated_at"} or None, archived) for a sync_id here."""
+        id_column = DatabaseManager.SYNC_TABLES[table_name]
+        row = self.db._fetch_one(f"SELECT {id_column}, version, updated_at FROM {table_name} WHERE sync_id = ?",
+                                 (sync_id,))
+        if row:
+            return row[0], {"version": row[1], "updated_at": row[2]}, False
+        if table_name == "tasks":
+            row = self.db._fetch_one("SELECT task_id, version, updated_at FROM tasks_archive WHERE sync_id = ?",
+                                     (sync_id,))
+            if row:
+                return row[0], {"version": row[1], "updated_at": row[2]}, True
+        tombstone = self.db._fetch_one(
+            "SELECT version, deleted_at FROM sync_tombstones WHERE table_name = ? AND sync_id = ?",
+            (table_name, sync_id)
+        )
+        if tombstone:
+            return None, {"version": tombstone[0], "updated_at": tombstone[1]}, False
+        return None, None, False
+
+    def _import_row(self, row, peer_id, result):
+        table_name = row["table"]
+        if table_name not in DatabaseManager.SYNC_TABLES:
+            result.skipped += 1
+            return
+        row_id, local, archived = self._local_state(table_name, row["sync_id"])
+        if not remote_wins(row, local, peer_id, self.replica_id):
+            if row_id is not None and local["version"] == row["version"] and row.get("archived", False) != archived:
+                # Same data, only archived (or restored) on the peer: move it here too
+                moved = (self.db.archive_task(row_id) if row["archived"] else
+                         self.db.restore_archived_task(row_id))
+                if moved:
+                    result.applied += 1
+                    return
+            result.skipped += 1
+            return
+        if archived:
+            # Changed elsewhere after it was archived here: bring it back, then apply the change as usual
+            self.db.restore_archived_task(row_id)
+        # Both sides changed the row since it was last in sync
+        if local is not None and local["version"] == row["version"]:
+            result.conflicts += 1
+        if row["deleted"]:
+            self._apply_delete(table_name, row_id, row)
+            result.deleted += 1
+        elif self._apply_upsert(table_name, row_id, row):
+            result.applied += 1
+            if row.get("archived"):
+                # Archived on the peer, so keep it out of the live table here too
+                self.db.archive_task(self._local_state(table_name, row["sync_id"])[0])
+        else:
+            result.skipped += 1
+
+    def _apply_delete(self, table_name, row_id, row):
+        # The delete trigger writes a local tombstone; replace it with the remote one so versions match
+        if self.db._execute_query(f"DELETE FROM {table_name} WHERE sync_id = ?", (row["sync_id"],)) and row_id is not None:
+            self.db.events.publish(_IMPORT_EVENTS[table_name][2](row_id))
+        self.db._execute_query(
+            "INSERT OR REPLACE INTO sync_tombstones (table_name, sync_id, row_id, version, deleted_at) "
+            "VALUES (?, ?, (SELECT row_id FROM sync_tombstones WHERE table_name = ? AND sync_id = ?), ?, ?)",
+            (table_name, row["sync_id"], table_name, row["sync_id"], row["version"], row["updated_at"])
+        )
+
+    def _user_id(self, username):
+        user = self.db.get_user_by_username(username) if username else None
+        return user[0] if user else None
+
+    def _apply_upsert(self, table_name, row_id, row):
+        """
+        Write the remote copy with its own version and updated_at: an UPDATE of the local row
+        (so the statistics triggers see the change) or an INSERT for a row new here. Publishes
+        the matching added/updated event, like the DatabaseManager write methods.
+        """
+        db = self.db
+        fields = row["fields"]
+        user_id = self._user_id(row.get("username"))
+        if user_id is None:
+            logger.warning("Skipping %s row %s: unknown user %s", table_name, row["sync_id"], row.get("username"))
+            return False
+        if table_name == "tasks":
+            category_name = fields.get("category_name") or "On-going"
+            category_id = db.get_category_id_by_name(category_name)
+            if category_id is None:
+                db.add_category(category_name)
+                category_id = db.get_category_id_by_name(category_name)
+            priority_id = (db.get_priority_id_by_name(fields.get("priority_name"))
+                           or db.get_priority_id_by_name("Not urgent"))
+            values = {"task_title": fields["task_title"], "description": fields["description"],
+                      "priority_id": priority_id, "due_date": fields["due_date"], "user_id": user_id,
+                      "category_id": category_id, "created_at": fields["created_at"]}
+        else:
+            values = {name: fields[name] for name in HABIT_FIELDS}
+            values["user_id"] = user_id
+        values["updated_at"] = row["updated_at"]
+        values["version"] = row["version"]
+
+        id_column = DatabaseManager.SYNC_TABLES[table_name]
+        if row_id is None:
+            values["sync_id"] = row["sync_id"]
+            query = (f"INSERT INTO {table_name} ({', '.join(values)}) "
+                     f"VALUES ({', '.join('?' * len(values))})")
+            if not db._execute_query(query, tuple(values.values())):
+                return False
+            new_id = db._fetch_one("SELECT last_insert_rowid()")
+            # The row is back (or newer than a local delete), so its tombstone no longer applies
+            db._execute_query("DELETE FROM sync_tombstones WHERE table_name = ? AND sync_id = ?",
+                              (table_name, row["sync_id"]))
+            if new_id:
+                db.events.publish(_IMPORT_EVENTS[table_name][0](new_id[0], user_id))
+            return True
+
+        query = f"UPDATE {table_name} SET {', '.join(name + ' = ?' for name in values)} WHERE {id_column} = ?"
+        if not db._execute_query(query, tuple(values.values()) + (row_id,)):
+            return False
+        # With an equal version (a tie won on updated_at/replica id) the version trigger bumped it; undo that
+        if not db._execute_query(
+            f"UPDATE {table_name} SET version = ?, updated_at = ? WHERE {id_column} = ? AND version <> ?",
+            (row["version"], row["updated_at"], row_id, row["version"])
+        ):
+            return False
+        db.events.publish(_IMPORT_EVENTS[table_name][1](row_id))
+        return True
+
+    # --- Transports ---
+    def export_to_file(self, path, full=False):
+        """Write the changes since the last export to path; returns the changeset."""
+        changeset = self.export_changes(full=full)
+        write_changeset(changeset, path)
+        self.mark_exported(changeset)
+        return changeset
+
+    def import_from_file(self, path):
+        return self.import_changes(read_changeset(path))
+
+    def sync_directory(self, directory, full=False):
+        """
+        Two-way sync through a folder every replica can reach (a USB stick, a network share, a
+        synced cloud folder). Imports the other replicas' new changeset files, then adds this
+        replica's own. Returns {peer_id: SyncResult}.
+        """
+        os.makedirs(directory, exist_ok=True)
+        results = {}
+        for path in sorted(glob.glob(os.path.join(directory, "*.changes.json"))):
+            peer_id, upto_seq = _parse_changeset_name(path)
+            if peer_id is None or peer_id == self.replica_id or upto_seq <= self.imported_seq(peer_id):
+                continue
+            changeset = read_changeset(path)
+            result = self.import_changes(changeset)
+            if peer_id in results:
+                for counter in ("applied", "deleted", "skipped", "conflicts"):
+                    setattr(results[peer_id], counter, getattr(results[peer_id], counter) + getattr(result, counter))
+            else:
+                results[peer_id] = result
+
+        changeset = self.export_changes(full=full)
+        if changeset["rows"] or changeset["full"]:
+            write_changeset(changeset, os.path.join(directory, changeset_name(self.replica_id, changeset["upto_seq"])))
+        self.mark_exported(changeset)
+        return results
+
+
+def changeset_name(replica_id, upto_seq):
+    # Zero padded so a plain sort is oldest first
+    return f"{replica_id}-{upto_seq:012d}.changes.json"
+
+
+def _parse_changeset_name(path):
+    name = os.path.basename(path)[:-len(".changes.json")]
+    replica_id, _, upto_seq = name.rpartition("-")
+    if not replica_id or not upto_seq.isdigit():
+        return None, 0
+    return replica_id, int(upto_seq)
+
+
+def write_changeset(changeset, path):
+    # Write then rename, so a replica reading the folder never sees a half-written file
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as changeset_file:
+        json.dump(changeset, changeset_file)
+    os.replace(temp_path, path)
+
+
+def read_changeset(path):
+    with open(path, encoding="utf-8") as changeset_file:
+        return json.load(changeset_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python syncEngine.py", description="Sync two planner databases.")
+    parser.add_argument("--db", default="timePlanDB.db", help="database file (default: %(default)s)")
+    parser.add_argument("--full", action="store_true", help="send every row, not just the changes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("dir", help="two-way sync through a shared folder").add_argument("directory")
+    subparsers.add_parser("export", help="write the changes since the last export").add_argument("path")
+    subparsers.add_parser("import", help="apply a changeset written by another replica").add_argument("path")
+    args = parser.parse_args(argv)
+
+    configure_logging(level="INFO")
+    db = DatabaseManager(args.db)
+    try:
+        engine = SyncEngine(db)
+        if args.command == "dir":
+            for peer_id, result in engine.sync_directory(args.directory, full=args.full).items():
+                print(f"{peer_id}: {result}")
+        elif args.command == "export":
+            changeset = engine.export_to_file(args.path, full=args.full)
+            print(f"Exported {len(changeset['rows'])} rows (up to seq {changeset['upto_seq']}) to {args.path}")
+        else:
+            print(engine.import_from_file(args.path))
+    finally:
+        db._close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from dateUtils import format_due_label
+
+MISSED_BG_COLOR = "#FFCDD2"  # Light Red
+COMPLETED_BG_COLOR = "#C8E6C9"  # Light Green
+ONGOING_BG_COLOR = "white"  # Default for uncompleted, non-missed tasks
+
+
+class TaskCard:
+    """
+    What one tasks page card shows, worked out from a Task row without touching Tk or the database.
+
+    TimePlanApp._build_task_card only turns it into widgets, so everything a card needs from the
+    database is loaded up front by load_task_cards (and counted against the page's query budget).
+    """
+
+    __slots__ = ('task_id', 'title', 'description', 'priority_text', 'category_name', 'due_label',
+                 'due_ordinal', 'is_completed', 'is_recurring', 'bg_color', 'title_color')
+
+    def __init__(self, task, today_ordinal, recurring_task_ids):
+        self.task_id = task.task_id
+        self.title = task.title
+        self.description = task.description
+        self.due_ordinal = task.due_ordinal
+        self.is_completed = (task.category_name == "Completed")
+        self.is_recurring = task.task_id in recurring_task_ids
+        if task.priority:
+            self.priority_text = "⚠️ Urgent" if task.priority == "Urgent" else "Not urgent"
+        else:
+            self.priority_text = None
+        self.due_label = format_due_label(task.due_ordinal, today_ordinal) if task.due_date else None
+
+        self.category_name = task.category_name
+        self.bg_color = ONGOING_BG_COLOR
+        self.title_color = "#333333"
+        if self.is_completed:
+            self.bg_color = COMPLETED_BG_COLOR
+            self.title_color = "gray"
+        elif task.due_ordinal is not None and task.due_ordinal < today_ordinal:
+            # Only shown as missed here; the midnight sweep moves it in the database
+            self.category_name = "Missed"
+            self.bg_color = MISSED_BG_COLOR
+            self.title_color = "red"
+
+    def __repr__(self):
+        return f"TaskCard(task_id={self.task_id!r}, title={self.title!r}, category_name={self.category_name!r})"
+
+
+def load_task_cards(db_manager, user_id, filter_type, sort_by, today_ordinal):
+    """
+    Load the cards of the tasks page, in display order: the filtered task query plus one
+    query for the recurring indicator (skipped when there are no tasks).
+    """
+    tasks = db_manager.get_tasks(user_id=user_id, filter_type=filter_type, sort_by=sort_by)
+    recurring_task_ids = db_manager.get_recurring_task_ids() if tasks else set()
+    return [TaskCard(task, today_ordinal, recurring_task_ids) for task in tasks]
@@ -0,0 +1,134 @@
+import sys
+from datetime import date
+from dateUtils import date_ordinal
+
+
+def _intern(value):
+    """Share one copy of repeated strings (category/priority names, due dates) across rows."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Task:
+    """
+    A row from the tasks table, joined with its priority and category names.
+
+    Created once per row by Task.row_factory. due_ordinal is the parsed due date
+    (date.toordinal()) so views can compare/sort dates without parsing strings again.
+    version is only set by Task.versioned_row_factory (None otherwise).
+    Iterating/indexing a Task still gives the old 6-tuple
+    (task_id, title, description, priority, due_date, category_name).
+    """
+
+    __slots__ = ('task_id', 'title', 'description', 'priority', 'due_date', 'category_name', 'due_ordinal',
+                 'version')
+
+    def __init__(self, task_id, title, description, priority, due_date, category_name, due_ordinal=None,
+                 version=None):
+        self.task_id = task_id
+        self.title = title
+        self.description = description
+        self.priority = priority
+        self.due_date = due_date
+        self.category_name = category_name
+        self.due_ordinal = due_ordinal
+        self.version = version
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory for SELECT task_id, task_title, description, priority_name, due_date, category_name."""
+        due_date = _intern(row[4])
+        return cls(row[0], row[1], row[2], _intern(row[3]), due_date, _intern(row[5]), date_ordinal(due_date))
+
+    @classmethod
+    def versioned_row_factory(cls, cursor, row):
+        """Like row_factory, with the row's version selected as a seventh column."""
+        task = cls.row_factory(cursor, row)
+        task.version = row[6]
+        return task
+
+    @property
+    def due(self):
+        """The due date as a datetime.date, or None."""
+        return date.fromordinal(self.due_ordinal) if self.due_ordinal is not None else None
+
+    def _as_tuple(self):
+        return (self.task_id, self.title, self.description, self.priority, self.due_date, self.category_name)
+
+    def __iter__(self):
+        return iter(self._as_tuple())
+
+    def __len__(self):
+        return 6
+
+    def __getitem__(self, index):
+        return self._as_tuple()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Task):
+            return self._as_tuple() == other._as_tuple()
+        if isinstance(other, tuple):
+            return self._as_tuple() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Task(task_id={self.task_id!r}, title={self.title!r}, due_date={self.due_date!r}, category_name={self.category_name!r})"
+
+
+class RecurringTask:
+    """
+    A row from the recurring_tasks table (a habit).
+
+    Created once per row by RecurringTask.row_factory, with last_completed_date parsed
+    into last_completed_ordinal. Iterating/indexing gives the old 7-tuple
+    (rtask_id, title, description, start_date, recurrence_pattern, last_completed_date, status).
+    """
+
+    __slots__ = ('rtask_id', 'title', 'description', 'start_date', 'recurrence_pattern',
+                 'last_completed_date', 'status', 'last_completed_ordinal')
+
+    def __init__(self, rtask_id, title, description, start_date, recurrence_pattern,
+                 last_completed_date, status, last_completed_ordinal=None):
+        self.rtask_id = rtask_id
+        self.title = title
+        self.description = description
+        self.start_date = start_date
+        self.recurrence_pattern = recurrence_pattern
+        self.last_completed_date = last_completed_date
+        self.status = status
+        self.last_completed_ordinal = last_completed_ordinal
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory for SELECT rtask_id, rtask_title, description, start_date,
+        recurrence_pattern, last_completed_date, status."""
+        last_completed_date = _intern(row[5])
+        return cls(row[0], row[1], row[2], _intern(row[3]), _intern(row[4]),
+                   last_completed_date, _intern(row[6]), date_ordinal(last_completed_date))
+
+    def _as_tuple(self):
+        return (self.rtask_id, self.title, self.description, self.start_date,
+                self.recurrence_pattern, self.last_completed_date, self.status)
+
+    def __iter__(self):
+        return iter(self._as_tuple())
+
+    def __len__(self):
+        return 7
+
+    def __getitem__(self, index):
+        return self._as_tuple()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, RecurringTask):
+            return self._as_tuple() == other._as_tuple()
+        if isinstance(other, tuple):
+            return self._as_tuple() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"RecurringTask(rtask_id={self.rtask_id!r}, title={self.title!r}, "
+                f"recurrence_pattern={self.recurrence_pattern!r}, status={self.status!r})")
@@ -6,6 +6,8 @@ import tkinter.messagebox
 from tkcalendar import Calendar #install sa bash yung tkcalendar "pip install tkcalendar"
 from datetime import datetime, timedelta
 import babel.numbers
+import stallWatchdog
+from changeNotifier import DataChangeNotifier
 
 dbName = "timePlanDB.db"
 
@@ -13,6 +15,13 @@ def Connect():
     conn = sqlite3.connect(dbName)
     return conn
 
+# called after every write below, so open windows can check whether they need to refresh
+dataChangedListeners = []
+
+def NotifyDataChanged():
+    for listener in dataChangedListeners:
+        listener()
+
 def CheckAndUpdateSchema():
     conn = Connect()
     cursor = conn.cursor()
@@ -57,6 +66,51 @@ def CreateTable():
 
     # check and update schema if needed
     CheckAndUpdateSchema()
+    CreateTaskTotals()
+
+# one row per user with the dashboard counts, kept up to date by the triggers below so the
+# dashboard doesn't have to scan every task. It counts the same thing the old query did: rows
+# currently in tasks (archived tasks leave the table, so they drop out) by their category.
+TASK_TOTALS_CATEGORIES = (('ongoing', 'On-going'), ('done', 'Done'), ('missed', 'Missed'))
+
+def _TaskTotalsDelta(row, sign):
+    # "ongoing = ongoing + 1, ..." for the categories row (NEW or OLD) is in
+    parts = ['total = total %s 1' % sign]
+    for column, category in TASK_TOTALS_CATEGORIES:
+        parts.append("%s = %s %s COALESCE(%s.category_id = (SELECT category_id FROM task_category WHERE category_name = '%s'), 0)"
+                     % (column, column, sign, row, category))
+    return ', '.join(parts)
+
+def CreateTaskTotals():
+    conn = Connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_totals'")
+    exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_totals (
+            user_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            ongoing INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0,
+            missed INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    add_new = 'INSERT OR IGNORE INTO task_totals (user_id) VALUES (NEW.user_id); ' \
+              'UPDATE task_totals SET %s WHERE user_id = NEW.user_id;' % _TaskTotalsDelta('NEW', '+')
+    remove_old = 'UPDATE task_totals SET %s WHERE user_id = OLD.user_id;' % _TaskTotalsDelta('OLD', '-')
+    cursor.execute('CREATE TRIGGER IF NOT EXISTS trg_task_totals_insert AFTER INSERT ON tasks BEGIN %s END' % add_new)
+    cursor.execute('CREATE TRIGGER IF NOT EXISTS trg_task_totals_delete AFTER DELETE ON tasks BEGIN %s END' % remove_old)
+    cursor.execute('CREATE TRIGGER IF NOT EXISTS trg_task_totals_update AFTER UPDATE OF category_id, user_id ON tasks '
+                   'BEGIN %s %s END' % (remove_old, add_new))
+    if not exists:
+        # first run on this database: count the tasks that are already there
+        counts = ', '.join(
+            "SUM(CASE WHEN category_id = (SELECT category_id FROM task_category WHERE category_name = '%s') THEN 1 ELSE 0 END)"
+            % category for _, category in TASK_TOTALS_CATEGORIES)
+        cursor.execute('INSERT INTO task_totals (user_id, total, ongoing, done, missed) '
+                       'SELECT user_id, COUNT(*), %s FROM tasks GROUP BY user_id' % counts)
+    conn.commit()
+    conn.close()
 
 def AddTask(title, description, category_id, priority, dueDate, isRecurring, user_id, recurrence_pattern=None):
     print(f"Adding task to database: Title={title}, CategoryID={category_id}, Priority={priority}")
@@ -70,6 +124,7 @@ def AddTask(title, description, category_id, priority, dueDate, isRecurring, use
             (title, description, category_id, priority, dueDate, isRecurring, user_id, recurrence_pattern))
         conn.commit()
         print("Task added successfully to database")
+        NotifyDataChanged()
     except Exception as e:
         print(f"Database error: {str(e)}")
         raise e
@@ -111,6 +166,7 @@ def DeleteTask(taskId, user_id):
     cursor.execute('DELETE FROM tasks WHERE task_id = ? AND user_id = ?', (taskId, user_id))
     conn.commit()
     conn.close()
+    NotifyDataChanged()
 
 def UpdateTask(taskId, **kwargs):
     conn = Connect()
@@ -121,6 +177,7 @@ def UpdateTask(taskId, **kwargs):
     cursor.execute(f'UPDATE tasks SET {fields} WHERE task_id = ?', values)
     conn.commit()
     conn.close()
+    NotifyDataChanged()
 
 def CreateUserTable():
     conn = Connect()
@@ -171,6 +228,7 @@ def UpdateTaskStatus(taskId, new_status):
         cursor.execute('UPDATE tasks SET category_id = ? WHERE task_id = ?', (category_id, taskId))
         conn.commit()
     conn.close()
+    NotifyDataChanged()
 
 def MarkRecurringTaskComplete(taskId):
     conn = Connect()
@@ -179,8 +237,11 @@ def MarkRecurringTaskComplete(taskId):
     cursor.execute('UPDATE tasks SET last_completed_date = ? WHERE task_id = ?', (today, taskId))
     conn.commit()
     conn.close()
+    NotifyDataChanged()
 
 def UpdateMissedTasks(user_id):
+    # returns the number of tasks moved to Missed; listeners are only notified if there were any
+    moved = 0
     conn = Connect()
     cursor = conn.cursor()
     # Get the category_id for 'Missed'
@@ -199,8 +260,36 @@ def UpdateMissedTasks(user_id):
             AND due_date IS NOT NULL
             AND due_date != ''
         ''', (missed_category_id, user_id))
+        moved = cursor.rowcount
         conn.commit()
     conn.close()
+    if moved > 0:
+        NotifyDataChanged()
+    return moved
+
+def GetTaskTotals(user_id):
+    # totals come from task_totals (see CreateTaskTotals) instead of scanning every task
+    conn = Connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT total, ongoing, done, missed FROM task_totals WHERE user_id = ?', (user_id,))
+        stats = cursor.fetchone() or (0, 0, 0, 0)
+    except sqlite3.OperationalError:
+        stats = None
+    if stats is None:
+        # database without task_totals yet: count the tasks table directly
+        cursor.execute('''
+            SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN category_id = (SELECT category_id FROM task_category WHERE category_name = 'On-going') THEN 1 ELSE 0 END) as ongoing,
+                SUM(CASE WHEN category_id = (SELECT category_id FROM task_category WHERE category_name = 'Done') THEN 1 ELSE 0 END) as done,
+                SUM(CASE WHEN category_id = (SELECT category_id FROM task_category WHERE category_name = 'Missed') THEN 1 ELSE 0 END) as missed
+            FROM tasks 
+            WHERE user_id = ?
+        ''', (user_id,))
+        stats = cursor.fetchone()
+    conn.close()
+    return stats
 
 class LoginWindow(tk.Tk):
     def __init__(self):
@@ -369,6 +458,16 @@ class TimePlanApp(tk.Tk):
         # protocol for window close button
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        # log main loop stalls (opt-in, see stallWatchdog.start_from_env)
+        self.stall_watchdog = stallWatchdog.start_from_env(self)
+
+        # refresh the dashboard when the task data changes (checked after our own writes and
+        # when the window gets focus back) instead of re-querying it every minute
+        self.change_notifier = DataChangeNotifier(self, dbName).start()
+        self.change_notifier.subscribe(self.on_data_changed)
+        dataChangedListeners.append(self.change_notifier.request_check)
+        self.schedule_midnight_refresh()
+
     def create_views(self):
         # create dashboard view if not exists
         if not self.dashboard_view:
@@ -488,6 +587,11 @@ class TimePlanApp(tk.Tk):
                                           padx=10, pady=10)
         self.upcoming_frame.pack(fill="x")
 
+        # widgets update_dashboard keeps and updates in place
+        self.progress_labels = {}
+        self.upcoming_boxes = []
+        self.dashboard_data = None
+
         return dashboard_frame
 
     def create_task_view(self):
@@ -1204,37 +1308,47 @@ class TimePlanApp(tk.Tk):
 
     def sign_out(self):
         if tkinter.messagebox.askyesno("Sign Out", "Are you sure you want to sign out?"):
+            self.stop_change_notifier()
             self.destroy()
             login_window = LoginWindow()
             login_window.mainloop()
 
     def on_closing(self):
         if tkinter.messagebox.askyesno("Exit", "Are you sure you want to exit the application?"):
+            if self.stall_watchdog:
+                self.stall_watchdog.stop()
+            self.stop_change_notifier()
             self.destroy()
 
-    def update_dashboard(self):
-        # clear existing widgets
-        for widget in self.progress_frame.winfo_children():
-            widget.destroy()
-        for widget in self.upcoming_frame.winfo_children():
-            widget.destroy()
+    def stop_change_notifier(self):
+        if self.change_notifier.request_check in dataChangedListeners:
+            dataChangedListeners.remove(self.change_notifier.request_check)
+        self.change_notifier.stop()
+        self.after_cancel(self.midnight_after_id)
+
+    def on_data_changed(self):
+        # the task view reloads when it is shown, so only a visible dashboard needs refreshing now
+        if self.dashboard_view and self.dashboard_view.winfo_ismapped():
+            self.update_dashboard()
+            self.update_calendar_tasks()
+
+    def schedule_midnight_refresh(self):
+        # "upcoming" and "missed" depend on today's date, so refresh once when the day changes
+        now = datetime.now()
+        next_midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        delay_ms = int((next_midnight - now).total_seconds() * 1000) + 1000
+        self.midnight_after_id = self.after(delay_ms, self.on_midnight)
+
+    def on_midnight(self):
+        self.dashboard_data = None  # same data, new day: redraw anyway
+        # if tasks were moved to Missed, the change notifier already refreshes the dashboard
+        if not UpdateMissedTasks(self.user_id):
+            self.on_data_changed()
+        self.schedule_midnight_refresh()
 
+    def update_dashboard(self):
         # get task statistics
-        conn = Connect()
-        cursor = conn.cursor()
-        
-        # get total tasks
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN category_id = (SELECT category_id FROM task_category WHERE category_name = 'On-going') THEN 1 ELSE 0 END) as ongoing,
-                SUM(CASE WHEN category_id = (SELECT category_id FROM task_category WHERE category_name = 'Done') THEN 1 ELSE 0 END) as done,
-                SUM(CASE WHEN category_id = (SELECT category_id FROM task_category WHERE category_name = 'Missed') THEN 1 ELSE 0 END) as missed
-            FROM tasks 
-            WHERE user_id = ?
-        ''', (self.user_id,))
-        
-        stats = cursor.fetchone()
+        stats = GetTaskTotals(self.user_id)
         total = stats[0] if stats and stats[0] else 0
         
         # calculate percentages
@@ -1242,12 +1356,11 @@ class TimePlanApp(tk.Tk):
         done_percent = round((stats[2] / total * 100) if stats[2] and total else 0)
         missed_percent = round((stats[3] / total * 100) if stats[3] and total else 0)
         
-        # display progress circles
-        self.progress_circle(self.progress_frame, "ON-GOING", ongoing_percent)
-        self.progress_circle(self.progress_frame, "DONE", done_percent)
-        self.progress_circle(self.progress_frame, "MISSED", missed_percent)
+        percents = [("ON-GOING", ongoing_percent), ("DONE", done_percent), ("MISSED", missed_percent)]
         
         # get upcoming tasks
+        conn = Connect()
+        cursor = conn.cursor()
         cursor.execute('''
             SELECT title, due_date, strftime('%d', due_date) as day
             FROM tasks 
@@ -1259,42 +1372,65 @@ class TimePlanApp(tk.Tk):
         ''', (self.user_id,))
         
         upcoming_tasks = cursor.fetchall()
+        conn.close()
+
+        # nothing changed since the last refresh: leave the widgets alone
+        if (percents, upcoming_tasks) == self.dashboard_data:
+            return
+        self.dashboard_data = (percents, upcoming_tasks)
+
+        # display progress circles (created once, then only their text changes)
+        for label, percent in percents:
+            if label not in self.progress_labels:
+                self.progress_labels[label] = self.progress_circle(self.progress_frame, label, percent)
+            else:
+                self.progress_labels[label].configure(text=f"{percent}%")
         
-        # display upcoming tasks
+        # display upcoming tasks, reusing the boxes that are already there
         colors = ["#8b3ffc", "#d3a8f9"]  # Alternate colors
         for i, task in enumerate(upcoming_tasks):
             title, due_date, day = task
-            self.schedule_box(
-                self.upcoming_frame,
-                day,
-                title,
-                due_date,
-                colors[i % len(colors)]
-            )
-            
-        conn.close()
-
-        # schedule next update
-        self.after(60000, self.update_dashboard)  # Update every minute
+            if i < len(self.upcoming_boxes):
+                day_label, title_label, time_label = self.upcoming_boxes[i][1:]
+                day_label.configure(text=day)
+                title_label.configure(text=title)
+                time_label.configure(text=due_date)
+            else:
+                self.upcoming_boxes.append(self.schedule_box(
+                    self.upcoming_frame,
+                    day,
+                    title,
+                    due_date,
+                    colors[i % len(colors)]
+                ))
+        for box in self.upcoming_boxes[len(upcoming_tasks):]:
+            box[0].destroy()
+        del self.upcoming_boxes[len(upcoming_tasks):]
 
     def progress_circle(self, frame, label, percent):
         f = tk.Frame(frame, bg="white", bd=1, relief="solid")
         f.pack(side="left", padx=10)
         tk.Label(f, text=label, font=("Arial", 10, "bold"), bg="white").pack(pady=5)
-        tk.Label(f, text=f"{percent}%", font=("Arial", 12, "bold"),
-                bg="white", fg="#8a3ff6").pack(pady=5)
+        percent_label = tk.Label(f, text=f"{percent}%", font=("Arial", 12, "bold"),
+                bg="white", fg="#8a3ff6")
+        percent_label.pack(pady=5)
+        return percent_label
 
     def schedule_box(self, frame, day, title, time, color):
         f = tk.Frame(frame, bg=color, padx=10, pady=10)
         f.pack(pady=10, fill="x")
-        tk.Label(f, text=day, bg=color, fg="white",
-                font=("Arial", 12, "bold")).pack(side="left")
+        day_label = tk.Label(f, text=day, bg=color, fg="white",
+                font=("Arial", 12, "bold"))
+        day_label.pack(side="left")
         details = tk.Frame(f, bg=color)
         details.pack(side="left", padx=10)
-        tk.Label(details, text=title, bg=color, fg="white",
-                font=("Arial", 12, "bold")).pack(anchor="w")
-        tk.Label(details, text=time, bg=color, fg="white",
-                font=("Arial", 10)).pack(anchor="w")
+        title_label = tk.Label(details, text=title, bg=color, fg="white",
+                font=("Arial", 12, "bold"))
+        title_label.pack(anchor="w")
+        time_label = tk.Label(details, text=time, bg=color, fg="white",
+                font=("Arial", 10))
+        time_label.pack(anchor="w")
+        return f, day_label, title_label, time_label
 
     def _on_mousewheel(self, event):
         self.main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
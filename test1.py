@@ -1,9 +1,25 @@
 import customtkinter as ctk
+import logging
 import os
+import functools
+import contextlib
+import time
 from PIL import Image
-from databaseManagement import DatabaseManager
-from datetime import datetime, timedelta
-import pytz
+from databaseManagement import DatabaseManager, VersionConflict
+from eventBus import (TkEventBatcher, TASK_EVENTS, HABIT_EVENTS, HABIT_LIST_EVENTS, TaskDeleted, TaskArchived,
+                      DayRolledOver)
+from rolloverScheduler import MidnightRolloverScheduler
+from dateUtils import date_ordinal, format_due_label, format_day_heading
+from queryProfiler import QueryProfiler
+from queryBudget import ActionTracker, QUERY_BUDGETS
+from uiPerf import ActionTimings, PerfOverlay, count_widgets
+from taskCards import load_task_cards
+import stallWatchdog
+import actionProfiler
+from leakDetector import LeakDetector
+import metrics
+from logSetup import configure_logging, diagnostics_enabled
+from datetime import datetime, date
 from tkinter import messagebox  # <-- Add this import
 from tkinter import ttk  # <-- Add this import for ttk.Button
 
@@ -11,11 +27,39 @@ from tkinter import ttk  # <-- Add this import for ttk.Button
 from tkcalendar import Calendar
 
 
+logger = logging.getLogger("timeplan.app")
+
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
 
+# Sort menu labels on the tasks page -> DatabaseManager.get_tasks sort_by values
+TASK_SORT_LABELS = {
+    "Sort: Default": None,
+    "Sort: Due date": "due_date",
+    "Sort: Priority": "priority",
+    "Sort: Newest": "created",
+    "Sort: Recently updated": "updated",
+    "Sort: Title": "title",
+}
+
+# Page switches after which the leak detector (TIMEPLAN_LEAK_CHECK=1) snapshots live objects
+PAGE_ACTIONS = {"show_tasks_page", "show_calendar_page", "show_habit_page", "show_add_task_page", "show_task_detail"}
+
+# How many UI actions F11 profiles (cProfile + tracemalloc, see actionProfiler)
+PROFILE_HOTKEY_ACTIONS = 5
+
+
+def ui_action(name):
+    """Decorator for UI entry points (page shows, toggles, saves): tracks and times each call as one action."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self.run_ui_action(name, method, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
 class TimePlanApp(ctk.CTk):
-    def __init__(self, **kwargs):
+    def __init__(self, clock=None, db_name='timePlanDB.db', **kwargs):
         super().__init__(**kwargs)
         self.title("TimePlan")
         self.geometry("1200x700")
@@ -27,11 +71,54 @@ class TimePlanApp(ctk.CTk):
         
         # For task detail pane
         self.selected_task = None
+        self.editing_task_version = None
         self.detail_pane_visible = False
+        # True while the detail pane shows the edit form (change events must not replace it)
+        self.detail_pane_editing = False
         self.detail_pane_width = 340
-        
-        self.db_manager = DatabaseManager()
-        self.current_user_id = 1        # Pre-fetch category IDs
+        # Both panes are created once and reused; hiding them must not leave orphaned frames behind
+        self.detail_pane = None
+        self.task_detail_pane = None
+        
+        self.db_manager = DatabaseManager(db_name, clock=clock)
+        # Database change events, delivered once per idle cycle, patch the visible page (see apply_change_events)
+        self.change_events = TkEventBatcher(self, self.db_manager.events, self.apply_change_events).start()
+        # Count queries per UI action and warn about budget overruns / N+1 query patterns
+        self.action_tracker = ActionTracker()
+        self.action_tracker.attach(self.db_manager)
+        # Click-to-idle latency per UI action; F12 shows the overlay with recent actions and p50/p95.
+        # Only measured while the overlay is open, with TIMEPLAN_DEBUG=1 or when metrics are exported
+        self.action_timings = ActionTimings()
+        self.perf_overlay = PerfOverlay(self, self.action_timings)
+        self.diagnostics = diagnostics_enabled()
+        self._ui_action_depth = 0
+        # cProfile/tracemalloc capture of the next N actions (TIMEPLAN_PROFILE_ACTIONS or F11)
+        self.action_profiler = actionProfiler.from_env()
+        # Diagnostics: count live widgets/fonts/variables/images after each page switch and report growth
+        self.leak_detector = LeakDetector(self) if os.environ.get("TIMEPLAN_LEAK_CHECK") == "1" else None
+        # Query/cache/UI metrics in Prometheus text format (exported only if TIMEPLAN_METRICS_PORT/_FILE is set)
+        metrics.DatabaseMetrics().attach(self.db_manager)
+        self.action_timings.listeners.append(metrics.UiMetrics().record_action)
+        self.metrics_exporter = metrics.start_exporter_from_env()
+        # Optional query profiling: set TIMEPLAN_PROFILE_QUERIES=<slow query threshold in ms>, e.g. 50
+        self.query_profiler = None
+        profile_setting = os.environ.get("TIMEPLAN_PROFILE_QUERIES")
+        if profile_setting:
+            try:
+                slow_threshold_ms = float(profile_setting)
+            except ValueError:
+                slow_threshold_ms = 50.0
+            self.query_profiler = QueryProfiler(slow_threshold_ms=slow_threshold_ms)
+            self.query_profiler.attach(self.db_manager)
+        self.current_user_id = 1
+        # Shared clock (cached tzinfo / today), following the user's timezone setting
+        self.clock = self.db_manager.clock
+        self.db_manager.use_user_timezone(self.current_user_id)
+        # Sort mode picked on the tasks page (remembered per user)
+        self.task_sort_mode = self.db_manager.get_app_state(f"task_sort_mode:{self.current_user_id}")
+        if self.task_sort_mode not in TASK_SORT_LABELS.values():
+            self.task_sort_mode = None
+        # Pre-fetch category IDs
         self.completed_category_id = self.db_manager.get_category_id_by_name("Completed")
         self.on_going_category_id = self.db_manager.get_category_id_by_name("On-going") # For un-completing tasks
         self.missed_category_id = self.db_manager.get_category_id_by_name("Missed") # For past due tasks
@@ -196,11 +283,83 @@ class TimePlanApp(ctk.CTk):
         
         self.position_collapse_button()
         self.bind("<Configure>", self.on_window_configure)
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.bind_all("<F12>", lambda e: self.perf_overlay.toggle())
+        self.bind_all("<F11>", lambda e: self.toggle_action_profiling())
+
+        # Sweep past due tasks / habit periods once the first page is up if it hasn't been done today,
+        # then again at every midnight; its change events patch the visible page (apply_change_events)
+        self.rollover_scheduler = MidnightRolloverScheduler(self, self.db_manager, user_id=self.current_user_id)
+        self.rollover_scheduler.start()
+        # Opt-in: log main-loop stalls (with the blocking stack) to a rotating stalls.log; see stallWatchdog.start_from_env
+        self.stall_watchdog = stallWatchdog.start_from_env(self)
+        if self.stall_watchdog:
+            metrics.REGISTRY.gauge("timeplan_ui_stalls", "Main loop stalls seen by the watchdog.").set_function(
+                lambda: self.stall_watchdog.stall_count)
 
         self.show_tasks_page('All Tasks')
 
         self.current_page = "tasks"  # Track current page: "tasks" or "calendar"
 
+    def on_closing(self):
+        """Stop background work, report diagnostics and close the database before the window closes."""
+        self.change_events.stop()
+        self.rollover_scheduler.stop()
+        if self.stall_watchdog:
+            self.stall_watchdog.stop()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        # Logged at WARNING so the reports asked for with TIMEPLAN_PROFILE_QUERIES / TIMEPLAN_LEAK_CHECK
+        # show at the default log level
+        if self.query_profiler:
+            logger.warning("Query profile:\n%s", self.query_profiler.format_report())
+        if self.leak_detector:
+            logger.warning("Leak check summary:\n%s", self.leak_detector.format_summary())
+        self.db_manager._close()
+        self.destroy()
+
+    def measuring_actions(self):
+        """True when UI action latency and widget counts are wanted (overlay, diagnostics or metrics)."""
+        return self.perf_overlay.visible or self.diagnostics or self.metrics_exporter is not None
+
+    def run_ui_action(self, name, func, *args, **kwargs):
+        """
+        Run one UI action and count its queries. When measuring (see measuring_actions), the
+        outermost action is also timed until update_idletasks() has finished (layout and redraw
+        done) and the widget count is recorded.
+        """
+        outermost = self._ui_action_depth == 0
+        measure = outermost and self.measuring_actions()
+        self._ui_action_depth += 1
+        # cProfile can't nest, so only the outermost action is profiled
+        profile_capture = self.action_profiler.capture(name) if outermost else contextlib.nullcontext()
+        started_at = time.perf_counter()
+        try:
+            with profile_capture:
+                with self.action_tracker.action(name, budget=QUERY_BUDGETS.get(name)) as query_stats:
+                    result = func(*args, **kwargs)
+                if measure:
+                    self.update_idletasks()
+                    elapsed = time.perf_counter() - started_at
+            if measure:
+                # Counted after the clock stops so the widget walk doesn't inflate the latency
+                widget_count = count_widgets(self, skip=self.perf_overlay.window)
+                self.action_timings.record(name, elapsed, query_stats.query_count, widget_count)
+            if outermost and self.leak_detector and name in PAGE_ACTIONS:
+                self.leak_detector.check(name)
+            return result
+        finally:
+            self._ui_action_depth -= 1
+
+    def toggle_action_profiling(self):
+        """F11: profile the next PROFILE_HOTKEY_ACTIONS UI actions, or stop profiling if already armed."""
+        if self.action_profiler.armed:
+            self.action_profiler.disarm()
+            logger.info("Action profiling stopped.")
+        else:
+            # arm() logs where the profiles go
+            self.action_profiler.arm(PROFILE_HOTKEY_ACTIONS)
+
     def position_collapse_button(self):
         self.update_idletasks()
         current_width = self.sidebar_width if self.sidebar_expanded else self.sidebar_collapsed_width
@@ -214,7 +373,16 @@ class TimePlanApp(ctk.CTk):
     def clear_content(self):
         for widget in self.content.winfo_children():
             widget.destroy()
-
+        # task_detail_pane lives inside content, so it was just destroyed too
+        self.task_detail_pane = None
+        # So were the task list and habit cards that change events patch
+        self.task_scroll_frame = None
+        self.task_list_empty_label = None
+        self.task_cards = {}
+        self.task_list_order = []
+        self.habit_cards = {}
+
+    @ui_action("show_tasks_page")
     def show_tasks_page(self, filter_type='All Tasks'):
         self.navbar.pack_forget()
         self.navbar.pack(side="left", fill="y", padx=(40, 0))
@@ -234,165 +402,215 @@ class TimePlanApp(ctk.CTk):
         
         self.clear_content()
 
+        header_frame = ctk.CTkFrame(self.content, fg_color="transparent")
+        header_frame.pack(fill="x", pady=(10, 0), padx=10)
+
         ctk.CTkLabel(
-            self.content,
+            header_frame,
             text=f"{filter_type} Tasks",
             font=ctk.CTkFont(size=24, weight="bold"),
             text_color="#A85BC2"
-        ).pack(anchor="nw", pady=(10, 0), padx=10)
+        ).pack(side="left", anchor="nw")
+
+        sort_menu = ctk.CTkOptionMenu(
+            header_frame,
+            values=list(TASK_SORT_LABELS.keys()),
+            command=self.change_task_sort_mode,
+            width=190,
+            fg_color="#C576E0",
+            button_color="#A85BC2",
+            button_hover_color="#A85BC2"
+        )
+        sort_menu.set(next(label for label, mode in TASK_SORT_LABELS.items() if mode == self.task_sort_mode))
+        sort_menu.pack(side="right")
 
         self.task_scroll_frame = ctk.CTkScrollableFrame(self.content, fg_color="transparent")
         self.task_scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Fetch tasks from the database based on filter type
-        tasks = self.db_manager.get_tasks(user_id=self.current_user_id, filter_type=filter_type)
-        
-        # Additional sorting based on due date (nearest first)
-        if filter_type in ['All Tasks', 'On-going']:
-            def get_due_date(task):
-                due_date_str = task[4]  # due_date is at index 4
-                if due_date_str:
-                    try:
-                        return datetime.strptime(due_date_str, '%Y-%m-%d').date()
-                    except ValueError:
-                        return datetime.max.date()
-                return datetime.max.date()  # Tasks with no due date will appear at the end
-            tasks = sorted(tasks, key=get_due_date)
-
-        if not tasks:
-            ctk.CTkLabel(self.task_scroll_frame, text="No tasks found for this filter.",
-                         font=ctk.CTkFont(size=16), text_color="#6A057F").pack(pady=20)
-            return
+        # Everything the cards show is loaded here (already sorted by SQL, don't re-sort here);
+        # building the widgets below runs no queries
+        cards = load_task_cards(self.db_manager, self.current_user_id, filter_type, self.task_sort_mode,
+                                self.clock.today().toordinal())
 
-        MISSED_BG_COLOR = "#FFCDD2" # Light Red
-        COMPLETED_BG_COLOR = "#C8E6C9" # Light Green
-        ONGOING_BG_COLOR = "white" # Default for uncompleted, non-missed tasks
-
-        philippines_timezone = pytz.timezone('Asia/Manila')
-        current_local_date = datetime.now(philippines_timezone).date()
+        self.task_list_filter = filter_type
 
-        for i, task in enumerate(tasks):
-            if len(task) != 6:
-                print(f"Error: Task {i} has unexpected number of elements: {len(task)}. Expected 6. Task data: {task}")
-                continue
-            
-            task_id, title, description, priority, due_date, category_name = task
+        if not cards:
+            self._show_empty_task_list(True)
+            return
 
-            frame_bg_color = ONGOING_BG_COLOR
-            title_color = "#333333"
-            is_completed_by_category = (category_name == "Completed")
-            is_missed = False
-            
-            if not is_completed_by_category and due_date:
-                try:
-                    due_date_obj = datetime.strptime(due_date, '%Y-%m-%d').date()
-                    if due_date_obj < current_local_date:
-                        is_missed = True
-                        # Do NOT update the database here to avoid UI lag
-                        # Only update the UI to show as missed
-                        # If you want to update the DB, do it in a batch elsewhere
-                        category_name = "Missed"
-                except ValueError:
-                    pass
-
-            if is_completed_by_category:
-                frame_bg_color = COMPLETED_BG_COLOR
-                title_color = "gray"
-            elif is_missed:
-                frame_bg_color = MISSED_BG_COLOR
-                title_color = "red"
-            
-            task_frame = ctk.CTkFrame(self.task_scroll_frame, fg_color=frame_bg_color, corner_radius=10,
-                                      border_width=1, border_color="#E5C6F2", cursor="hand2")
+        for card in cards:
+            task_frame = self._build_task_card(card, filter_type)
             task_frame.pack(fill="x", pady=5, padx=5)
-            def on_task_click(event, tid=task_id):
-                self.selected_task = tid
-                self.show_task_detail(tid)
-            task_frame.bind("<Button-1>", on_task_click)
-
-            task_frame.grid_columnconfigure(0, weight=0)
-            task_frame.grid_columnconfigure(1, weight=1)
-            task_frame.grid_columnconfigure(2, weight=0)
-            task_frame.grid_rowconfigure(0, weight=0)
-            task_frame.grid_rowconfigure(1, weight=0)
-            task_frame.grid_rowconfigure(2, weight=1)
+            self.task_cards[card.task_id] = task_frame
+        self.task_list_order = [card.task_id for card in cards]
+
+    def _show_empty_task_list(self, empty):
+        """Show or remove the "No tasks found" message on the tasks page."""
+        if empty and self.task_list_empty_label is None:
+            self.task_list_empty_label = ctk.CTkLabel(self.task_scroll_frame, text="No tasks found for this filter.",
+                                                      font=ctk.CTkFont(size=16), text_color="#6A057F")
+            self.task_list_empty_label.pack(pady=20)
+        elif not empty and self.task_list_empty_label is not None:
+            self.task_list_empty_label.destroy()
+            self.task_list_empty_label = None
+
+    def _build_task_card(self, card, filter_type):
+        """Create (but don't pack) the tasks page widgets for one TaskCard (see taskCards; no queries here)."""
+        task_id = card.task_id
+        title = card.title
+        description = card.description
+        category_name = card.category_name
+        frame_bg_color = card.bg_color
+        title_color = card.title_color
+        is_completed_by_category = card.is_completed
+
+        task_frame = ctk.CTkFrame(self.task_scroll_frame, fg_color=frame_bg_color, corner_radius=10,
+                                  border_width=1, border_color="#E5C6F2", cursor="hand2")
+        def on_task_click(event, tid=task_id):
+            self.selected_task = tid
+            self.show_task_detail(tid)
+        task_frame.bind("<Button-1>", on_task_click)
 
-            status_var = ctk.StringVar(value="on" if is_completed_by_category else "off")
-            status_checkbox = ctk.CTkCheckBox(task_frame, text="", variable=status_var,
-                                              onvalue="on", offvalue="off",
-                                              command=lambda tid=task_id, svar=status_var, current_cat_name=category_name, ft=filter_type: self.toggle_task_completion(tid, svar, current_cat_name, ft))
-            status_checkbox.grid(row=0, column=0, rowspan=3, padx=(10,0), pady=10, sticky="nsew")
-            def prevent_propagation(e):
-                e.widget.focus_set()
-                return "break"
-            status_checkbox.bind("<Button-1>", prevent_propagation, add="+")
+        task_frame.grid_columnconfigure(0, weight=0)
+        task_frame.grid_columnconfigure(1, weight=1)
+        task_frame.grid_columnconfigure(2, weight=0)
+        task_frame.grid_rowconfigure(0, weight=0)
+        task_frame.grid_rowconfigure(1, weight=0)
+        task_frame.grid_rowconfigure(2, weight=1)
 
-            ctk.CTkLabel(task_frame, text=title, font=ctk.CTkFont(size=18, weight="bold"),
-                         text_color=title_color, anchor="w", wraplength=400
-                         ).grid(row=0, column=1, padx=(10, 5), pady=(10,0), sticky="ew")
+        status_var = ctk.StringVar(value="on" if is_completed_by_category else "off")
+        status_checkbox = ctk.CTkCheckBox(task_frame, text="", variable=status_var,
+                                          onvalue="on", offvalue="off",
+                                          command=lambda tid=task_id, svar=status_var, current_cat_name=category_name, ft=filter_type: self.toggle_task_completion(tid, svar, current_cat_name, ft))
+        status_checkbox.grid(row=0, column=0, rowspan=3, padx=(10,0), pady=10, sticky="nsew")
+        def prevent_propagation(e):
+            e.widget.focus_set()
+            return "break"
+        status_checkbox.bind("<Button-1>", prevent_propagation, add="+")
 
-            if priority:
-                display_priority_text = "⚠️ Urgent" if priority == "Urgent" else "Not urgent"
-                ctk.CTkLabel(task_frame, text=display_priority_text, font=ctk.CTkFont(size=14),
-                             text_color=title_color, anchor="w"
-                             ).grid(row=1, column=1, padx=(10, 5), pady=(0, 5), sticky="ew")
+        ctk.CTkLabel(task_frame, text=title, font=ctk.CTkFont(size=18, weight="bold"),
+                     text_color=title_color, anchor="w", wraplength=400
+                     ).grid(row=0, column=1, padx=(10, 5), pady=(10,0), sticky="ew")
 
-            if description:
-                ctk.CTkLabel(task_frame, text=description, font=ctk.CTkFont(size=14),
-                             text_color=title_color, anchor="nw", wraplength=400
-                             ).grid(row=2, column=1, padx=(10, 5), pady=(0, 10), sticky="new")
-            else:
-                ctk.CTkLabel(task_frame, text="", font=ctk.CTkFont(size=1),
-                             text_color=title_color, anchor="w").grid(row=2, column=1, padx=(10, 5), pady=(0, 0), sticky="ew")
-
-            if category_name:
-                category_label = ctk.CTkLabel(task_frame, text=category_name, font=ctk.CTkFont(size=12, weight="bold"),
-                             text_color="#666666", anchor="ne", justify="right"
-                             )
-                category_label.grid(row=0, column=2, padx=10, pady=(10,0), sticky="ne")
-                category_label.bind("<Button-1>", lambda e, tid=task_id: on_task_click(e, tid))
-                category_label.configure(cursor="hand2")
-                
-                # Due date label (add this for calendar view task cards)
-                if due_date:
-                    try:
-                        due_date_obj = datetime.strptime(due_date, '%Y-%m-%d').date()
-                        if due_date_obj == current_local_date:
-                            formatted_date_str = "Due: Today"
-                        elif due_date_obj == (current_local_date + timedelta(days=1)):
-                            formatted_date_str = "Due: Tomorrow"
-                        else:
-                            formatted_date_str = f"Due: {due_date_obj.strftime('%b %d, %Y')}"
-                    except ValueError:
-                        formatted_date_str = "Due: Invalid Date"
-
-                    due_date_label = ctk.CTkLabel(
-                        task_frame,
-                        text=formatted_date_str,
-                        font=ctk.CTkFont(size=12),
-                        text_color="#666666",
-                        anchor="ne",
-                        justify="right"
-                    )
-                    due_date_label.grid(row=1, column=2, padx=10, pady=(0,10), sticky="ne")
-                    due_date_label.bind("<Button-1>", lambda e, tid=task_id: on_task_click(e, tid))
-                    due_date_label.configure(cursor="hand2")
+        if card.priority_text:
+            ctk.CTkLabel(task_frame, text=card.priority_text, font=ctk.CTkFont(size=14),
+                         text_color=title_color, anchor="w"
+                         ).grid(row=1, column=1, padx=(10, 5), pady=(0, 5), sticky="ew")
+
+        if description:
+            ctk.CTkLabel(task_frame, text=description, font=ctk.CTkFont(size=14),
+                         text_color=title_color, anchor="nw", wraplength=400
+                         ).grid(row=2, column=1, padx=(10, 5), pady=(0, 10), sticky="new")
+        else:
+            ctk.CTkLabel(task_frame, text="", font=ctk.CTkFont(size=1),
+                         text_color=title_color, anchor="w").grid(row=2, column=1, padx=(10, 5), pady=(0, 0), sticky="ew")
+
+        if category_name:
+            category_label = ctk.CTkLabel(task_frame, text=category_name, font=ctk.CTkFont(size=12, weight="bold"),
+                         text_color="#666666", anchor="ne", justify="right"
+                         )
+            category_label.grid(row=0, column=2, padx=10, pady=(10,0), sticky="ne")
+            category_label.bind("<Button-1>", lambda e, tid=task_id: on_task_click(e, tid))
+            category_label.configure(cursor="hand2")
             
-            # Recurring task indicator (new)
-            is_recurring = self.db_manager.is_recurring_task(task_id)
-            if is_recurring:
-                recurring_label = ctk.CTkLabel(
+            # Due date label (add this for calendar view task cards)
+            if card.due_label:
+                due_date_label = ctk.CTkLabel(
                     task_frame,
-                    text="🗓️ Recurring Task",
-                    font=ctk.CTkFont(size=12, weight="bold"),
-                    text_color="#4CAF50",
-                    anchor="se",
+                    text=card.due_label,
+                    font=ctk.CTkFont(size=12),
+                    text_color="#666666",
+                    anchor="ne",
                     justify="right"
                 )
-                recurring_label.grid(row=2, column=2, padx=10, pady=(0, 10), sticky="se")
-                recurring_label.bind("<Button-1>", lambda e, tid=task_id: on_task_click(e, tid))
-                recurring_label.configure(cursor="hand2")
+                due_date_label.grid(row=1, column=2, padx=10, pady=(0,10), sticky="ne")
+                due_date_label.bind("<Button-1>", lambda e, tid=task_id: on_task_click(e, tid))
+                due_date_label.configure(cursor="hand2")
+        
+        # Recurring task indicator (new)
+        if card.is_recurring:
+            recurring_label = ctk.CTkLabel(
+                task_frame,
+                text="🗓️ Recurring Task",
+                font=ctk.CTkFont(size=12, weight="bold"),
+                text_color="#4CAF50",
+                anchor="se",
+                justify="right"
+            )
+            recurring_label.grid(row=2, column=2, padx=10, pady=(0, 10), sticky="se")
+            recurring_label.bind("<Button-1>", lambda e, tid=task_id: on_task_click(e, tid))
+            recurring_label.configure(cursor="hand2")
+
+        return task_frame
+
+    def patch_task_list(self, changed_task_ids, day_changed=False):
+        """
+        Bring the open tasks page up to date after task changes: one get_tasks query, then only
+        the cards of changed, new or no longer listed tasks are rebuilt or removed. With
+        day_changed, the cards whose due label or missed color depends on today's date (due
+        yesterday, today or tomorrow) are rebuilt too.
+        """
+        today_ordinal = self.clock.today().toordinal()
+        cards = load_task_cards(self.db_manager, self.current_user_id, self.task_list_filter, self.task_sort_mode,
+                                today_ordinal)
+        order = [card.task_id for card in cards]
+        listed = set(order)
+        for task_id in [task_id for task_id in self.task_cards if task_id not in listed]:
+            self.task_cards.pop(task_id).destroy()
+
+        date_sensitive = range(today_ordinal - 1, today_ordinal + 2) if day_changed else ()
+        stale = [card for card in cards if card.task_id in changed_task_ids or card.task_id not in self.task_cards
+                 or card.due_ordinal in date_sensitive]
+        for card in stale:
+            old_card = self.task_cards.pop(card.task_id, None)
+            if old_card is not None:
+                old_card.destroy()
+            self.task_cards[card.task_id] = self._build_task_card(card, self.task_list_filter)
+        if stale or order != self.task_list_order:
+            # pack() appends, so re-pack every card in the query's order (no widgets are created for this)
+            for task_id in order:
+                self.task_cards[task_id].pack_forget()
+            for task_id in order:
+                self.task_cards[task_id].pack(fill="x", pady=5, padx=5)
+        self.task_list_order = order
+        self._show_empty_task_list(not cards)
+
+    @ui_action("apply_change_events")
+    def apply_change_events(self, events):
+        """Patch the visible page and the detail pane for one idle cycle's database change events."""
+        task_ids = {event.task_id for event in events if isinstance(event, TASK_EVENTS)}
+        deleted_task_ids = {event.task_id for event in events if isinstance(event, (TaskDeleted, TaskArchived))}
+        habit_ids = {event.rtask_id for event in events if isinstance(event, HABIT_EVENTS)}
+        # The midnight sweep ran: "Today"/"Tomorrow" labels and the Today/Next 7 Days lists moved on
+        day_changed = any(isinstance(event, DayRolledOver) for event in events)
+
+        if task_ids or day_changed:
+            if self.task_scroll_frame is not None:
+                self.patch_task_list(task_ids, day_changed)
+            elif self.current_page == "calendar":
+                # Calendar markers and the day list are still rendered as a whole
+                self.show_calendar_page()
+        if habit_ids and self.current_page == "habit":
+            if any(isinstance(event, HABIT_LIST_EVENTS) for event in events):
+                # Cards are grouped by recurrence pattern, so added/edited/deleted habits rebuild the page
+                self.show_habit_page()
+            else:
+                for rtask_id in habit_ids:
+                    self.patch_habit_card(rtask_id)
 
+        if self.detail_pane_visible and self.selected_task in task_ids:
+            if self.selected_task in deleted_task_ids:
+                self.hide_task_detail()
+            elif not self.detail_pane_editing:
+                self.show_task_detail(self.selected_task)
+
+    def change_task_sort_mode(self, sort_label):
+        """Apply a sort mode picked from the tasks page menu and remember it for this user."""
+        self.task_sort_mode = TASK_SORT_LABELS.get(sort_label)
+        self.db_manager.set_app_state(f"task_sort_mode:{self.current_user_id}", self.task_sort_mode)
+        self.show_tasks_page(self.get_current_filter())
+
+    @ui_action("toggle_task_completion")
     def toggle_task_completion(self, task_id, status_var, current_category_name, current_filter_type):
         new_category_id = None
         if status_var.get() == "on": # Task is being marked as Completed
@@ -410,16 +628,12 @@ class TimePlanApp(ctk.CTk):
                 status_var.set("on") # Revert checkbox state
                 return
 
-        if self.db_manager.update_task_category(task_id, new_category_id):
-            # Refresh the view based on current page
-            if self.current_page == "calendar":
-                self.show_calendar_page()
-            else:
-                self.show_tasks_page(current_filter_type)
-        else:
+        # On success the TaskCategoryChanged event patches the page (apply_change_events)
+        if not self.db_manager.update_task_category(task_id, new_category_id):
             messagebox.showerror("Error", "Failed to update task status in database.")
             status_var.set("off" if status_var.get() == "on" else "on") # Revert checkbox on failure
 
+    @ui_action("show_calendar_page")
     def show_calendar_page(self):
         self.navbar.pack_forget()
         self.content.pack_forget()
@@ -436,7 +650,7 @@ class TimePlanApp(ctk.CTk):
         
         # Get all tasks from database and organize by date
         tasks = self.db_manager.get_tasks(user_id=self.current_user_id, filter_type='All Tasks')
-        # Create a dictionary mapping due dates to tasks
+        # Create a dictionary mapping due dates (as date ordinals) to Task rows
         task_dates = {}
         
         # Add a heading for the calendar view
@@ -447,25 +661,12 @@ class TimePlanApp(ctk.CTk):
             text_color="#A85BC2"
         ).pack(anchor="nw", pady=(0, 10))
         
-        # Process tasks and organize by date
+        # Process tasks and organize by date (rows already carry the parsed due date)
         for task in tasks:
-            task_id, title, description, priority, due_date, category_name = task
-            if due_date:
-                # Ensure date format consistency - store as strings
-                date_key = due_date.strip()  # Remove any whitespace
-                if date_key not in task_dates:
-                    task_dates[date_key] = []
-                task_dates[date_key].append({
-                    'id': task_id,  # Keep as 'id' for consistency with create_task_card
-                    'title': title,  # Keep as 'title' for consistency with create_task_card
-                    'description': description,
-                    'priority': priority,
-                    'due_date': date_key,
-                    'category': category_name
-                })
-        
-        philippines_timezone = pytz.timezone('Asia/Manila')
-        current_local_date = datetime.now(philippines_timezone).date()
+            if task.due_ordinal is not None:
+                task_dates.setdefault(task.due_ordinal, []).append(task)
+        
+        current_local_date = self.clock.today()
         
         # Create the tasks frame (below calendar) - initially empty
         tasks_container_frame = ctk.CTkFrame(split_frame, fg_color="transparent")
@@ -511,14 +712,9 @@ class TimePlanApp(ctk.CTk):
         cal.tag_config("task_date", background='#F3E6F8')  # Light purple for task dates
         
         # Use the proper method to mark dates with tasks
-        for date_str in task_dates.keys():
-            try:
-                # Parse the date string to a date object
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                # Mark the date on the calendar using calevent_create
-                cal.calevent_create(date_obj, "Task Due", "task_date")
-            except (ValueError, AttributeError) as e:
-                print(f"Error marking date {date_str}: {str(e)}")
+        for due_ordinal in task_dates.keys():
+            # Mark the date on the calendar using calevent_create
+            cal.calevent_create(date.fromordinal(due_ordinal), "Task Due", "task_date")
         
         # Function to update task display when a date is selected
         def update_tasks_for_selected_date(event):
@@ -531,19 +727,16 @@ class TimePlanApp(ctk.CTk):
             
             try:
                 # Format the date for display
-                date_obj = datetime.strptime(selected_date, "%Y-%m-%d").date()
-                if date_obj == current_local_date:
-                    formatted_date = "Today"
-                elif date_obj == current_local_date + timedelta(days=1):
-                    formatted_date = "Tomorrow"
-                else:
-                    formatted_date = date_obj.strftime("%B %d, %Y")
+                selected_ordinal = date_ordinal(selected_date)
+                if selected_ordinal is None:
+                    raise ValueError(f"Invalid date: {selected_date}")
+                formatted_date = format_day_heading(selected_ordinal, current_local_date.toordinal())
                 
                 # Update the header
                 selected_date_label.configure(text=f"Tasks for {formatted_date}")
                 
                 # Get tasks for the selected date
-                date_tasks = task_dates.get(selected_date, [])
+                date_tasks = task_dates.get(selected_ordinal, [])
                 
                 if date_tasks:
                     # Display tasks for the selected date
@@ -568,7 +761,7 @@ class TimePlanApp(ctk.CTk):
         cal.bind("<<CalendarSelected>>", update_tasks_for_selected_date)
         
         # Select today's date by default and show tasks for today
-        today_date_str = current_local_date.strftime('%Y-%m-%d')
+        today_date_str = self.clock.today_str()
         try:
             cal.selection_set(today_date_str)
             # Call the update function to show today's tasks
@@ -578,6 +771,7 @@ class TimePlanApp(ctk.CTk):
         
         self.current_page = "calendar"  # Set current page to calendar
 
+    @ui_action("show_add_task_page")
     def show_add_task_page(self):
         self.navbar.pack_forget()
         self.content.pack_forget()
@@ -633,6 +827,7 @@ class TimePlanApp(ctk.CTk):
                       font=ctk.CTkFont(size=16, weight="bold"),
                       fg_color="#A85BC2", hover_color="#C576E0").grid(row=5, column=0, columnspan=2, pady=20)
 
+    @ui_action("submit_task")
     def submit_task(self):
         title = self.task_title_entry.get()
         description = self.task_description_entry.get()
@@ -694,6 +889,8 @@ class TimePlanApp(ctk.CTk):
             
             # Show the details of the newly created task
             self.show_task_detail(new_task_id)
+            # The page was just built from the database, the TaskAdded event has nothing left to patch
+            self.change_events.discard()
         else:
             messagebox.showerror("Error", "Failed to add task. Check console for database errors.")
 
@@ -728,10 +925,10 @@ class TimePlanApp(ctk.CTk):
     def update_task_detail_pane(self):
         """Update the task detail pane content."""
         if not self.detail_pane_visible or self.selected_task is None:
-            # Hide or clear the detail pane
-            if hasattr(self, 'task_detail_pane'):
-                self.task_detail_pane.pack_forget()
-                del self.task_detail_pane
+            # Destroy the detail pane (dropping the reference alone would leave the frame alive in Tk)
+            if self.task_detail_pane is not None:
+                self.task_detail_pane.destroy()
+                self.task_detail_pane = None
             return
         
         task = self.db_manager.get_task_by_id(self.selected_task)
@@ -741,7 +938,7 @@ class TimePlanApp(ctk.CTk):
         task_id, task_title, description, priority, due_date, category_name = task
 
         # Create the detail pane if it doesn't exist
-        if not hasattr(self, 'task_detail_pane'):
+        if self.task_detail_pane is None or not self.task_detail_pane.winfo_exists():
             self.task_detail_pane = ctk.CTkFrame(self.content, fg_color="#FFFFFF", corner_radius=10, padx=20, pady=20)
             self.task_detail_pane.pack(side="right", fill="y", padx=(10, 0), pady=10)
             
@@ -795,6 +992,8 @@ class TimePlanApp(ctk.CTk):
             return # Task not found, do not proceed
         
         task_id, title, description, priority, due_date, category_name = task
+        # Saving only succeeds if nobody else changed the task since this version (see save_task_changes)
+        self.editing_task_version = task.version
 
         self.clear_content()
 
@@ -873,6 +1072,7 @@ class TimePlanApp(ctk.CTk):
                       font=ctk.CTkFont(size=16, weight="bold"),
                       fg_color="#A85BC2", hover_color="#C576E0").grid(row=5, column=0, columnspan=2, pady=20)
 
+    @ui_action("save_task_changes")
     def save_task_changes(self):
         if not self.selected_task:
             return # No task selected, do not proceed
@@ -892,7 +1092,7 @@ class TimePlanApp(ctk.CTk):
                 due_date_obj = datetime.strptime(due_date, '%Y-%m-%d').date()
                 
                 # Check if the due date has passed
-                current_date = datetime.now().date()
+                current_date = self.clock.today()
                 if due_date_obj < current_date and category_name != "Completed":
                     # If due date has passed and task is not completed, it should be marked as Missed
                     category_name = "Missed"
@@ -920,27 +1120,42 @@ class TimePlanApp(ctk.CTk):
         # Get the current filter before updating
         current_filter = self.get_current_filter()
         
-        if self.db_manager.update_task(task_id, task_title, description, priority, due_date, category_id):
+        try:
+            success = self.db_manager.update_task(task_id, task_title, description, priority, due_date, category_id,
+                                                  expected_version=self.editing_task_version)
+        except VersionConflict:
+            if not self.confirm_overwrite_conflict("task"):
+                self.show_edit_task_page()
+                return
+            success = self.db_manager.update_task(task_id, task_title, description, priority, due_date, category_id)
+
+        if success:
             # Show success popup
             messagebox.showinfo("Success", "Task updated successfully!")
-              # Refresh the task list with the current filter
+            # The edit page replaced the task list, so go back to it with the current filter
             self.show_tasks_page(current_filter)
             # Show updated task details
             self.show_task_detail(task_id)
+            self.change_events.discard()
         else:
             messagebox.showerror("Error", "Failed to update task. Check console for database errors.")
             
+    @ui_action("show_task_detail")
     def show_task_detail(self, task_id):
         # Note: task_id is already stored in self.selected_task by the click handler
         
         # Ensure the detail pane exists and is visible before fetching task data
         # This gives the appearance of instant responsiveness
-        if not hasattr(self, 'detail_pane') or not self.detail_pane_visible:
-            # Create a fresh detail pane immediately
+        if self.detail_pane is None or not self.detail_pane.winfo_exists():
             self.detail_pane = ctk.CTkFrame(self, width=self.detail_pane_width, fg_color="#F3E6F8", corner_radius=0)
-            self.detail_pane.pack(side="right", fill="y")
             # Prevent the pane from resizing smaller than our defined width
             self.detail_pane.pack_propagate(False)
+            self.detail_pane_visible = False
+        if not self.detail_pane_visible:
+            # Reuse the hidden pane (a new frame per click used to leave the old one alive)
+            for widget in self.detail_pane.winfo_children():
+                widget.destroy()
+            self.detail_pane.pack(side="right", fill="y")
             self.detail_pane_visible = True
             
             # Create an immediate loading message while fetching data
@@ -953,6 +1168,7 @@ class TimePlanApp(ctk.CTk):
             loading_label.pack(expand=True)
             self.update_idletasks()  # Force immediate UI update
             
+        self.detail_pane_editing = False
         # Now fetch the task details from the database
         task = self.get_task_by_id(task_id)
         if not task:
@@ -1106,22 +1322,28 @@ class TimePlanApp(ctk.CTk):
         if self.detail_pane_visible:
             self.detail_pane.pack_forget()
             self.detail_pane_visible = False
+            self.detail_pane_editing = False
+            # Free the hidden pane's content now instead of on the next open
+            for widget in self.detail_pane.winfo_children():
+                widget.destroy()
             # Clear the selected task ID so we can select the same task again
             self.selected_task = None
     
+    def confirm_overwrite_conflict(self, what):
+        """Ask what to do when a save hit a VersionConflict: True = save over the other change, False = reload."""
+        return messagebox.askyesno(
+            "Changed Elsewhere",
+            f"This {what} was changed in another window since you opened it.\n\n"
+            "Yes: save your changes over it\nNo: discard your changes and reload it"
+        )
+
     def get_task_by_id(self, task_id):
-        # Query the database for a specific task
-        query = """
-            SELECT t.task_id, t.task_title, t.description, p.priority_name, t.due_date, tc.category_name 
-            FROM tasks t 
-            JOIN task_category tc ON t.category_id = tc.category_id 
-            LEFT JOIN priority p ON t.priority_id = p.priority_id
-            WHERE t.task_id = ?
-        """
-        result = self.db_manager._fetch_one(query, (task_id,))
-        return result
+        # Query the database for a specific task (returns a Task row)
+        return self.db_manager.get_task_by_id(task_id)
 
+    @ui_action("show_edit_task_form")
     def show_edit_task_form(self, task_id):
+        self.detail_pane_editing = True
         # Clear detail pane first
         for widget in self.detail_pane.winfo_children():
             widget.destroy()
@@ -1132,6 +1354,7 @@ class TimePlanApp(ctk.CTk):
             return
             
         task_id, title, description, priority, due_date, category_name = task
+        task_version = task.version
         
         # Detail heading
         ctk.CTkLabel(
@@ -1277,7 +1500,7 @@ class TimePlanApp(ctk.CTk):
                 messagebox.showwarning("Warning", "Invalid category selected.")
                 return
 
-            success = self.db_manager.update_task(
+            task_fields = (
                 task_id,
                 new_title,
                 new_description if new_description else None,
@@ -1285,10 +1508,16 @@ class TimePlanApp(ctk.CTk):
                 new_due_date if new_due_date else None,
                 category_id
             )
+            try:
+                success = self.db_manager.update_task(*task_fields, expected_version=task_version)
+            except VersionConflict:
+                if not self.confirm_overwrite_conflict("task"):
+                    self.show_edit_task_form(task_id)
+                    return
+                success = self.db_manager.update_task(*task_fields)
             if success:
                 messagebox.showinfo("Success", "Task updated successfully!")
                 self.hide_task_detail()
-                self.show_tasks_page(self.get_current_filter())
             else:
                 messagebox.showerror("Error", "Failed to update task.")
 
@@ -1299,7 +1528,6 @@ class TimePlanApp(ctk.CTk):
                 if success:
                     messagebox.showinfo("Success", "Task deleted successfully!")
                     self.hide_task_detail()
-                    self.show_tasks_page(self.get_current_filter())
                 else:
                     messagebox.showerror("Error", "Failed to delete task.")
 
@@ -1321,19 +1549,23 @@ class TimePlanApp(ctk.CTk):
             command=delete_habit
         ).pack(side="left", padx=(0, 10), fill="x", expand=True)
     
+    @ui_action("show_habit_page")
     def show_habit_page(self):
         """Display the habit page with recurring tasks grouped by recurrence pattern."""
         # Hide any open detail pane
         self.selected_task = None
         self.detail_pane_visible = False
         
-        # Hide task detail pane if it exists
-        if hasattr(self, 'task_detail_pane'):
-            self.task_detail_pane.pack_forget()
+        # Remove task detail pane if it exists
+        if self.task_detail_pane is not None:
+            self.task_detail_pane.destroy()
+            self.task_detail_pane = None
         
         # Hide calendar detail pane if it exists
-        if hasattr(self, 'detail_pane'):
+        if self.detail_pane is not None:
             self.detail_pane.pack_forget()
+            for widget in self.detail_pane.winfo_children():
+                widget.destroy()
             
         self.navbar.pack_forget()
         self.content.pack_forget()
@@ -1365,13 +1597,13 @@ class TimePlanApp(ctk.CTk):
         other_tasks = []
         
         for task in recurring_tasks:
-            rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date, status = task
+            recurrence_pattern = task.recurrence_pattern.lower()
             
-            if recurrence_pattern.lower() == 'daily':
+            if recurrence_pattern == 'daily':
                 daily_tasks.append(task)
-            elif recurrence_pattern.lower() == 'monthly':
+            elif recurrence_pattern == 'monthly':
                 monthly_tasks.append(task)
-            elif recurrence_pattern.lower() == 'annual' or recurrence_pattern.lower() == 'yearly':
+            elif recurrence_pattern == 'annual' or recurrence_pattern == 'yearly':
                 annual_tasks.append(task)
             else:
                 other_tasks.append(task)
@@ -1431,11 +1663,12 @@ class TimePlanApp(ctk.CTk):
         separator = ctk.CTkFrame(section_frame, height=2, fg_color="#D1B4E0")
         separator.pack(fill="x", padx=10, pady=(0, 10))
         
-        philippines_timezone = pytz.timezone('Asia/Manila')
-        current_local_date = datetime.now(philippines_timezone).date()
-        
         for task in tasks:
-            rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date, status = task
+            rtask_id = task.rtask_id
+            rtask_title = task.title
+            description = task.description
+            last_completed_date = task.last_completed_date
+            status = task.status
             
             # Determine colors based on status
             is_completed = (status == 'Completed')
@@ -1493,14 +1726,15 @@ class TimePlanApp(ctk.CTk):
                 ).grid(row=1, column=1, padx=(10, 5), pady=(0, 10), sticky="new")
             
             # Display last completed date if available
-            last_completed_text = f"Last done: {last_completed_date}" if last_completed_date else "Never completed"
-            ctk.CTkLabel(
+            last_done_label = ctk.CTkLabel(
                 task_frame, 
-                text=last_completed_text,
+                text=self._habit_last_done_text(last_completed_date),
                 font=ctk.CTkFont(size=12),
                 text_color="#888888", 
                 anchor="e"
-            ).grid(row=0, column=2, padx=(5, 10), pady=(10, 0), sticky="ne")
+            )
+            last_done_label.grid(row=0, column=2, padx=(5, 10), pady=(10, 0), sticky="ne")
+            self.habit_cards[rtask_id] = (task_frame, status_var, last_done_label)
             
             # Add edit button
             edit_btn = ctk.CTkButton(
@@ -1604,8 +1838,7 @@ class TimePlanApp(ctk.CTk):
         start_date_entry.pack(side="left", fill="x", expand=True)
         
         # Set default date to today
-        philippines_timezone = pytz.timezone('Asia/Manila')
-        current_local_date = datetime.now(philippines_timezone).date().strftime('%Y-%m-%d')
+        current_local_date = self.clock.today_str()
         start_date_entry.insert(0, current_local_date)
         
         date_picker_btn = ctk.CTkButton(
@@ -1675,9 +1908,7 @@ class TimePlanApp(ctk.CTk):
             if success:
                 messagebox.showinfo("Success", "New habit created successfully!")
                 dialog.destroy()
-                # Refresh the habit page
-                if self.current_page == "habit":
-                    self.show_habit_page()
+                # The HabitAdded event refreshes the habit page (apply_change_events)
             else:
                 messagebox.showerror("Error", "Failed to create habit. Please try again.")
         
@@ -1693,7 +1924,7 @@ class TimePlanApp(ctk.CTk):
         """Show dialog to edit an existing recurring task."""
         # Get the recurring task from database
         tasks = self.db_manager._fetch_all(
-            "SELECT rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date FROM recurring_tasks WHERE rtask_id = ?", 
+            "SELECT rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date, version FROM recurring_tasks WHERE rtask_id = ?", 
             (rtask_id,)
         )
         
@@ -1702,7 +1933,7 @@ class TimePlanApp(ctk.CTk):
             return
         
         task = tasks[0]
-        rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date = task
+        rtask_id, rtask_title, description, start_date, recurrence_pattern, last_completed_date, habit_version = task
         
         # Create dialog
         dialog = ctk.CTkToplevel(self)
@@ -1798,8 +2029,7 @@ class TimePlanApp(ctk.CTk):
             start_date_entry.insert(0, start_date)
         else:
             # Set default date to today
-            philippines_timezone = pytz.timezone('Asia/Manila')
-            current_local_date = datetime.now(philippines_timezone).date().strftime('%Y-%m-%d')
+            current_local_date = self.clock.today_str()
             start_date_entry.insert(0, current_local_date)
         
         date_picker_btn = ctk.CTkButton(
@@ -1863,9 +2093,7 @@ class TimePlanApp(ctk.CTk):
                 if success:
                     messagebox.showinfo("Success", "Habit deleted successfully!")
                     dialog.destroy()
-                    # Refresh the habit page
-                    if self.current_page == "habit":
-                        self.show_habit_page()
+                    # The HabitDeleted event refreshes the habit page (apply_change_events)
                 else:
                     messagebox.showerror("Error", "Failed to delete habit. Please try again.")
         
@@ -1880,20 +2108,26 @@ class TimePlanApp(ctk.CTk):
                 return
             
             # Update the habit in the database
-            success = self.db_manager.update_recurring_task(
+            habit_fields = (
                 rtask_id,
                 new_rtask_title,
                 new_description if new_description else None,
                 new_start_date,
                 new_recurrence_pattern
             )
+            try:
+                success = self.db_manager.update_recurring_task(*habit_fields, expected_version=habit_version)
+            except VersionConflict:
+                if not self.confirm_overwrite_conflict("habit"):
+                    dialog.destroy()
+                    self.show_edit_recurring_task_dialog(rtask_id)
+                    return
+                success = self.db_manager.update_recurring_task(*habit_fields)
             
             if success:
                 messagebox.showinfo("Success", "Habit updated successfully!")
                 dialog.destroy()
-                # Refresh the habit page
-                if self.current_page == "habit":
-                    self.show_habit_page()
+                # The HabitUpdated event refreshes the habit page (apply_change_events)
             else:
                 messagebox.showerror("Error", "Failed to update habit. Please try again.")
         
@@ -1919,21 +2153,35 @@ class TimePlanApp(ctk.CTk):
             command=delete_habit
         ).pack(side="left", padx=(0, 10), fill="x", expand=True)
     
+    @ui_action("toggle_habit_completion")
     def toggle_habit_completion(self, rtask_id, status_var):
         """Toggle completion status of a recurring task."""
-        philippines_timezone = pytz.timezone('Asia/Manila')
-        current_local_date = datetime.now(philippines_timezone).date().strftime('%Y-%m-%d')
+        current_local_date = self.clock.today_str()
         
+        # The HabitCompleted event updates the card in place (patch_habit_card)
         if status_var.get() == "on":
             # Mark as completed today and set status to 'Completed'
             self.db_manager.update_recurring_task_completion(rtask_id, current_local_date)
         else:
             # Mark as not completed (remove completion date) and set status to 'Pending'
             self.db_manager.remove_recurring_task_completion(rtask_id, current_local_date)
-        
-        # Refresh the habit page to show updated status
-        self.show_habit_page()
 
+    def patch_habit_card(self, rtask_id):
+        """Update one habit card's color, checkbox and last done date from the database."""
+        card = self.habit_cards.get(rtask_id)
+        habit = self.db_manager.get_recurring_task(rtask_id) if card else None
+        if habit is None:
+            return
+        task_frame, status_var, last_done_label = card
+        is_completed = (habit.status == 'Completed')
+        task_frame.configure(fg_color="#C8E6C9" if is_completed else "white")
+        status_var.set("on" if is_completed else "off")
+        last_done_label.configure(text=self._habit_last_done_text(habit.last_completed_date))
+
+    def _habit_last_done_text(self, last_completed_date):
+        return f"Last done: {last_completed_date}" if last_completed_date else "Never completed"
+
+    @ui_action("confirm_delete_task")
     def confirm_delete_task(self, task_id):
         confirm = messagebox.askyesno(
             title="Confirm Delete",
@@ -1941,25 +2189,14 @@ class TimePlanApp(ctk.CTk):
         )
         
         if confirm:
-            # Get the current filter before deleting
-            current_filter = self.get_current_filter()
-            
             success = self.db_manager.delete_task(task_id)
             if success:
                 # Show success popup
                 messagebox.showinfo("Success", "Task deleted successfully!")
                 
-                # First hide the detail pane since the task no longer exists
+                # Hide the detail pane since the task no longer exists; the TaskDeleted event
+                # removes its card from the tasks page (or re-renders the calendar)
                 self.hide_task_detail()
-                
-                # Determine which page to return to based on where the user came from
-                if self.current_page == "calendar":
-                    # If user was on calendar page, return there
-                    self.show_calendar_page()
-                              
-                else:
-                    # Otherwise, refresh the task list with the current filter
-                    self.show_tasks_page(current_filter)
             else:
                 messagebox.showerror("Error", "Failed to delete task.")
 
@@ -1987,14 +2224,14 @@ class TimePlanApp(ctk.CTk):
 
         try:
             due_date = datetime.strptime(due_date_str, '%Y-%m-%d').date()
-            today = datetime.now().date()
+            today = self.clock.today()
             
             if due_date < today:
                 return self.missed_category_id
             else:
                 return self.on_going_category_id
         except ValueError:
-            return self.on_Going_category_id
+            return self.on_going_category_id
 
     def show_add_task_dialog(self):
         # Create the popup window
@@ -2094,7 +2331,9 @@ class TimePlanApp(ctk.CTk):
             if success:
                 messagebox.showinfo("Success", "Task added successfully!")
                 dialog.destroy()
-                self.show_tasks_page("All Tasks")
+                # An open "All Tasks" list gets the new card from the TaskAdded event
+                if self.task_scroll_frame is None or self.task_list_filter != "All Tasks":
+                    self.show_tasks_page("All Tasks")
             else:
                 messagebox.showerror("Error", "Failed to add task!")
 
@@ -2107,6 +2346,7 @@ class TimePlanApp(ctk.CTk):
         )
         save_btn.pack(fill="x", pady=20)
 
+    @ui_action("show_search_dialog")
     def show_search_dialog(self):
         # Create the popup window
         dialog = ctk.CTkToplevel(self)
@@ -2178,6 +2418,9 @@ class TimePlanApp(ctk.CTk):
         task_type = {}
 
         def on_search(*args):
+            self.run_ui_action("search_keystroke", run_search)
+
+        def run_search():
             search_text = search_var.get().strip().lower()
             if len(search_text) < 2:
                 results_label.configure(text="Enter at least 2 characters to search")
@@ -2279,22 +2522,21 @@ class TimePlanApp(ctk.CTk):
         search_entry.focus_set()
         
     def create_task_card(self, task_frame, task):
-        """Helper function to create a task card with unified styling"""
+        """Helper function to create a task card (from a Task row) with unified styling"""
         # Define color constants
         ONGOING_BG_COLOR = "white"  # Default for uncompleted, non-missed tasks
         MISSED_BG_COLOR = "#FFCDD2" # Light Red
         COMPLETED_BG_COLOR = "#C8E6C9" # Light Green
 
-        task_id = task['id']  # Keep as 'id' since this is used for calendar view dictionary
-        category_name = task['category']
-        due_date = task.get('due_date', None)
-        title = task['title']  # Keep as 'title' since this is used for calendar view dictionarytle']  # Keep as 'title' since this is used for calendar view dictionary
-        description = task.get('description', '')
-        priority = task.get('priority', '')
+        task_id = task.task_id
+        category_name = task.category_name
+        due_date = task.due_date
+        title = task.title
+        description = task.description
+        priority = task.priority
 
         # Get current date for comparison
-        philippines_timezone = pytz.timezone('Asia/Manila')
-        current_local_date = datetime.now(philippines_timezone).date()
+        today_ordinal = self.clock.today().toordinal()
 
         # Determine task status and colors
         frame_bg_color = ONGOING_BG_COLOR
@@ -2302,14 +2544,9 @@ class TimePlanApp(ctk.CTk):
         is_completed_by_category = (category_name == "Completed")
         is_missed = False
 
-        if not is_completed_by_category and due_date:
-            try:
-                due_date_obj = datetime.strptime(due_date, '%Y-%m-%d').date()
-                if due_date_obj < current_local_date:
-                    is_missed = True
-                    category_name = "Missed"
-            except ValueError:
-                pass
+        if not is_completed_by_category and task.due_ordinal is not None and task.due_ordinal < today_ordinal:
+            is_missed = True
+            category_name = "Missed"
 
         if is_completed_by_category:
             frame_bg_color = COMPLETED_BG_COLOR
@@ -2416,16 +2653,7 @@ class TimePlanApp(ctk.CTk):
         
         # Due date label
         if due_date:
-            try:
-                due_date_obj = datetime.strptime(due_date, '%Y-%m-%d').date()
-                if due_date_obj == current_local_date:
-                    formatted_date_str = "Due: Today"
-                elif due_date_obj == (current_local_date + timedelta(days=1)):
-                    formatted_date_str = "Due: Tomorrow"
-                else:
-                    formatted_date_str = f"Due: {due_date_obj.strftime('%b %d, %Y')}"
-            except ValueError:
-                formatted_date_str = "Due: Invalid Date"
+            formatted_date_str = format_due_label(task.due_ordinal, today_ordinal)
 
             due_date_label = ctk.CTkLabel(
                 task_frame,
@@ -2444,5 +2672,6 @@ class TimePlanApp(ctk.CTk):
         # If you want to link them in the future, you could add a recurring_task_id reference in the tasks table
 # Application entry point
 if __name__ == "__main__":
+    configure_logging()
     app = TimePlanApp()
     app.mainloop()
\ No newline at end of file
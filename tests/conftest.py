@@ -0,0 +1,29 @@
+from datetime import datetime
+import pytest
+from clock import FakeClock
+from databaseManagement import DatabaseManager
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(datetime(2025, 6, 30, 12))
+
+
+@pytest.fixture
+def make_db(tmp_path, clock):
+    """make_db(name) -> a DatabaseManager on a fresh database file in tmp_path (closed after the test)."""
+    opened = []
+
+    def make(name="timePlanDB.db"):
+        db = DatabaseManager(str(tmp_path / name), clock=clock)
+        opened.append(db)
+        return db
+
+    yield make
+    for db in opened:
+        db._close()
+
+
+@pytest.fixture
+def db(make_db):
+    return make_db()
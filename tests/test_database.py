@@ -0,0 +1,196 @@
+import random
+import sqlite3
+import pytest
+from databaseManagement import DatabaseManager, VersionConflict
+from eventBus import DayRolledOver, HabitAdded, HabitDeleted, HabitUpdated, TaskCategoryChanged
+from retryPolicy import RetryPolicy
+from rolloverScheduler import MidnightRolloverScheduler
+
+
+def task_changes(db, since_seq):
+    return [(row_id, op) for _, table_name, row_id, op, _, _ in db.changes_since(since_seq) if table_name == "tasks"]
+
+
+@pytest.mark.parametrize("sort_by", sorted(DatabaseManager.TASK_SORT_ORDERS))
+def test_all_tasks_sort_modes_read_in_index_order(db, sort_by):
+    queries = []
+    db.add_query_observer(lambda query, params, elapsed, rows, error=None: queries.append((query, params)))
+    db.get_tasks(1, "All Tasks", sort_by)
+    query, params = queries[-1]
+    plan = " | ".join(row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + query, params))
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_stale_version_raises_conflict(db):
+    task_id = db.add_task(1, "Essay", None, "Urgent", "2025-07-01")
+    version = db.get_task_version(task_id)
+    assert db.update_task_category(task_id, 3, expected_version=version)
+    with pytest.raises(VersionConflict):
+        db.update_task_details(task_id, task_title="Essay v2", expected_version=version)
+    # Without expected_version the save goes through (the "save over it" choice)
+    assert db.update_task_details(task_id, task_title="Essay v2")
+    assert db.get_task_version(task_id) == version + 2
+
+
+def test_task_row_carries_the_version_it_was_read_at(db):
+    task_id = db.add_task(1, "Essay", None, "Urgent", "2025-07-01")
+    queries = []
+    db.add_query_observer(lambda query, params, elapsed, rows, error=None: queries.append(query))
+    task = db.get_task_by_id(task_id)
+    assert len(queries) == 1
+    assert task.version == db.get_task_version(task_id)
+    assert db.update_task(task_id, "Essay v2", None, "Urgent", "2025-07-01", 1, expected_version=task.version)
+    with pytest.raises(VersionConflict):
+        db.update_task(task_id, "Essay v3", None, "Urgent", "2025-07-01", 1, expected_version=task.version)
+
+
+def test_only_edits_bump_the_task_version(db):
+    task_id = db.add_task(1, "Essay", None, "Urgent", "2025-07-01")
+    version = db.get_task_version(task_id)
+    assert db._execute_query("UPDATE tasks SET sync_id = 'abc' WHERE task_id = ?", (task_id,))
+    assert db.get_task_version(task_id) == version
+    assert db.update_task_details(task_id, due_date="2025-07-02")
+    assert db.get_task_version(task_id) == version + 1
+
+
+def test_versioned_update_of_deleted_task_returns_false(db):
+    task_id = db.add_task(1, "Gone", None, "Not urgent", "2025-07-01")
+    version = db.get_task_version(task_id)
+    db.delete_task(task_id)
+    assert db.update_task_category(task_id, 3, expected_version=version) is False
+
+
+def test_change_log_records_each_write_once(db):
+    start_seq = db.latest_change_seq()
+    task_id = db.add_task(1, "Read", None, "Not urgent", "2025-07-01")
+    db.update_task_category(task_id, 3)
+    db.delete_task(task_id)
+    assert task_changes(db, start_seq) == [(task_id, "insert"), (task_id, "update"), (task_id, "delete")]
+
+
+def test_compaction_keeps_latest_entry_per_row(db):
+    task_id = db.add_task(1, "Draft", None, "Not urgent", "2025-07-01")
+    for title in ("Draft 2", "Draft 3", "Draft 4"):
+        db.update_task_details(task_id, task_title=title)
+    latest_seq = db.latest_change_seq()
+    assert db.compact_change_log() == 3
+    entries = [change for change in db.changes_since(0, table_name="tasks") if change[2] == task_id]
+    assert [(change[0], change[3]) for change in entries] == [(latest_seq, "update")]
+    # Recent entries aren't expired, so nothing counts as truncated
+    assert db.change_log_truncated_seq() == 0
+
+
+def test_daily_sweep_keeps_entries_the_sync_exporter_has_not_read(db):
+    task_id = db.add_task(1, "Draft", None, "Not urgent", "2025-07-01")
+    db.set_app_state("sync_exported_seq", str(db.latest_change_seq()))
+    for title in ("Draft 2", "Draft 3"):
+        db.update_task_details(task_id, task_title=title)
+    unread = db.changes_since(db.change_log_consumer_seq())
+
+    # The per-user sweep doesn't touch change_log at all; the all-users one compacts up to the watermark
+    assert db.run_midnight_rollover(user_id=1)
+    assert db.get_app_state("last_maintenance_date") is None
+    assert db.run_midnight_rollover()
+    assert db.get_app_state("last_maintenance_date") == "2025-06-30"
+    assert db.changes_since(db.change_log_consumer_seq()) == unread
+
+
+def test_daily_stats_match_rebuild(db):
+    rng = random.Random(7)
+    task_ids = []
+    for i in range(60):
+        action = rng.random()
+        if action < 0.5 or not task_ids:
+            due_date = f"2025-{rng.randint(1, 8):02d}-{rng.randint(1, 28):02d}"
+            task_ids.append(db.add_task(1, f"Task {i}", None, "Not urgent", due_date, rng.choice((1, 2, 3))))
+        elif action < 0.8:
+            db.update_task_category(rng.choice(task_ids), rng.choice((1, 2, 3)))
+        elif action < 0.9:
+            db.update_task_details(rng.choice(task_ids), due_date=f"2025-0{rng.randint(1, 9)}-15")
+        else:
+            db.delete_task(task_ids.pop(rng.randrange(len(task_ids))))
+    db.archive_old_tasks(retention_days=30)
+    archived = db._fetch_one("SELECT task_id FROM tasks_archive")
+    if archived:
+        db.restore_archived_task(archived[0])
+
+    # Counters that went back to zero leave an all-zero row behind; a rebuild doesn't create those
+    incremental = [row for row in db.get_daily_stats(1) if any(row[1:])]
+    assert db.rebuild_daily_stats()
+    assert db.get_daily_stats(1) == incremental
+    assert db.get_task_totals(1)[0] == len(task_ids)
+
+
+def test_rollover_uses_each_users_own_date(db):
+    # Noon on June 30 in Manila is still the evening of June 29 in Los Angeles
+    db.add_user("la_user", "pw")
+    la_user = db.get_user_by_username("la_user")[0]
+    assert db.set_user_timezone(la_user, "America/Los_Angeles")
+    manila_task = db.add_task(1, "Manila task", None, "Not urgent", "2025-06-29")
+    la_task = db.add_task(la_user, "LA task", None, "Not urgent", "2025-06-29")
+    category = "SELECT category_id FROM tasks WHERE task_id = ?"
+
+    assert db.run_midnight_rollover(user_id=la_user)
+    assert db._fetch_one(category, (la_task,))[0] == 1
+    assert db._fetch_one(category, (manila_task,))[0] == 1  # only la_user's tasks were swept
+    assert db.get_app_state(f"last_rollover_date:{la_user}") == "2025-06-29"
+
+    assert db.run_midnight_rollover(user_id=1)
+    assert not db.run_midnight_rollover(user_id=1)
+    assert db._fetch_one(category, (manila_task,))[0] == 2
+    assert db.get_app_state("last_rollover_date:1") == "2025-06-30"
+
+    # The all-users sweep still judges la_user's task by Los Angeles' date
+    assert db.update_past_due_tasks()
+    assert db._fetch_one(category, (la_task,))[0] == 1
+
+
+def test_rollover_publishes_events_for_what_it_changed(db):
+    late_task = db.add_task(1, "Late", None, "Not urgent", "2025-06-29")
+    db.add_task(1, "Upcoming", None, "Not urgent", "2025-07-02")
+    events = []
+    db.events.subscribe(None, events.append)
+    assert db.run_midnight_rollover(user_id=1)
+    missed = db.get_category_id_by_name("Missed")
+    assert TaskCategoryChanged(late_task, missed) in events
+    assert not [e for e in events if isinstance(e, TaskCategoryChanged) and e.task_id != late_task]
+    assert events[-1] == DayRolledOver(1, "2025-06-30")
+
+
+def test_habit_writes_publish_events(db):
+    events = []
+    db.events.subscribe(None, events.append)
+    rtask_id = db.add_recurring_task(1, "Run", None, "2025-06-01", "Daily")
+    db.update_recurring_task(rtask_id, "Run 5k", None, "2025-06-01", "Daily")
+    db.delete_recurring_task(rtask_id)
+    assert events == [HabitAdded(rtask_id, 1), HabitUpdated(rtask_id), HabitDeleted(rtask_id)]
+
+
+class IdleWidget:
+    def __init__(self):
+        self.idle_callbacks = []
+
+    def after_idle(self, callback):
+        self.idle_callbacks.append(callback)
+        return "idle"
+
+    def after(self, delay_ms, callback):
+        return "after"
+
+
+def test_rollover_scheduler_defers_the_startup_sweep(db):
+    db.add_task(1, "Late", None, "Not urgent", "2025-06-29")
+    widget = IdleWidget()
+    MidnightRolloverScheduler(widget, db, user_id=1).start()
+    assert db.get_app_state("last_rollover_date:1") is None
+    widget.idle_callbacks.pop()()
+    assert db.get_app_state("last_rollover_date:1") == "2025-06-30"
+
+
+def test_retry_policy_retries_only_busy_errors():
+    policy = RetryPolicy(max_attempts=3, sleep=lambda delay: None)
+    locked = sqlite3.OperationalError("database is locked")
+    assert policy.should_retry(locked, 0)
+    assert not policy.should_retry(sqlite3.OperationalError("no such table: x"), 0)
+    assert not policy.should_retry(locked, 2)
+    assert policy.stats()["gave_up"] == 1
@@ -0,0 +1,65 @@
+import os
+import pytest
+from queryBudget import ActionTracker, QUERY_BUDGETS, QueryBudgetExceeded
+from taskCards import load_task_cards
+
+
+def add_sample_tasks(db, count=40):
+    for i in range(count):
+        db.add_task(1, f"Task {i}", "notes", "Urgent" if i % 3 == 0 else "Not urgent", f"2025-07-{i % 28 + 1:02d}")
+
+
+@pytest.fixture
+def tracker(db):
+    tracker = ActionTracker()
+    tracker.attach(db)
+    yield tracker
+    tracker.detach()
+
+
+def test_expect_queries_raises_over_budget(db, tracker):
+    with pytest.raises(QueryBudgetExceeded):
+        with tracker.expect_queries("too_many", max_queries=1):
+            db.get_tasks(1)
+            db.get_recurring_task_ids()
+
+
+def test_tasks_page_queries_fit_budget(db, tracker, clock):
+    # load_task_cards is everything show_tasks_page reads; its card widgets are built from the result only
+    add_sample_tasks(db)
+    db.add_recurring_task(1, "Run", None, "2025-06-01", "Daily")
+    db.get_tasks(1)  # warm the category cache like app startup does
+    today_ordinal = clock.today().toordinal()
+    for filter_type in ("All Tasks", "On-going", "Missed", "Completed"):
+        for sort_by in (None, "priority", "title"):
+            with tracker.expect_queries("show_tasks_page", QUERY_BUDGETS["show_tasks_page"]) as stats:
+                load_task_cards(db, 1, filter_type, sort_by, today_ordinal)
+            assert not stats.n_plus_one
+    assert len(load_task_cards(db, 1, "All Tasks", None, today_ordinal)) == len(db.get_tasks(1))
+
+
+def test_detail_and_search_queries_fit_budget(db, tracker):
+    add_sample_tasks(db)
+    with tracker.expect_queries("show_task_detail", QUERY_BUDGETS["show_task_detail"]):
+        db.get_task_by_id(1)
+    with tracker.expect_queries("search_keystroke", QUERY_BUDGETS["search_keystroke"]):
+        db.search_tasks(1, "task 1")
+
+
+@pytest.mark.skipif(not os.environ.get("DISPLAY"), reason="needs a display (run under xvfb-run)")
+def test_app_page_actions_fit_budget(tmp_path, clock):
+    pytest.importorskip("customtkinter")
+    pytest.importorskip("tkcalendar")
+    from test1 import TimePlanApp
+    app = TimePlanApp(clock=clock, db_name=str(tmp_path / "app.db"))
+    try:
+        add_sample_tasks(app.db_manager)
+        app.update()
+        for name, show_page in (("show_tasks_page", lambda: app.show_tasks_page("All Tasks")),
+                                ("show_calendar_page", app.show_calendar_page),
+                                ("show_task_detail", lambda: app.show_task_detail(1))):
+            with app.action_tracker.expect_queries(name, QUERY_BUDGETS[name]):
+                show_page()
+            app.update()
+    finally:
+        app.on_closing()
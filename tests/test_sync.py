@@ -0,0 +1,138 @@
+import os
+import shutil
+import sqlite3
+from databaseManagement import DatabaseManager
+from eventBus import HabitAdded, TaskAdded
+from syncEngine import LOCKED_PASSWORD, SyncEngine
+
+REPO_DATABASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "timePlanDB.db")
+
+
+def task_titles(db):
+    return sorted(row[0] for row in db._fetch_all("SELECT task_title FROM tasks"))
+
+
+def sync_all(engines, directory):
+    # Twice round, so every replica also sees the changes the others made in this round
+    for _ in range(2):
+        for engine in engines:
+            engine.sync_directory(str(directory))
+
+
+def test_two_replicas_converge(make_db, tmp_path):
+    laptop, desktop = make_db("laptop.db"), make_db("desktop.db")
+    engines = [SyncEngine(laptop), SyncEngine(desktop)]
+    shared = tmp_path / "shared"
+
+    essay = laptop.add_task(1, "Essay", None, "Urgent", "2025-07-01")
+    laptop.add_task(1, "Groceries", None, "Not urgent", "2025-07-02")
+    habit = desktop.add_recurring_task(1, "Run", None, "2025-06-01", "Daily")
+    sync_all(engines, shared)
+    assert task_titles(desktop) == task_titles(laptop) == ["Essay", "Groceries"]
+    assert [h.title for h in laptop.get_recurring_tasks(1)] == ["Run"]
+
+    # Edit on one side, delete on the other, complete a habit
+    desktop_essay = desktop._fetch_one("SELECT task_id FROM tasks WHERE task_title = 'Essay'")[0]
+    desktop.update_task_details(desktop_essay, task_title="Essay (final)")
+    laptop.delete_task(laptop._fetch_one("SELECT task_id FROM tasks WHERE task_title = 'Groceries'")[0])
+    desktop.update_recurring_task_completion(habit, "2025-06-30")
+    sync_all(engines, shared)
+
+    assert task_titles(laptop) == task_titles(desktop) == ["Essay (final)"]
+    assert laptop.get_task_version(essay) == desktop.get_task_version(desktop_essay)
+    assert [h.last_completed_date for h in laptop.get_recurring_tasks(1)] == ["2025-06-30"]
+
+
+def test_import_is_idempotent(make_db):
+    source, target = make_db("source.db"), make_db("target.db")
+    source.add_task(1, "Essay", None, "Urgent", "2025-07-01")
+    changeset = SyncEngine(source).export_changes()
+    engine = SyncEngine(target)
+    assert engine.import_changes(changeset).applied == 1
+    # A tie on (version, updated_at) may re-apply the same row, which must change nothing
+    engine.import_changes(changeset)
+    assert task_titles(target) == ["Essay"]
+    assert target.get_task_version(1) == source.get_task_version(1)
+    assert target.get_task_totals(1)[0] == 1
+
+
+def archived_titles(db):
+    return sorted(row[0] for row in db._fetch_all("SELECT task_title FROM tasks_archive"))
+
+
+def test_archived_tasks_reach_other_replicas(make_db, tmp_path):
+    laptop, desktop = make_db("laptop.db"), make_db("desktop.db")
+    shared = tmp_path / "shared"
+    engines = [SyncEngine(laptop), SyncEngine(desktop)]
+
+    # Finished and archived before it was ever synced
+    laptop.add_task(1, "Old report", None, "Not urgent", "2024-01-10", 3)
+    # Synced while live, then finished and archived
+    exam = laptop.add_task(1, "Exam prep", None, "Urgent", "2024-02-01")
+    sync_all(engines, shared)
+    laptop.update_task_category(exam, 3)
+    assert laptop.archive_old_tasks() == 2
+    sync_all(engines, shared)
+
+    assert archived_titles(desktop) == archived_titles(laptop) == ["Exam prep", "Old report"]
+    assert task_titles(desktop) == []
+    archived_version = "SELECT version FROM tasks_archive WHERE task_title = 'Exam prep'"
+    assert desktop._fetch_one(archived_version) == laptop._fetch_one(archived_version)
+
+    # A replica that joins later gets the archive in its first (full) sync
+    newcomer = make_db("newcomer.db")
+    SyncEngine(newcomer).sync_directory(str(shared))
+    assert archived_titles(newcomer) == ["Exam prep", "Old report"]
+    assert newcomer.get_task_totals(1) == laptop.get_task_totals(1)
+
+
+def test_changesets_carry_no_passwords(make_db):
+    laptop, desktop = make_db("laptop.db"), make_db("desktop.db")
+    laptop.add_user("sam", "s3cret-hash")
+    sam = laptop.get_user_by_username("sam")[0]
+    laptop.add_task(sam, "Sam's essay", None, "Urgent", "2025-07-01")
+    changeset = SyncEngine(laptop).export_changes()
+    assert "s3cret-hash" not in repr(changeset)
+    assert "sam" in changeset["users"]
+
+    SyncEngine(desktop).import_changes(changeset)
+    assert desktop.get_user_by_username("sam")[2] == LOCKED_PASSWORD
+    assert "Sam's essay" in task_titles(desktop)
+
+
+def task_history(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT task_id, updated_at FROM tasks ORDER BY task_id").fetchall()
+
+
+def test_opening_a_database_keeps_edit_history(tmp_path, clock):
+    path = str(tmp_path / "old.db")
+    shutil.copy(REPO_DATABASE, path)
+    before = task_history(path)
+    db = DatabaseManager(path, clock=clock)
+    assert task_history(path) == before
+    assert {row[0] for row in db._fetch_all("SELECT version FROM tasks")} == {1}
+    assert db._fetch_one("SELECT COUNT(*) FROM change_log")[0] == 0
+    assert db._fetch_one("SELECT COUNT(*) FROM tasks WHERE sync_id IS NULL")[0] == 0
+
+    # Rows bulk-loaded without a sync_id get one on the next open, without counting as an edit
+    db._execute_query("UPDATE tasks SET sync_id = NULL")
+    seq = db.latest_change_seq()
+    db._close()
+    db = DatabaseManager(path, clock=clock)
+    assert task_history(path) == before
+    assert {row[0] for row in db._fetch_all("SELECT version FROM tasks")} == {1}
+    assert db.latest_change_seq() == seq
+    assert db._fetch_one("SELECT COUNT(*) FROM tasks WHERE sync_id IS NULL")[0] == 0
+    db._close()
+
+
+def test_imported_rows_publish_events(make_db):
+    laptop, desktop = make_db("laptop.db"), make_db("desktop.db")
+    laptop.add_task(1, "Essay", None, "Urgent", "2025-07-01")
+    laptop.add_recurring_task(1, "Run", None, "2025-06-01", "Daily")
+    events = []
+    desktop.events.subscribe(None, events.append)
+    SyncEngine(desktop).import_changes(SyncEngine(laptop).export_changes())
+    assert any(isinstance(event, TaskAdded) for event in events)
+    assert any(isinstance(event, HabitAdded) for event in events)
@@ -0,0 +1,117 @@
+import tkinter as tk
+from collections import deque
+from queryProfiler import percentile
+
+
+def count_widgets(root, skip=None):
+    """Count root and all of its descendant widgets (optionally leaving out the `skip` subtree)."""
+    count = 0
+    pending = [root]
+    while pending:
+        widget = pending.pop()
+        if widget is skip:
+            continue
+        count += 1
+        pending.extend(widget.winfo_children())
+    return count
+
+
+class ActionTiming:
+    """One finished UI action: click-to-idle latency, queries run and widget count afterwards."""
+
+    __slots__ = ("name", "elapsed", "query_count", "widget_count")
+
+    def __init__(self, name, elapsed, query_count, widget_count):
+        self.name = name
+        self.elapsed = elapsed
+        self.query_count = query_count
+        self.widget_count = widget_count
+
+
+class ActionTimings:
+    """Keeps recent UI action timings and per-action latency samples for p50/p95."""
+
+    def __init__(self, recent_size=15, samples_per_action=500):
+        self.recent = deque(maxlen=recent_size)
+        self.samples_per_action = samples_per_action
+        self.samples = {}
+        self.listeners = []
+
+    def record(self, name, elapsed, query_count=0, widget_count=0):
+        timing = ActionTiming(name, elapsed, query_count, widget_count)
+        self.recent.append(timing)
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.samples_per_action)
+        samples.append(elapsed)
+        for listener in self.listeners:
+            listener(timing)
+        return timing
+
+    def summary(self):
+        """Get (name, count, p50_ms, p95_ms) per action, slowest p95 first."""
+        rows = []
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            rows.append((name, len(ordered), percentile(ordered, 0.50) * 1000, percentile(ordered, 0.95) * 1000))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+
+class PerfOverlay:
+    """
+    A small always-on-top window listing recent UI actions and their p50/p95 latency.
+
+    Example:
+        overlay = PerfOverlay(app, timings)
+        app.bind_all("<F12>", lambda e: overlay.toggle())
+    """
+
+    def __init__(self, root, timings):
+        self.root = root
+        self.timings = timings
+        self.window = None
+        self.text_label = None
+        timings.listeners.append(self._on_timing)
+
+    @property
+    def visible(self):
+        return self.window is not None
+
+    def toggle(self):
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        if self.visible:
+            return
+        self.window = tk.Toplevel(self.root)
+        self.window.title("TimePlan performance")
+        self.window.attributes("-topmost", True)
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+        self.text_label = tk.Label(self.window, justify="left", anchor="nw", font=("Courier", 10),
+                                   bg="#222222", fg="#E0E0E0", padx=8, pady=8)
+        self.text_label.pack(fill="both", expand=True)
+        self.refresh()
+
+    def hide(self):
+        if self.window is not None:
+            self.window.destroy()
+            self.window = None
+            self.text_label = None
+
+    def _on_timing(self, timing):
+        if self.visible:
+            self.refresh()
+
+    def refresh(self):
+        lines = [f"{'action':<26}{'n':>5}{'p50 ms':>9}{'p95 ms':>9}"]
+        for name, count, p50, p95 in self.timings.summary():
+            lines.append(f"{name[:25]:<26}{count:>5}{p50:>9.1f}{p95:>9.1f}")
+        lines.append("")
+        lines.append(f"{'recent':<26}{'ms':>8}{'queries':>9}{'widgets':>9}")
+        for timing in reversed(self.timings.recent):
+            lines.append(f"{timing.name[:25]:<26}{timing.elapsed * 1000:>8.1f}{timing.query_count:>9}{timing.widget_count:>9}")
+        self.text_label.configure(text="\n".join(lines))